@@ -8,6 +8,9 @@ of workflows structured as graphs.
 from .graph import (
     Graph,
     GraphModel,
+    ModelRetryPolicy,
+    ModelReplica,
+    ModelConcurrency,
     GraphInputData,
     GraphBlackboard,
     BlackboardEntry,
@@ -17,12 +20,27 @@ from .graph import (
     NodeMessagePassing,
     NodeBatchMessagePassing,
     NodeMcpServerRef,
+    NodeToolSelection,
+    NodeHedging,
+    NodeObservation,
     NodeReact,
     GraphNode,
     GraphEdge,
     GraphMcpServer,
 )
-from .compiler import Compiler, CompiledOutput, CompiledNodeOutput, ReactTrace, ReactIteration
+from .compiler import (
+    Compiler,
+    CompiledOutput,
+    CompiledNodeOutput,
+    ReactTrace,
+    ReactIteration,
+    CompileEvent,
+    NodeStartedEvent,
+    TokenDeltaEvent,
+    ToolCallEvent,
+    NodeFinishedEvent,
+    CompileFinishedEvent,
+)
 from .compose import (
     compose_template_prompt,
     compose_node_prompt,
@@ -54,6 +72,9 @@ __all__ = [
     # Graph models
     "Graph",
     "GraphModel",
+    "ModelRetryPolicy",
+    "ModelReplica",
+    "ModelConcurrency",
     "GraphInputData",
     "GraphBlackboard",
     "BlackboardEntry",
@@ -63,6 +84,9 @@ __all__ = [
     "NodeMessagePassing",
     "NodeBatchMessagePassing",
     "NodeMcpServerRef",
+    "NodeToolSelection",
+    "NodeHedging",
+    "NodeObservation",
     "NodeReact",
     "GraphNode",
     "GraphEdge",
@@ -73,6 +97,12 @@ __all__ = [
     "CompiledNodeOutput",
     "ReactTrace",
     "ReactIteration",
+    "CompileEvent",
+    "NodeStartedEvent",
+    "TokenDeltaEvent",
+    "ToolCallEvent",
+    "NodeFinishedEvent",
+    "CompileFinishedEvent",
     # Compose utilities
     "compose_template_prompt",
     "compose_node_prompt",
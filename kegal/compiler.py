@@ -1,21 +1,32 @@
+import asyncio
+import contextvars
+import hashlib
 import json
+import queue
 import string
 import threading
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from pathlib import Path
-from typing import Any, Callable
+from typing import Any, AsyncIterator, Callable, Iterator, Literal, Union
 from urllib.parse import urlparse
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from .compose import compose_template_prompt, compose_node_prompt, compose_images, compose_documents, compose_tools
-from .graph import Graph, GraphEdge, GraphNode, NodeReact
+from .graph import Graph, GraphEdge, GraphNode, NodeObservation, NodeReact
 from .graph_blackboard import BlackboardEntry, GraphBlackboard
 from .graph_history import ChatHistoryFile
 from .mcp_handler import McpHandler
+from .mcp_registry import McpRegistry
+from .observation import extract_observation, truncate_observation
+from .partial_json import PartialJsonObject
+from .tool_selection import EXPAND_TOOL, EXPAND_TOOL_NAME, ToolEmbedder, ToolRanker
 from .utils import load_contents, load_text_from_source
 from .llm.llm_handler import LlmHandler
-from .llm.llm_model import LLmResponse, LLMStructuredOutput, LLMStructuredSchema, LLmMessage
+from .llm.llm_replicas import ReplicaRouter
+from .llm.llm_resilience import LlmCircuitOpenError, classify_error
+from .llm.llm_model import LLmResponse, LLmStreamChunk, LLMStructuredOutput, LLMStructuredSchema, LLmMessage, LLMTool
 
 import logging
 import sys as _sys
@@ -38,6 +49,16 @@ _DEFAULT_REACT_COMPACT_PROMPT = {
 }
 
 
+_DEFAULT_OBSERVATION_SUMMARY_PROMPT = (
+    "You condense tool and agent outputs for another model. Keep every fact, number, identifier "
+    "and error that could matter for the task; drop boilerplate, repetition and formatting. "
+    "Answer with the condensed output only."
+)
+
+# Request fields holding a node's images and documents
+_MEDIA_KEYS = ("imgs_b64", "pdfs_b64")
+
+
 class CompiledNodeOutput(BaseModel):
     node_id: str
     response: LLmResponse
@@ -45,12 +66,62 @@ class CompiledNodeOutput(BaseModel):
     show: bool
     history: bool
     context_window: int | None = None
+    model: int | None = None          # index of the model that served the node's last call
 
 class CompiledOutput(BaseModel):
     nodes: list[CompiledNodeOutput] = []
     input_size: int = 0
     output_size: int = 0
     compile_time: float = 0
+    # Hedged requests: duplicates sent, and tokens spent by the losing calls
+    # (not included in input_size / output_size)
+    hedged_calls: int = 0
+    hedge_input_size: int = 0
+    hedge_output_size: int = 0
+    # Calls answered by an identical call already in flight (single-flight);
+    # their tokens are counted on each node but were billed once
+    coalesced_calls: int = 0
+    # Nodes not run because a guard with guard_scope "dependents" they depend on failed
+    skipped_nodes: list[str] = []
+    # Part of input_size the providers served from their prompt cache
+    cached_input_size: int = 0
+    # Tokens of nodes started speculatively (speculative_guards) and discarded
+    # because a guard blocked (not included in input_size / output_size)
+    speculative_input_size: int = 0
+    speculative_output_size: int = 0
+    # Tokens of ReAct agents dispatched early (early_dispatch) and discarded
+    # because the final decision differed (not included in input_size / output_size)
+    early_dispatch_input_size: int = 0
+    early_dispatch_output_size: int = 0
+
+
+# ── compile_iter() events ────────────────────────────────────────────────────
+
+class NodeStartedEvent(BaseModel):
+    type: Literal["node_started"] = "node_started"
+    node_id: str
+
+class TokenDeltaEvent(BaseModel):
+    type: Literal["token"] = "token"
+    node_id: str
+    delta: str
+
+class ToolCallEvent(BaseModel):
+    type: Literal["tool_call"] = "tool_call"
+    node_id: str
+    name: str
+    parameters: dict
+
+class NodeFinishedEvent(BaseModel):
+    type: Literal["node_finished"] = "node_finished"
+    node_id: str
+    output: CompiledNodeOutput
+
+class CompileFinishedEvent(BaseModel):
+    type: Literal["compile_finished"] = "compile_finished"
+    output: CompiledOutput
+
+CompileEvent = Union[NodeStartedEvent, TokenDeltaEvent, ToolCallEvent, NodeFinishedEvent, CompileFinishedEvent]
 
 
 class ReactIteration(BaseModel):
@@ -61,6 +132,9 @@ class ReactIteration(BaseModel):
     agent_input: str | None = None
     controller_input_tokens: int = 0
     controller_output_tokens: int = 0
+    dispatched_early: bool = False    # agent started while the controller was still streaming
+    cached: bool = False              # observation reused from an identical earlier dispatch
+    observation: str | None = None    # what the controller saw, when an observation policy shrank agent_output
 
 class ReactTrace(BaseModel):
     controller_id: str
@@ -72,10 +146,161 @@ class ReactTrace(BaseModel):
     total_controller_output_tokens: int = 0
 
 
+class _NodeToolIndex(BaseModel):
+    """Per-node tool routing table, built once and reused on every LLM call.
+
+    Rebuilt only when an MCP server reports a tool-list change.
+    """
+    model_config = ConfigDict(frozen=True, arbitrary_types_allowed=True)
+
+    static_tools: tuple[LLMTool, ...] = ()
+    mcp_tools: tuple[LLMTool, ...] = ()
+    mcp_routes: dict[str, Any] = {}     # tool name → McpHandler
+    ranker: ToolRanker | None = None    # set when the node has tool_selection
+
+
+# Marks the end of a compile_iter() event stream
+_COMPILE_DONE = object()
+
+
+class _AgentScope:
+    """Isolated message pipe, outputs and model failover state of one ReAct agent run.
+
+    Bound to the running thread through a context variable, so agents
+    dispatched in parallel each see their own state while the controller
+    and the rest of the graph keep using the Compiler's.
+    """
+
+    def __init__(self, owner: "Compiler", message_passing: list[Any]) -> None:
+        self.owner = owner
+        self.message_passing = message_passing
+        self.outputs = CompiledOutput()
+        # node id → serving model index, as Compiler._served_model
+        self.served_model: dict[str, int] = {}
+        # Set while a level of the agent runs concurrently: node id → message pipe
+        # entries, and board id → node id → write, applied in node order afterwards
+        self.pipe_buffer: dict[str, list[Any]] | None = None
+        self.board_buffer: dict[str, dict[str, str]] | None = None
+
+
+_agent_scope: contextvars.ContextVar[_AgentScope | None] = contextvars.ContextVar("kegal_agent_scope", default=None)
+
+
+class _SpeculationCancelled(Exception):
+    """Raised inside a speculative node once a guard has blocked the graph, or its early dispatch was discarded."""
+
+
+class _SpeculativeScope(_AgentScope):
+    """State of a node started while the global guards are still running.
+
+    Outputs, message pipe entries, blackboard writes and compile_iter()
+    events stay here until every guard has passed, then are committed to
+    the Compiler; if a guard blocks, ``cancelled`` is set and the node's
+    next model call (or stream chunk) raises _SpeculationCancelled.  A ReAct
+    agent dispatched early runs in one too, committed only when the
+    controller's final decision confirms it.
+    """
+
+    def __init__(self, owner: "Compiler", message_passing: list[Any]) -> None:
+        super().__init__(owner, message_passing)
+        self.board_writes: list[tuple[str, str]] = []
+        self.events: list[Any] = []
+        self.cancelled = threading.Event()
+        # Tokens of every completed call, reported as waste when discarded
+        self.input_size = 0
+        self.output_size = 0
+
+
+class _EarlyRoute:
+    """Watches a streamed controller decision and starts the agent before the stream ends.
+
+    ``start(next_agent, agent_input)`` is called once, as soon as both fields
+    are complete and ``done`` has not been seen as true; it returns the
+    agent's _SpeculativeScope, Future and memo key (taken before the agent
+    ran; None when not memoizing), or None when the agent cannot be
+    dispatched.
+    """
+
+    def __init__(self, start: Callable[[str, str], tuple[_SpeculativeScope, Future, tuple | None] | None]) -> None:
+        self._start = start
+        self._parser = PartialJsonObject()
+        self.agent: str | None = None
+        self.agent_input: str | None = None
+        self.scope: _SpeculativeScope | None = None
+        self.future: Future | None = None
+        self.memo_key: tuple | None = None
+        self._tried = False
+
+    def __call__(self, chunk: LLmStreamChunk | None) -> None:
+        if self.future is not None:
+            return
+        if chunk is None:
+            # The stream failed and the call will be retried elsewhere: start over
+            self._parser = PartialJsonObject()
+            self._tried = False
+            return
+        if self._tried:
+            return
+        fragment = chunk.json_delta or chunk.delta
+        if not fragment or not self._parser.feed(fragment):
+            return
+        fields = self._parser.fields
+        agent, agent_input = fields.get("next_agent"), fields.get("agent_input")
+        if fields.get("done") is True or not isinstance(agent, str) or not agent.strip():
+            return
+        if not isinstance(agent_input, str) or not agent_input:
+            return
+        self._tried = True
+        started = self._start(agent.strip(), agent_input)
+        if started is not None:
+            self.scope, self.future, self.memo_key = started
+            self.agent, self.agent_input = agent.strip(), agent_input
+
+
+def _normalize_agent_input(agent_input: str) -> str:
+    return " ".join(agent_input.split())
+
+
+class _DispatchLedger:
+    """Dispatches made during one controller run: repeat counts and, when memoizing, observations."""
+
+    def __init__(self, memoize: bool = False, max_repeats: int | None = None) -> None:
+        self.memo: dict[tuple[str, str, tuple[str, ...]], str] | None = {} if memoize else None
+        self.max_repeats = max_repeats
+        self._counts: dict[tuple[str, str], int] = {}
+
+    def exhausted(self, agent: str, agent_input: str) -> bool:
+        """True when this agent/input pair has already been dispatched max_repeats times."""
+        if self.max_repeats is None:
+            return False
+        return self._counts.get((agent, _normalize_agent_input(agent_input)), 0) >= self.max_repeats
+
+    def record(self, agent: str, agent_input: str) -> None:
+        key = (agent, _normalize_agent_input(agent_input))
+        self._counts[key] = self._counts.get(key, 0) + 1
+
+
+def _run_in_thread(fn: Callable[..., Any], *args: Any, name: str = "kegal-react-early") -> Future:
+    """Run fn(*args) on a daemon thread and return a Future for its result."""
+    future: Future = Future()
+
+    def run() -> None:
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(fn(*args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name=name, daemon=True).start()
+    return future
+
+
 class Compiler:
     def __init__(self, uri: str | None = None,
                        source: dict | None = None,
-                       tool_executors: dict[str, Callable] | None = None) -> None:
+                       tool_executors: dict[str, Callable] | None = None,
+                       tool_embedder: ToolEmbedder | None = None) -> None:
         if uri is not None:
             graph = Graph.from_uri(uri)
             self._graph_dir = Path(uri).resolve().parent
@@ -120,27 +345,29 @@ class Compiler:
         self.nodes = {node.id: node for node in graph.nodes}
         self.edges = graph.edges
         self.graph_mcp_servers = graph.mcp_servers or []
+        self.speculative_guards = graph.speculative_guards
 
         # Static tool executors: name → Python callable
         self.tool_executors: dict[str, Callable] = tool_executors or {}
-
-        # MCP handlers: server id → McpHandler (connected at init)
+        # Optional embedding function for tool_selection (BM25 when None)
+        self.tool_embedder = tool_embedder
+
+        # Per-node tool routing tables, built lazily by _tool_index_for()
+        self._tool_index: dict[str, _NodeToolIndex] = {}
+
+        # node id → index of the model currently serving it (differs from
+        # node.model after a failover to one of node.fallback_models)
+        self._served_model: dict[str, int] = {}
+        # Runs hedged LLM calls; created on the first hedge
+        self._hedge_pool: ThreadPoolExecutor | None = None
+        # Receives compile_iter() events while a stream is open
+        self._event_sink: Callable[[Any], None] | None = None
+
+        # MCP handlers: server id → McpHandler (connected at init unless lazy).
+        # Handlers come from the process-wide registry, so Compilers declaring an
+        # identical server share one running instance.
         self.mcp_handlers: dict[str, McpHandler] = {}
-        for server_cfg in self.graph_mcp_servers:
-            handler = McpHandler(server_cfg)
-            try:
-                handler.connect()
-                self.mcp_handlers[server_cfg.id] = handler
-            except Exception as e:
-                logger.error(f"Failed to connect MCP server '{server_cfg.id}': {e}")
-                # Disconnect any handlers already connected before re-raising,
-                # otherwise their background threads and event loops are leaked.
-                for connected_id, connected_handler in self.mcp_handlers.items():
-                    try:
-                        connected_handler.disconnect()
-                    except Exception as de:
-                        logger.warning(f"Error disconnecting MCP server '{connected_id}' during cleanup: {de}")
-                raise
+        self._connect_mcp_servers()
 
         self.react_compact_prompts: list[dict[str, str]] = (
             self._load_prompt_inputs(graph.react_compact_prompts)
@@ -152,6 +379,102 @@ class Compiler:
         self._validate_prompts()
         self._react_controllers: dict[str, GraphEdge] = self._build_react_controller_map()
 
+    # -------------------------------------------------------------------------
+    # Per-agent state — outputs and message_passing resolve to the running
+    # ReAct agent's scope on its thread, and to the Compiler's own otherwise
+    # -------------------------------------------------------------------------
+
+    def _scope(self) -> _AgentScope | None:
+        scope = _agent_scope.get()
+        return scope if scope is not None and scope.owner is self else None
+
+    @property
+    def outputs(self) -> CompiledOutput:
+        scope = self._scope()
+        return scope.outputs if scope is not None else self._outputs
+
+    @outputs.setter
+    def outputs(self, value: CompiledOutput) -> None:
+        scope = self._scope()
+        if scope is not None:
+            scope.outputs = value
+        else:
+            self._outputs = value
+
+    @property
+    def message_passing(self) -> list[Any]:
+        scope = self._scope()
+        return scope.message_passing if scope is not None else self._message_passing
+
+    @message_passing.setter
+    def message_passing(self, value: list[Any]) -> None:
+        scope = self._scope()
+        if scope is not None:
+            scope.message_passing = value
+        else:
+            self._message_passing = value
+
+    def _connect_mcp_servers(self) -> None:
+        """Start every eager MCP server concurrently and wait for all of them.
+
+        Each eager handler boots its sessions on the MCP runtime loop as soon as
+        it is constructed; the connect() waits then run in parallel, so startup
+        costs the slowest server instead of the sum of all of them. Servers
+        declared ``lazy`` are registered but not started — they connect on the
+        first tool listing or call for a node that references them. A server
+        already running for another Compiler is reused; connect() returns at once.
+
+        On failure every acquired handler is released (and disconnected once no
+        other Compiler holds it) so no subprocess is leaked. A single failure re-raises
+        the original exception; several are reported together in a RuntimeError.
+        """
+        if not self.graph_mcp_servers:
+            return
+
+        registry = McpRegistry.shared()
+        handlers: dict[str, McpHandler] = {}
+        failures: list[tuple[str, Exception]] = []
+        try:
+            for server_cfg in self.graph_mcp_servers:
+                handlers[server_cfg.id] = registry.acquire(server_cfg)
+        except Exception as e:
+            logger.error(f"Failed to start MCP server '{server_cfg.id}': {e}")
+            failures.append((server_cfg.id, e))
+        else:
+            eager = {sid: h for sid, h in handlers.items() if not h.lazy}
+            with ThreadPoolExecutor(max_workers=max(len(eager), 1)) as executor:
+                futures = {
+                    executor.submit(handler.connect): server_id
+                    for server_id, handler in eager.items()
+                }
+                for future in as_completed(futures):
+                    server_id = futures[future]
+                    try:
+                        future.result()
+                    except Exception as e:
+                        logger.error(f"Failed to connect MCP server '{server_id}': {e}")
+                        failures.append((server_id, e))
+
+        if failures:
+            for server_id, handler in handlers.items():
+                try:
+                    registry.release(handler)
+                except Exception as de:
+                    logger.warning(f"Error disconnecting MCP server '{server_id}' during cleanup: {de}")
+            if len(failures) == 1:
+                raise failures[0][1]
+            order = [cfg.id for cfg in self.graph_mcp_servers]
+            failures.sort(key=lambda f: order.index(f[0]))
+            failed_ids = [server_id for server_id, _ in failures]
+            details = "; ".join(f"'{sid}': {type(e).__name__}({e})" for sid, e in failures)
+            raise RuntimeError(
+                f"Failed to connect MCP server(s) {failed_ids}. Details: {details}"
+            ) from failures[0][1]
+
+        for server_id, handler in handlers.items():
+            handler.add_tools_changed_listener(self._invalidate_tool_index)
+            self.mcp_handlers[server_id] = handler
+
     def __enter__(self) -> "Compiler":
         return self
 
@@ -162,25 +485,37 @@ class Compiler:
     def close(self) -> None:
         """Release all resources held by this compiler.
 
-        - MCP servers: stopped only if any were connected.
+        - MCP servers: released to the registry; each is stopped once no other
+          Compiler holds it.
         - LLM clients: closed only if the underlying provider exposes close().
+        - Hedge threads: the pool is shut down without waiting for losing calls.
         - Tool executors: plain callables, nothing to release.
         Safe to call more than once.
         """
         if self.mcp_handlers:
             for server_id, handler in self.mcp_handlers.items():
                 try:
-                    handler.disconnect()
+                    handler.remove_tools_changed_listener(self._invalidate_tool_index)
+                    McpRegistry.shared().release(handler)
                 except Exception as e:
                     logger.warning(f"Error closing MCP server '{server_id}': {e}")
             self.mcp_handlers.clear()
 
+        hedge_pool = self._hedge_pool
+        if hedge_pool is not None:
+            # Losing hedges may still be waiting on the provider; do not block on them
+            hedge_pool.shutdown(wait=False, cancel_futures=True)
+            self._hedge_pool = None
+
         for client in self.clients:
-            if hasattr(client.model, "close"):
-                try:
-                    client.model.close()
-                except Exception as e:
-                    logger.warning(f"Error closing LLM client: {e}")
+            router = getattr(client, "router", None)
+            models = router.models if isinstance(router, ReplicaRouter) else [client.model]
+            for model in models:
+                if hasattr(model, "close"):
+                    try:
+                        model.close()
+                    except Exception as e:
+                        logger.warning(f"Error closing LLM client: {e}")
 
     # -------------------------------------------------------------------------
     # Convenience setters — chat history and retrieved chunks
@@ -593,6 +928,10 @@ class Compiler:
                 errors.append(
                     f"MCP server '{server.id}': transport is 'stdio' but 'command' is not defined"
                 )
+            if server.transport != "stdio" and server.url is None:
+                errors.append(
+                    f"MCP server '{server.id}': transport is '{server.transport}' but 'url' is not defined"
+                )
 
         for node_id, node in self.nodes.items():
             if node.model >= n_models:
@@ -600,6 +939,31 @@ class Compiler:
                     f"Node '{node_id}': model index {node.model} is out of range "
                     f"(graph defines {n_models} model(s), valid indices: 0–{n_models - 1})"
                 )
+            for index in (node.fallback_models or []):
+                if index >= n_models:
+                    errors.append(
+                        f"Node '{node_id}': fallback model index {index} is out of range "
+                        f"(graph defines {n_models} model(s), valid indices: 0–{n_models - 1})"
+                    )
+                elif index == node.model:
+                    errors.append(
+                        f"Node '{node_id}': fallback_models lists its primary model {index}"
+                    )
+            if node.hedge is not None and node.hedge.target == "fallback" and not node.fallback_models:
+                errors.append(
+                    f"Node '{node_id}': hedge.target is 'fallback' but the node has no fallback_models"
+                )
+            for source, policy in (node.observations or {}).items():
+                if policy.summary_model is not None and policy.summary_model >= n_models:
+                    errors.append(
+                        f"Node '{node_id}': observations['{source}'].summary_model {policy.summary_model} "
+                        f"is out of range (graph defines {n_models} model(s), valid indices: 0–{n_models - 1})"
+                    )
+                if policy.board is not None and policy.board not in board_ids:
+                    errors.append(
+                        f"Node '{node_id}': observations['{source}'].board '{policy.board}' "
+                        f"is not defined in graph.blackboard"
+                    )
             if node.prompt is not None and node.prompt.template >= n_prompts:
                 errors.append(
                     f"Node '{node_id}': template index {node.prompt.template} is out of range "
@@ -610,6 +974,11 @@ class Compiler:
                     f"Node '{node_id}' is a guard node (structured output has a 'validation' field) "
                     f"but has no prompt — a guard node must have a prompt to evaluate the gate."
                 )
+            if node.guard_scope != "global" and not self._is_guard_node(node):
+                errors.append(
+                    f"Node '{node_id}': guard_scope '{node.guard_scope}' is set but the node is not "
+                    f"a guard (its structured output has no 'validation' field)"
+                )
             if node.tools:
                 for tool_name in node.tools:
                     if tool_name not in tool_names:
@@ -624,7 +993,8 @@ class Compiler:
                         )
                     elif ref.tools is not None:
                         handler = self.mcp_handlers.get(ref.id)
-                        if handler:
+                        # Lazy servers are not listed here — that would start them
+                        if handler and handler.is_connected():
                             available = set(handler.tool_names())
                             for tool_name in ref.tools:
                                 if tool_name not in available:
@@ -882,8 +1252,11 @@ class Compiler:
                 if in_idx > out_idx:
                     deps[in_nid].add(out_nid)
 
-        # — Stage 3: guard nodes precede all non-guard nodes (unchanged) ———
-        guard_ids = [nid for nid, n in self.nodes.items() if self._is_guard_node(n) and nid not in react_agent_ids]
+        # — Stage 3: global guard nodes precede all other nodes ————————————
+        # A guard scoped to its dependents gets no extra edges: it gates only the
+        # nodes that already depend on it, and is itself gated like a regular node.
+        guard_ids = [nid for nid, n in self.nodes.items()
+                     if self._is_global_guard(n) and nid not in react_agent_ids]
         non_guard_ids = [nid for nid in self.nodes if nid not in guard_ids and nid not in react_agent_ids]
         for nid in non_guard_ids:
             for gid in guard_ids:
@@ -928,6 +1301,24 @@ class Compiler:
         fields = so.get("parameters") or so.get("properties") or {}
         return "validation" in fields
 
+    @classmethod
+    def _is_global_guard(cls, node: GraphNode) -> bool:
+        """True for a guard whose failure aborts the whole graph."""
+        return cls._is_guard_node(node) and node.guard_scope == "global"
+
+    @staticmethod
+    def _dependents(deps: dict[str, set[str]], node_id: str) -> set[str]:
+        """Nodes that depend on node_id, directly or transitively."""
+        found: set[str] = set()
+        frontier = [node_id]
+        while frontier:
+            current = frontier.pop()
+            for nid, nid_deps in deps.items():
+                if current in nid_deps and nid not in found:
+                    found.add(nid)
+                    frontier.append(nid)
+        return found
+
     def _topological_levels(self, deps: dict[str, set[str]]) -> list[list[str]]:
         """Kahn's algorithm — returns nodes grouped into levels.
         Nodes in the same level have no dependency on each other and can run
@@ -988,56 +1379,90 @@ class Compiler:
                     f"message pipe."
                 )
 
-        for level in levels:
-            guard_ids   = [nid for nid in level if self._is_guard_node(self.nodes[nid])]
-            react_ids   = [nid for nid in level if nid in self._react_controllers and nid not in guard_ids]
-            regular_ids = [nid for nid in level if nid not in guard_ids and nid not in react_ids]
-
-            if len(react_ids) > 1:
-                raise ValueError(
-                    f"Concurrent react controllers are not allowed. "
-                    f"Controllers at the same DAG level: {react_ids}. "
-                    f"Restructure the graph so each controller is at a unique level."
-                )
+        # Nodes skipped because a scoped guard they depend on failed → that guard
+        blocked: dict[str, str] = {}
+        # Nodes started ahead of the first level's global guards (speculative_guards)
+        speculation = self._start_speculation(self._speculative_nodes(levels, deps))
+        try:
+            for depth, level in enumerate(levels):
+                for nid in level:
+                    if nid in blocked:
+                        logger.info(_c(f"Node '{nid}' skipped — guard '{blocked[nid]}' blocked it.", "1"))
+                        self.outputs.skipped_nodes.append(nid)
+                level = [nid for nid in level if nid not in blocked]
+                # Guards scoped to their dependents run with the regular nodes (Phase 2)
+                guard_ids   = [nid for nid in level if self._is_global_guard(self.nodes[nid])]
+                react_ids   = [nid for nid in level if nid in self._react_controllers and nid not in guard_ids]
+                regular_ids = [nid for nid in level if nid not in guard_ids and nid not in react_ids]
+
+                if len(react_ids) > 1:
+                    raise ValueError(
+                        f"Concurrent react controllers are not allowed. "
+                        f"Controllers at the same DAG level: {react_ids}. "
+                        f"Restructure the graph so each controller is at a unique level."
+                    )
 
-            # Phase 1 — run guard nodes sequentially first
-            for nid in guard_ids:
-                passed = self._run_node(self.nodes[nid])
-                if passed is False:
-                    logger.info(_c(f"Guard node '{nid}' blocked execution — aborting.", "1"))
-                    self.outputs.compile_time = time.time() - global_start
-                    return
-
-            # Phase 2 — run regular nodes; parallel if >1, sequential if 1
-            # Pre-initialise write buffer for Cat-2 nodes in declaration order so
-            # that concurrent writes are applied deterministically after the pool
-            # drains, regardless of which thread finishes first.
-            cat2_in_level = [
-                nid for nid in self.nodes          # self.nodes preserves declaration order
-                if nid in set(regular_ids)
-                and self.nodes[nid].blackboard is not None
-                and self.nodes[nid].blackboard.read
-                and self.nodes[nid].blackboard.write
-            ]
-            if cat2_in_level:
-                self._blackboard_write_buffer = {}
-                for nid in cat2_in_level:
-                    board_id = self.nodes[nid].blackboard.id
-                    if board_id not in self._blackboard_write_buffer:
-                        self._blackboard_write_buffer[board_id] = {}
-                    self._blackboard_write_buffer[board_id][nid] = ""
-
-            if len(regular_ids) > 1:
-                self._run_parallel(regular_ids)
-            elif len(regular_ids) == 1:
-                self._run_node(self.nodes[regular_ids[0]])
-
-            if self._blackboard_write_buffer is not None:
-                self._flush_blackboard_write_buffer()
-
-            # Phase 3 — react controller (always sequential, after regular nodes)
-            for nid in react_ids:
-                self._run_react_loop(self._react_controllers[nid], self.nodes[nid])
+                # Nodes started speculatively: the guards they waited for passed
+                speculated: dict[str, bool] = {}
+                speculative_writes: list[tuple[str, str]] = []
+                if depth == 1 and speculation:
+                    speculated, speculative_writes = self._commit_speculation(speculation)
+                    regular_ids = [nid for nid in regular_ids if nid not in speculated]
+
+                # Phase 1 — run guard nodes sequentially first
+                for nid in guard_ids:
+                    passed = self._run_node(self.nodes[nid])
+                    if passed is False:
+                        logger.info(_c(f"Guard node '{nid}' blocked execution — aborting.", "1"))
+                        self._discard_speculation(speculation)
+                        self.outputs.compile_time = time.time() - global_start
+                        return
+
+                # Phase 2 — run regular nodes; parallel if >1, sequential if 1
+                # Pre-initialise write buffer for Cat-2 nodes in declaration order so
+                # that concurrent writes are applied deterministically after the pool
+                # drains, regardless of which thread finishes first.
+                cat2_in_level = [
+                    nid for nid in self.nodes          # self.nodes preserves declaration order
+                    if nid in set(regular_ids)
+                    and self.nodes[nid].blackboard is not None
+                    and self.nodes[nid].blackboard.read
+                    and self.nodes[nid].blackboard.write
+                ]
+                if cat2_in_level:
+                    self._blackboard_write_buffer = {}
+                    for nid in cat2_in_level:
+                        board_id = self.nodes[nid].blackboard.id
+                        if board_id not in self._blackboard_write_buffer:
+                            self._blackboard_write_buffer[board_id] = {}
+                        self._blackboard_write_buffer[board_id][nid] = ""
+
+                if len(regular_ids) > 1:
+                    passed = self._run_parallel(regular_ids)
+                elif len(regular_ids) == 1:
+                    passed = {regular_ids[0]: self._run_node(self.nodes[regular_ids[0]])}
+                else:
+                    passed = {}
+                passed.update(speculated)
+
+                # Speculative writes land after the level, like the Cat-2 buffer
+                for board_id, text in speculative_writes:
+                    self._write_to_board(board_id, text)
+                if self._blackboard_write_buffer is not None:
+                    self._flush_blackboard_write_buffer()
+
+                for nid in passed:
+                    if passed[nid] is False and self._is_guard_node(self.nodes[nid]):
+                        logger.info(_c(f"Guard node '{nid}' blocked its dependents.", "1"))
+                        for dependent in self._dependents(deps, nid):
+                            blocked.setdefault(dependent, nid)
+
+                # Phase 3 — react controller (always sequential, after regular nodes)
+                for nid in react_ids:
+                    self._run_react_loop(self._react_controllers[nid], self.nodes[nid])
+        except BaseException:
+            self._discard_speculation(speculation)
+            raise
 
         self._update_auto_history()
         elapsed = time.time() - global_start
@@ -1048,23 +1473,213 @@ class Compiler:
             f"{elapsed:.1f}s", "1"
         ))
 
-    def _run_parallel(self, node_ids: list[str]):
+    def compile_iter(self) -> Iterator[CompileEvent]:
+        """Run compile() and yield its events as they happen.
+
+        Events: NodeStartedEvent, TokenDeltaEvent (LLM calls are streamed
+        while an event consumer is attached), ToolCallEvent, NodeFinishedEvent
+        with the node's CompiledNodeOutput and, last, CompileFinishedEvent with
+        the CompiledOutput.  The graph runs in a worker thread; an exception
+        raised by compile() is re-raised here after the events before it.
+        """
+        events: queue.Queue = queue.Queue()
+        worker = threading.Thread(target=self._compile_to, args=(events.put,),
+                                  name="kegal-compile", daemon=True)
+        worker.start()
+        while True:
+            item = events.get()
+            if item is _COMPILE_DONE:
+                break
+            if isinstance(item, BaseException):
+                worker.join()
+                raise item
+            yield item
+        worker.join()
+
+    async def acompile_iter(self) -> AsyncIterator[CompileEvent]:
+        """Async variant of compile_iter(): the graph runs in a worker thread, events are awaited."""
+        loop = asyncio.get_running_loop()
+        events: asyncio.Queue = asyncio.Queue()
+        worker = loop.run_in_executor(
+            None, self._compile_to, lambda item: loop.call_soon_threadsafe(events.put_nowait, item)
+        )
+        while True:
+            item = await events.get()
+            if item is _COMPILE_DONE:
+                break
+            if isinstance(item, BaseException):
+                await worker
+                raise item
+            yield item
+        await worker
+
+    def _compile_to(self, put: Callable[[Any], None]) -> None:
+        """Run compile() with events sent to put, followed by the final event (or the error) and _COMPILE_DONE."""
+        self._event_sink = put
+        try:
+            self.compile()
+            put(CompileFinishedEvent(output=self.outputs))
+        except BaseException as e:
+            put(e)
+        finally:
+            self._event_sink = None
+            put(_COMPILE_DONE)
+
+    def _emit(self, event: CompileEvent) -> None:
+        sink = self._event_sink
+        if sink is None:
+            return
+        scope = self._scope()
+        if isinstance(scope, _SpeculativeScope):
+            # Replayed on commit, dropped when the speculation is discarded
+            scope.events.append(event)
+            return
+        sink(event)
+
+    # -------------------------------------------------------------------------
+    # Speculative execution — second-level nodes start alongside the global
+    # guards of the first level and are committed or discarded on their verdict
+    # -------------------------------------------------------------------------
+
+    def _speculative_nodes(self, levels: list[list[str]], deps: dict[str, set[str]]) -> list[str]:
+        """Second-level nodes that can start while the first level's global guards run.
+
+        A node qualifies when it depends only on those guards and cannot read
+        anything the first level produces: it takes no message-pipe input when
+        a first-level node writes the pipe, and reads no board (or import of
+        one) a first-level node writes.  Guards, ReAct controllers and nodes
+        with tools are never speculated — a tool call cannot be taken back.
+        """
+        if not self.speculative_guards or len(levels) < 2:
+            return []
+        guards = {nid for nid in levels[0] if self._is_global_guard(self.nodes[nid])}
+        if not guards:
+            return []
+        first = [self.nodes[nid] for nid in levels[0]]
+        writes_pipe = any(n.message_passing.output for n in first)
+        written_boards = {n.blackboard.id for n in first if n.blackboard is not None and n.blackboard.write}
+        selected: list[str] = []
+        for nid in levels[1]:
+            node = self.nodes[nid]
+            if not deps[nid] <= guards or node.prompt is None:
+                continue
+            if self._is_global_guard(node) or nid in self._react_controllers:
+                continue
+            if node.tools or node.mcp_servers:
+                continue
+            if writes_pipe and node.message_passing.input:
+                continue
+            if node.blackboard is not None and node.blackboard.read:
+                entry = self._board_entries.get(node.blackboard.id)
+                read = {node.blackboard.id, *(entry.imports if entry is not None else [])}
+                if read & written_boards:
+                    continue
+            selected.append(nid)
+        return selected
+
+    def _start_speculation(self, node_ids: list[str]) -> list[tuple[str, _SpeculativeScope, Future]]:
+        """Start each node on its own thread, in a _SpeculativeScope."""
+        if node_ids:
+            logger.info(_c(f"speculating {node_ids} while the guard(s) run", "90"))
+        started = []
+        for nid in node_ids:
+            scope = _SpeculativeScope(self, [])
+            future = _run_in_thread(self._run_speculative, scope, self.nodes[nid], name="kegal-speculative")
+            started.append((nid, scope, future))
+        return started
+
+    def _run_speculative(self, scope: _SpeculativeScope, node: GraphNode) -> bool:
+        token = _agent_scope.set(scope)
+        try:
+            return self._run_node(node)
+        finally:
+            _agent_scope.reset(token)
+
+    def _commit_speculation(self, speculation: list[tuple[str, _SpeculativeScope, Future]]
+                            ) -> tuple[dict[str, bool], list[tuple[str, str]]]:
+        """Wait for the speculative nodes and apply their effects in declaration order.
+
+        Outputs, message pipe entries and events are committed here; the
+        blackboard writes are returned for the caller to apply once the rest
+        of the level has run.  Returns each node's _run_node() result; if any
+        node raised, a RuntimeError is raised after the others are committed.
+        """
+        order = {nid: i for i, nid in enumerate(self.nodes)}
+        results: dict[str, bool] = {}
+        board_writes: list[tuple[str, str]] = []
+        failures: list[tuple[str, Exception]] = []
+        for nid, scope, future in sorted(speculation, key=lambda item: order[item[0]]):
+            try:
+                results[nid] = future.result()
+            except Exception as e:
+                logger.exception(f"Node '{nid}' failed during speculative execution: {e}")
+                failures.append((nid, e))
+                continue
+            with self._outputs_lock:
+                for name in CompiledOutput.model_fields:
+                    value = getattr(scope.outputs, name)
+                    if isinstance(value, list):
+                        getattr(self.outputs, name).extend(value)
+                    elif isinstance(value, int):
+                        setattr(self.outputs, name, getattr(self.outputs, name) + value)
+            with self._message_passing_lock:
+                self.message_passing.extend(scope.message_passing)
+            board_writes.extend(scope.board_writes)
+            for event in scope.events:
+                self._emit(event)
+        speculation.clear()
+
+        if failures:
+            failed_ids = [nid for nid, _ in failures]
+            details = "; ".join(f"'{nid}': {type(e).__name__}({e})" for nid, e in failures)
+            raise RuntimeError(
+                f"Speculative execution failed for node(s) {failed_ids}. Details: {details}"
+            ) from failures[0][1]
+        return results, board_writes
+
+    def _discard_speculation(self, speculation: list[tuple[str, _SpeculativeScope, Future]]) -> None:
+        """Cancel the speculative nodes, wait for them and report their tokens as wasted.
+
+        Streamed calls stop at their next chunk; a call already in flight
+        without streaming runs to completion.  Tokens of a stream cut short
+        are never reported by the provider, so they are not counted.
+        """
+        if not speculation:
+            return
+        for _nid, scope, _future in speculation:
+            scope.cancelled.set()
+        wait([future for _nid, _scope, future in speculation])
+        for _nid, scope, _future in speculation:
+            self.outputs.speculative_input_size += scope.input_size
+            self.outputs.speculative_output_size += scope.output_size
+        logger.info(_c(
+            f"discarded speculative node(s) {[nid for nid, _scope, _future in speculation]}  "
+            f"wasted in={self.outputs.speculative_input_size} "
+            f"out={self.outputs.speculative_output_size} tokens", "90"
+        ))
+        speculation.clear()
+
+    def _run_parallel(self, node_ids: list[str]) -> dict[str, bool]:
         """Execute independent nodes concurrently using a thread pool.
 
         All futures are allowed to complete before raising so that partial
         results and blackboard writes from successful siblings are preserved.
         If any node raises, a RuntimeError is raised after the pool drains.
+        Each node runs in a copy of the caller's context, so nodes of a ReAct
+        agent keep writing to that agent's scope.  Returns each node's
+        _run_node() result (False for a failed validation gate).
         """
+        results: dict[str, bool] = {}
         with ThreadPoolExecutor(max_workers=len(node_ids)) as executor:
             futures = {
-                executor.submit(self._run_node, self.nodes[nid]): nid
+                executor.submit(contextvars.copy_context().run, self._run_node, self.nodes[nid]): nid
                 for nid in node_ids
             }
             failures: list[tuple[str, Exception]] = []
             for future in as_completed(futures):
                 nid = futures[future]
                 try:
-                    future.result()
+                    results[nid] = future.result()
                 except Exception as e:
                     logger.exception(f"Node '{nid}' failed during parallel execution: {e}")
                     failures.append((nid, e))
@@ -1075,6 +1690,7 @@ class Compiler:
             raise RuntimeError(
                 f"Parallel execution failed for node(s) {failed_ids}. Details: {details}"
             ) from failures[0][1]
+        return results
 
     # -------------------------------------------------------------------------
     # Single-node execution
@@ -1099,7 +1715,9 @@ class Compiler:
         is_guard = self._is_guard_node(node)
         try:
             logger.info(_c(f"▶  {node.id}", "1;36"))
+            self._emit(NodeStartedEvent(node_id=node.id))
             start = time.time()
+            self._reset_served_model(node)
             model_body = self._build_model_body(node)
             enable_history = "chat_history" in model_body
 
@@ -1114,6 +1732,8 @@ class Compiler:
             self._update_blackboard(node, response)
             self._check_message_passing(response, node)
             return self._check_validation_gate(response)
+        except _SpeculationCancelled:
+            raise
         except Exception as e:
             logger.exception(f"Failed to execute node '{node.id}': {e}")
             if is_guard:
@@ -1123,41 +1743,244 @@ class Compiler:
             # nodes with potentially inconsistent state
             raise
 
+    def _served_models(self) -> dict[str, int]:
+        """Failover state of the running scope, so concurrent runs of one node never share it."""
+        scope = self._scope()
+        return scope.served_model if scope is not None else self._served_model
+
+    def _serving_model(self, node: GraphNode) -> int:
+        """Index of the model currently serving node (node.model unless it failed over)."""
+        return self._served_models().get(node.id, node.model)
+
+    def _reset_served_model(self, node: GraphNode) -> None:
+        """Start a node execution from its primary model again."""
+        self._served_models().pop(node.id, None)
+
+    def _complete(self, node: GraphNode, on_chunk: Callable[[LLmStreamChunk | None], None] | None = None,
+                  **body: Any) -> LLmResponse:
+        """Call the node's model, failing over along node.fallback_models.
+
+        A model is skipped when its call fails with an error the resilience
+        layer gave up on (retries exhausted, timeout, open circuit); other
+        errors (bad request, auth) are raised as-is.  Once a fallback has
+        served, later calls of the same node execution start from it, so a
+        tool loop does not retry the dead primary on every turn.
+
+        With on_chunk the call is streamed and every chunk is passed to it;
+        None is passed when a stream fails, before the next model is tried.
+        """
+        chain = [node.model] + list(node.fallback_models or [])
+        candidates = chain[chain.index(self._serving_model(node)):]
+        scope = self._scope()
+        speculation = scope if isinstance(scope, _SpeculativeScope) else None
+        for position, index in enumerate(candidates):
+            if speculation is not None and speculation.cancelled.is_set():
+                raise _SpeculationCancelled(node.id)
+            try:
+                response, index = self._call_model(node, candidates[position:], body, on_chunk)
+            except _SpeculationCancelled:
+                raise
+            except Exception as e:
+                unavailable = isinstance(e, LlmCircuitOpenError) or classify_error(e)[0]
+                if not unavailable or position == len(candidates) - 1:
+                    raise
+                logger.warning(_c(
+                    f"   ⚠ {node.id}: model {index} unavailable ({e}) — "
+                    f"failing over to model {candidates[position + 1]}", "33"
+                ))
+                continue
+            if index != node.model:
+                self._served_models()[node.id] = index
+            if response.coalesced:
+                with self._outputs_lock:
+                    self.outputs.coalesced_calls += 1
+            elif speculation is not None:
+                speculation.input_size += response.input_size
+                speculation.output_size += response.output_size
+            return response
+
+    def _call_model(self, node: GraphNode, candidates: list[int], body: dict[str, Any],
+                    on_chunk: Callable[[LLmStreamChunk | None], None] | None = None) -> tuple[LLmResponse, int]:
+        """Call candidates[0], hedging with a duplicate when the node has a hedge policy.
+
+        Without enough latency samples (or without node.hedge) this is a plain
+        call.  Otherwise the call gets the model's latency percentile to finish;
+        past it a duplicate goes to the same model, or to the next candidate
+        with target "fallback", and the first successful completion wins.  The
+        primary runs on its own thread, so it is sent at once; duplicates
+        share the hedge pool.  The loser cannot be interrupted mid-request: a
+        duplicate still queued is cancelled, otherwise the loser is ignored,
+        and its tokens are added to the hedge_* totals of CompiledOutput when
+        it completes.  Returns the response and
+        the index of the model that produced it.
+
+        Streamed calls (on_chunk, a compile_iter() consumer, a speculative
+        node) are never hedged: their chunks must reach the caller as they
+        arrive, and a speculative stream must stay cancellable.
+        """
+        index = candidates[0]
+        client = self.clients[index]
+        # Speculative calls are streamed so a blocking guard can stop them mid-answer
+        streaming = (on_chunk is not None or self._event_sink is not None
+                     or isinstance(self._scope(), _SpeculativeScope))
+        if streaming and hasattr(client, "stream"):
+            return self._stream_call(node, client, body, on_chunk), index
+        hedge = node.hedge
+        delay = client.latency.percentile(hedge.percentile, hedge.min_samples) if hedge is not None else None
+        if delay is None:
+            return client.complete(**body), index
+
+        # The primary gets its own thread so it is sent at once; only duplicates
+        # share the hedge pool, where they may wait behind earlier losers
+        primary = _run_in_thread(lambda: client.complete(**body), name="kegal-hedge-primary")
+        try:
+            return primary.result(timeout=delay), index
+        except FutureTimeoutError:
+            pass
+
+        alt = candidates[1] if hedge.target == "fallback" and len(candidates) > 1 else index
+        logger.info(_c(f"   ⧉ {node.id}: no answer after p{hedge.percentile:g}={delay:.2f}s — "
+                       f"hedging on model {alt}", "90"))
+        outputs = self.outputs
+        with self._outputs_lock:
+            outputs.hedged_calls += 1
+        # The duplicate must not coalesce with the very call it is hedging
+        duplicate = self._hedge_executor().submit(self.clients[alt].complete, coalesce=False, **body)
+        futures: dict[Future, int] = {primary: index, duplicate: alt}
+
+        pending = set(futures)
+        error: BaseException | None = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            # Prefer the primary when both finished together
+            for future in sorted(done, key=lambda f: f is not primary):
+                if future.exception() is not None:
+                    error = error or future.exception()
+                    continue
+                for loser in futures:
+                    if loser is not future:
+                        loser.cancel()
+                        loser.add_done_callback(lambda f: self._record_hedge_loser(outputs, f))
+                return future.result(), futures[future]
+        raise error
+
+    def _stream_call(self, node: GraphNode, client: LlmHandler, body: dict[str, Any],
+                     on_chunk: Callable[[LLmStreamChunk | None], None] | None = None) -> LLmResponse:
+        """Stream one call, emitting a TokenDeltaEvent per delta; returns the final response.
+
+        A speculative call is abandoned at the next chunk once its speculation
+        is cancelled: the stream is closed and _SpeculationCancelled raised.
+        """
+        scope = self._scope()
+        cancelled = scope.cancelled if isinstance(scope, _SpeculativeScope) else None
+        response: LLmResponse | None = None
+        stream = client.stream(**body)
+        try:
+            for chunk in stream:
+                if cancelled is not None and cancelled.is_set():
+                    close = getattr(stream, "close", None)
+                    if close is not None:
+                        close()
+                    raise _SpeculationCancelled(node.id)
+                if chunk.delta:
+                    self._emit(TokenDeltaEvent(node_id=node.id, delta=chunk.delta))
+                if on_chunk is not None:
+                    on_chunk(chunk)
+                if chunk.response is not None:
+                    response = chunk.response
+        except _SpeculationCancelled:
+            raise
+        except Exception:
+            if on_chunk is not None:
+                on_chunk(None)
+            raise
+        if response is None:
+            raise RuntimeError(f"Node '{node.id}': model stream ended without a final response")
+        return response
+
+    def _hedge_executor(self) -> ThreadPoolExecutor:
+        with self._outputs_lock:
+            pool = self._hedge_pool
+            if pool is None:
+                pool = self._hedge_pool = ThreadPoolExecutor(thread_name_prefix="kegal-hedge")
+            return pool
+
+    def _record_hedge_loser(self, outputs: CompiledOutput, future: Future) -> None:
+        """Charge the tokens of a losing hedged call to the run it belonged to."""
+        if future.cancelled() or future.exception() is not None:
+            return
+        response: LLmResponse = future.result()
+        with self._outputs_lock:
+            outputs.hedge_input_size += response.input_size
+            outputs.hedge_output_size += response.output_size
+
     def _run_tool_loop(self, node: GraphNode, model_body: dict[str, Any]) -> LLmResponse:
         """Call the LLM and execute tool calls until the model returns a final answer."""
-        client = self.clients[node.model]
         # Keep a mutable copy so we can inject tool results into history
         body = dict(model_body)
         tool_history: list[LLmMessage] = list(body.get("chat_history") or [])
 
         original_user_message = body.get("user_message", "")
         accumulated_tool_results: list[str] = []
+        media_policy = node.media_policy
+        has_media = any(k in body for k in _MEDIA_KEYS)
+
+        # Cached media: the user message (with the attachments pinned to it) sits in
+        # history from the first call, so every call shares the same cacheable prefix
+        if media_policy == "cached" and has_media and original_user_message:
+            tool_history.insert(0, LLmMessage(role="user", content=original_user_message))
+            body.pop("user_message", None)
+            body["media_turn"] = 0
+
+        # Tokens of the tool-calling turns: every turn is billed, so the node's
+        # response carries the sum of all its calls
+        spent = [0, 0, 0]
+
+        def finish(response: LLmResponse) -> LLmResponse:
+            response.input_size += spent[0]
+            response.output_size += spent[1]
+            response.cached_input_size += spent[2]
+            if accumulated_tool_results:
+                response.tool_results = accumulated_tool_results
+            return response
 
         MAX_ITERATIONS = node.max_tool_calls if node.max_tool_calls is not None else 10
         for iteration in range(MAX_ITERATIONS):
             if tool_history:
                 body["chat_history"] = tool_history
 
-            response: LLmResponse = client.complete(**body)
+            response: LLmResponse = self._complete(node, **body)
 
             # No tool calls → final answer
             if not response.tools:
-                if accumulated_tool_results:
-                    response.tool_results = accumulated_tool_results
-                return response
+                return finish(response)
+            spent[0] += response.input_size
+            spent[1] += response.output_size
+            spent[2] += response.cached_input_size
 
             # On first tool call: move the user message into history so it isn't
             # duplicated on subsequent turns, but remains visible to the model.
-            if iteration == 0 and original_user_message:
-                tool_history.insert(0, LLmMessage(role="user", content=original_user_message))
+            if iteration == 0 and "user_message" in body and original_user_message:
+                content = original_user_message
+                if media_policy == "first_turn" and has_media:
+                    content += self._media_note(body)
+                tool_history.insert(0, LLmMessage(role="user", content=content))
                 body.pop("user_message", None)
+            if iteration == 0 and media_policy == "first_turn":
+                for key in _MEDIA_KEYS:
+                    body.pop(key, None)
 
             # Execute each tool call and collect results
             for tool_call in response.tools:
+                self._emit(ToolCallEvent(node_id=node.id, name=tool_call.name, parameters=tool_call.parameters))
                 brief = self._brief_tool_params(tool_call.parameters)
-                tag = "[mcp]" if self._mcp_server_for_tool(tool_call.name, node) else "[py]"
-                logger.info(_c(f"   ⟶  {tag} {tool_call.name}({brief})", "34"))
-                result = self._execute_tool_call(tool_call.name, tool_call.parameters, node)
+                if tool_call.name == EXPAND_TOOL_NAME:
+                    logger.info(_c(f"   ⟶  [kegal] {tool_call.name}({brief})", "34"))
+                    result = self._expand_tools(node, body, str(tool_call.parameters.get("query", "")))
+                else:
+                    tag = "[mcp]" if self._mcp_server_for_tool(tool_call.name, node) else "[py]"
+                    logger.info(_c(f"   ⟶  {tag} {tool_call.name}({brief})", "34"))
+                    result = self._execute_tool_call(tool_call.name, tool_call.parameters, node)
                 result_preview = result[:120] + ("…" if len(result) > 120 else "")
                 logger.info(_c(f"   ↩  {result_preview}", "90"))
                 accumulated_tool_results.append(result)
@@ -1174,7 +1997,7 @@ class Compiler:
                 ))
                 tool_history.append(LLmMessage(
                     role="user",
-                    content=f"[tool_result] {tool_call.name}: {result}"
+                    content=f"[tool_result] {tool_call.name}: {self._shape_observation(node, tool_call.name, result)}"
                 ))
 
         logger.warning(f"Node '{node.id}' hit tool loop limit ({MAX_ITERATIONS} iterations)")
@@ -1182,10 +2005,69 @@ class Compiler:
         # from the accumulated tool history rather than returning pending tool calls.
         final_body = {k: v for k, v in body.items() if k != "tools_data"}
         final_body["chat_history"] = tool_history
-        response = client.complete(**final_body)
-        if accumulated_tool_results:
-            response.tool_results = accumulated_tool_results
-        return response
+        return finish(self._complete(node, **final_body))
+
+    @staticmethod
+    def _media_note(body: dict[str, Any]) -> str:
+        """Marker left on a user message whose attachments are no longer resent."""
+        images = len(body.get("imgs_b64") or [])
+        documents = len(body.get("pdfs_b64") or [])
+        parts = [f"{n} {kind}{'s' if n != 1 else ''}"
+                 for n, kind in ((images, "image"), (documents, "document")) if n]
+        return f"\n\n[{' and '.join(parts)} attached to this message on the first turn]"
+
+    def _shape_observation(self, node: GraphNode, source: str, text: str) -> str:
+        """Apply node's observation policy for source (a tool or agent name) to text.
+
+        Text within the policy's max_chars, or without a policy, is returned
+        unchanged. Strategies that cannot apply (non-JSON text for
+        "extract", a failed summarizer call) fall back to truncation.
+        """
+        policies = node.observations
+        if not policies:
+            return text
+        policy = policies.get(source) or policies.get("*")
+        if policy is None or len(text) <= policy.max_chars:
+            return text
+
+        shaped: str | None = None
+        if policy.strategy == "extract":
+            shaped = extract_observation(text, policy.fields or [])
+        elif policy.strategy == "summarize":
+            shaped = self._summarize_observation(node, source, text, policy)
+        elif policy.strategy == "blackboard":
+            return self._spill_observation(source, text, policy)
+        if shaped is None:
+            shaped = text
+        shaped = truncate_observation(shaped, policy.max_chars, policy.head_ratio)
+        logger.info(_c(f"   ⤓  {source}: observation shrunk {len(text)} → {len(shaped)} chars "
+                       f"({policy.strategy})", "90"))
+        return shaped
+
+    def _summarize_observation(self, node: GraphNode, source: str, text: str,
+                               policy: NodeObservation) -> str | None:
+        model = policy.summary_model if policy.summary_model is not None else node.model
+        try:
+            response = self.clients[model].complete(
+                system_prompt=_DEFAULT_OBSERVATION_SUMMARY_PROMPT,
+                user_message=f"Output of '{source}' (condense to at most {policy.max_chars} characters):\n\n{text}",
+                temperature=0.0,
+                max_tokens=node.max_tokens,
+            )
+        except Exception as e:
+            logger.warning(f"Node '{node.id}': summarizing the output of '{source}' failed ({e}) — truncating")
+            return None
+        return "\n".join(response.messages) if response.messages else None
+
+    def _spill_observation(self, source: str, text: str, policy: NodeObservation) -> str:
+        """Write the full payload to the policy's board and return a preview with a reference to it."""
+        ref = hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+        self._write_to_board(policy.board, f"### observation {ref} — {source}\n\n{text}")
+        handle = (f"\n[full output of {len(text)} characters saved to blackboard '{policy.board}' "
+                  f"under 'observation {ref}']")
+        preview = truncate_observation(text, max(policy.max_chars - len(handle), 1), policy.head_ratio)
+        logger.info(_c(f"   ⤓  {source}: {len(text)} chars moved to blackboard '{policy.board}' ({ref})", "90"))
+        return preview + handle
 
     # -------------------------------------------------------------------------
     # ReAct loop
@@ -1194,7 +2076,8 @@ class Compiler:
     def _run_react_loop(self, controller_edge: GraphEdge, node: GraphNode) -> None:
         """Execute the ReAct reasoning loop for a controller node."""
         react_cfg = node.react or NodeReact()
-        client = self.clients[node.model]
+        self._reset_served_model(node)
+        self._emit(NodeStartedEvent(node_id=node.id))
 
         # Build base body (system_prompt, images, docs, etc.) then extract
         base_body = self._build_model_body(node)
@@ -1209,18 +2092,24 @@ class Compiler:
 
         # Conversation buffer: grows across iterations
         conversation: list[LLmMessage] = list(base_body.pop("chat_history", None) or [])
+        media_anchor: LLmMessage | None = None
         if initial_user_msg:
-            conversation.append(LLmMessage(role="user", content=initial_user_msg))
+            media_anchor = LLmMessage(role="user", content=initial_user_msg)
+            conversation.append(media_anchor)
 
         # Carry-over fields for each LLM call
         call_extras: dict[str, Any] = {
-            k: base_body[k] for k in ("structured_output", "imgs_b64", "pdfs_b64")
+            k: base_body[k] for k in ("structured_output", *_MEDIA_KEYS)
             if k in base_body
         }
+        media_policy = node.media_policy
+        has_media = any(k in call_extras for k in _MEDIA_KEYS)
 
         trace_iters: list[ReactIteration] = []
+        ledger = _DispatchLedger(react_cfg.memoize_agents, react_cfg.max_repeated_dispatches)
         total_in = 0
         total_out = 0
+        total_cached = 0
         done = False
         final_answer: str | None = None
         start = time.time()
@@ -1230,10 +2119,47 @@ class Compiler:
             f"(max_iterations={react_cfg.max_iterations}) ──────────────────────", "1;38;5;208"
         ))
 
+        background_compact = react_cfg.compact and react_cfg.compact_background
+        pending_compaction: tuple[Future, int] | None = None
+
         for iteration in range(react_cfg.max_iterations):
             logger.info(_c(f"[ReAct] ┌─ iteration {iteration + 1}/{react_cfg.max_iterations}", "1;38;5;208"))
 
-            response = client.complete(
+            # Swap in a background summary at the iteration boundary, if it is ready
+            if pending_compaction is not None and pending_compaction[0].done():
+                self._apply_background_compaction(conversation, pending_compaction)
+                pending_compaction = None
+
+            route = None
+            if react_cfg.early_dispatch:
+                def start_early(agent_name: str, agent_input: str
+                                ) -> tuple[_SpeculativeScope, Future, tuple | None] | None:
+                    edge = self._find_react_agent_edge(controller_edge, agent_name)
+                    if edge is None or ledger.exhausted(agent_name, agent_input):
+                        return None
+                    # Keyed on the boards as the agent finds them, as on the normal path
+                    key = self._agent_memo_key(edge, agent_input) if ledger.memo is not None else None
+                    if key is not None and key in ledger.memo:
+                        return None
+                    if not self._early_dispatchable(edge):
+                        return None
+                    logger.info(_c(f"[ReAct] │  → dispatching '{agent_name}' early", "34"))
+                    scope = _SpeculativeScope(self, [agent_input])
+                    return scope, _run_in_thread(self._run_react_agent, edge, agent_input, scope), key
+                route = _EarlyRoute(start_early)
+
+            # Cached media stay pinned to the initial user message, wherever it now sits
+            # (compaction may have folded it into a summary: then they trail as usual)
+            if media_policy == "cached" and has_media:
+                anchor = next((i for i, m in enumerate(conversation) if m is media_anchor), None)
+                if anchor is None:
+                    call_extras.pop("media_turn", None)
+                else:
+                    call_extras["media_turn"] = anchor
+
+            response = self._complete(
+                node,
+                on_chunk=route,
                 system_prompt=system_prompt,
                 user_message=None,
                 chat_history=conversation,
@@ -1244,6 +2170,13 @@ class Compiler:
 
             total_in += response.input_size
             total_out += response.output_size
+            total_cached += response.cached_input_size
+
+            if iteration == 0 and media_policy == "first_turn" and has_media:
+                if media_anchor is not None:
+                    media_anchor.content += self._media_note(call_extras)
+                for key in _MEDIA_KEYS:
+                    call_extras.pop(key, None)
 
             routing = response.json_output or {}
             next_agent = (routing.get("next_agent") or "").strip() or None
@@ -1252,11 +2185,27 @@ class Compiler:
             agent_input_str = routing.get("agent_input") or reasoning or ""
             if done:
                 final_answer = routing.get("final_answer") or reasoning
+            dispatches = (self._react_dispatches(routing, agent_input_str)
+                          if react_cfg.parallel_dispatch else [])
+
+            # Reconcile an agent started while the decision was streaming
+            early_output: str | None = None
+            if route is not None and route.future is not None:
+                confirmed = (not done and not dispatches and next_agent == route.agent
+                             and agent_input_str == route.agent_input)
+                if confirmed:
+                    early_output = self._commit_early_dispatch(route.scope, route.future)
+                else:
+                    self._discard_early_dispatch(route.scope, route.future)
+                    logger.info(_c(
+                        f"[ReAct] │  early dispatch of '{route.agent}' discarded — "
+                        f"final decision differs", "90"))
 
             if reasoning:
                 logger.info(_c(f"[ReAct] │  reasoning  : {reasoning}", "90"))
+            routed = ", ".join(name for name, _ in dispatches) if dispatches else next_agent
             logger.info(_c(
-                f"[ReAct] │  next_agent : {next_agent or '—'}   done={done}   "
+                f"[ReAct] │  next_agent : {routed or '—'}   done={done}   "
                 f"tokens in={response.input_size} out={response.output_size}", "90"
             ))
 
@@ -1272,6 +2221,20 @@ class Compiler:
                 logger.info(_c(f"[ReAct] └─ done ✓", "1;36"))
                 break
 
+            # Summarize older turns while the agent runs
+            if background_compact and pending_compaction is None:
+                pending_compaction = self._start_background_compaction(conversation, node, react_cfg, response)
+
+            if dispatches:
+                if not self._run_react_dispatches(controller_edge, dispatches, iteration, reasoning,
+                                                  response, react_cfg, ledger, trace_iters, conversation):
+                    break
+                if react_cfg.compact and not background_compact:
+                    self._maybe_compact(
+                        conversation, node, react_cfg.compact_threshold, response
+                    )
+                continue
+
             if not next_agent:
                 logger.warning(
                     f"[ReAct] └─ no next_agent and done=False — stopping early"
@@ -1287,15 +2250,38 @@ class Compiler:
                 )
                 break
 
-            logger.info(_c(f"[ReAct] │  → dispatching '{next_agent}'", "34"))
-            logger.info(_c(
-                f"[ReAct] │    input : {agent_input_str[:120]}"
-                + ("…" if len(agent_input_str) > 120 else ""), "90"))
-            agent_output = self._run_react_agent(agent_edge, agent_input_str)
+            if ledger.exhausted(next_agent, agent_input_str):
+                logger.warning(
+                    f"[ReAct] └─ '{next_agent}' requested with the same input more than "
+                    f"{ledger.max_repeats} time(s) — stopping"
+                )
+                break
+            ledger.record(next_agent, agent_input_str)
+
+            if early_output is not None:
+                # The early agent's board writes are already applied: use the key taken before it ran
+                memo_key = route.memo_key
+            else:
+                memo_key = self._agent_memo_key(agent_edge, agent_input_str) if ledger.memo is not None else None
+            cached = early_output is None and memo_key is not None and memo_key in ledger.memo
+            if early_output is not None:
+                agent_output = early_output
+            elif cached:
+                agent_output = ledger.memo[memo_key]
+                logger.info(_c(f"[ReAct] │  → '{next_agent}' already ran with this input — reusing its output", "34"))
+            else:
+                logger.info(_c(f"[ReAct] │  → dispatching '{next_agent}'", "34"))
+                logger.info(_c(
+                    f"[ReAct] │    input : {agent_input_str[:120]}"
+                    + ("…" if len(agent_input_str) > 120 else ""), "90"))
+                agent_output = self._run_react_agent(agent_edge, agent_input_str)
+            if memo_key is not None:
+                ledger.memo[memo_key] = agent_output
             logger.info(_c(
                 f"[ReAct] │    output: {agent_output[:120]}"
                 + ("…" if len(agent_output) > 120 else ""), "90"))
 
+            observation = self._shape_observation(node, next_agent, agent_output)
             trace_iters.append(ReactIteration(
                 iteration=iteration,
                 agent_name=next_agent,
@@ -1304,14 +2290,17 @@ class Compiler:
                 agent_input=agent_input_str,
                 controller_input_tokens=response.input_size,
                 controller_output_tokens=response.output_size,
+                dispatched_early=early_output is not None,
+                cached=cached,
+                observation=observation if observation != agent_output else None,
             ))
 
             conversation.append(LLmMessage(
                 role="user",
-                content=f"[observation from {next_agent}]\n{agent_output}",
+                content=f"[observation from {next_agent}]\n{observation}",
             ))
 
-            if react_cfg.compact:
+            if react_cfg.compact and not background_compact:
                 self._maybe_compact(
                     conversation, node, react_cfg.compact_threshold, response
                 )
@@ -1321,9 +2310,11 @@ class Compiler:
             )
 
         elapsed = time.time() - start
+        # Parallel dispatch records one ReactIteration per agent of an iteration
+        iterations = len({it.iteration for it in trace_iters})
         logger.info(_c(
             f"[ReAct] ── controller '{node.id}' finished — "
-            f"iterations={len(trace_iters)}  done={done}  "
+            f"iterations={iterations}  done={done}  "
             f"total tokens in={total_in} out={total_out}  "
             f"elapsed={elapsed:.1f}s ────────────────────────", "1;38;5;208"
         ))
@@ -1332,11 +2323,12 @@ class Compiler:
             messages=[final_answer] if final_answer else None,
             json_output={
                 "done": done,
-                "iterations": len(trace_iters),
+                "iterations": iterations,
                 "final_answer": final_answer,
             },
             input_size=total_in,
             output_size=total_out,
+            cached_input_size=total_cached,
         )
 
         enable_history = self._chat_history_check(node)
@@ -1355,15 +2347,237 @@ class Compiler:
         self._react_trace[node.id] = ReactTrace(
             controller_id=node.id,
             iterations=trace_iters,
-            total_iterations=len(trace_iters),
+            total_iterations=iterations,
             done=done,
             final_answer=final_answer,
             total_controller_input_tokens=total_in,
             total_controller_output_tokens=total_out,
         )
 
-    def _run_react_agent(self, agent_edge: GraphEdge, agent_input: str) -> str:
-        """Run an agent subgraph in isolation and return its text output."""
+    @staticmethod
+    def _react_dispatches(routing: dict[str, Any], default_input: str) -> list[tuple[str, str]]:
+        """(agent, input) pairs from the controller's "dispatches" list; empty when absent."""
+        raw = routing.get("dispatches")
+        if not isinstance(raw, list):
+            return []
+        dispatches: list[tuple[str, str]] = []
+        for item in raw:
+            agent = item.get("agent") if isinstance(item, dict) else None
+            if not isinstance(agent, str) or not agent.strip():
+                logger.warning(f"[ReAct] │  ignoring malformed dispatch {item!r}")
+                continue
+            agent_input = item.get("input") or default_input
+            if not isinstance(agent_input, str):
+                logger.warning(f"[ReAct] │  ignoring dispatch to '{agent.strip()}' with non-string input {agent_input!r}")
+                continue
+            dispatches.append((agent.strip(), agent_input))
+        return dispatches
+
+    def _run_react_dispatches(
+        self,
+        controller_edge: GraphEdge,
+        dispatches: list[tuple[str, str]],
+        iteration: int,
+        reasoning: str | None,
+        response: LLmResponse,
+        react_cfg: NodeReact,
+        ledger: _DispatchLedger,
+        trace_iters: list[ReactIteration],
+        conversation: list[LLmMessage],
+    ) -> bool:
+        """Run one iteration's dispatches concurrently and append their observations.
+
+        Observations are appended in dispatch order, as a single user turn.
+        Returns False, running nothing, when an agent is not in the react list
+        or a dispatch exceeds the repeat limit.
+        """
+        edges: list[GraphEdge] = []
+        for name, agent_input in dispatches:
+            edge = self._find_react_agent_edge(controller_edge, name)
+            if edge is None:
+                available = [e.node for e in (controller_edge.react or [])]
+                logger.warning(
+                    f"[ReAct] └─ dispatch '{name}' not in react list {available} — stopping"
+                )
+                return False
+            if ledger.exhausted(name, agent_input):
+                logger.warning(
+                    f"[ReAct] └─ '{name}' requested with the same input more than "
+                    f"{ledger.max_repeats} time(s) — stopping"
+                )
+                return False
+            edges.append(edge)
+        for name, agent_input in dispatches:
+            ledger.record(name, agent_input)
+
+        # Memo hits and duplicates within the batch are not run again
+        keys = [self._agent_memo_key(edge, agent_input) if ledger.memo is not None else None
+                for edge, (_, agent_input) in zip(edges, dispatches)]
+        cached = [key is not None and key in ledger.memo for key in keys]
+        to_run: dict[Any, tuple[GraphEdge, str]] = {}
+        for position, (edge, (name, agent_input)) in enumerate(zip(edges, dispatches)):
+            if cached[position]:
+                logger.info(_c(f"[ReAct] │  → '{name}' already ran with this input — reusing its output", "34"))
+                continue
+            slot = keys[position] if keys[position] is not None else position
+            if slot in to_run:
+                cached[position] = True     # filled from the memo once the batch has run
+                continue
+            logger.info(_c(f"[ReAct] │  → dispatching '{name}'", "34"))
+            logger.info(_c(
+                f"[ReAct] │    input : {agent_input[:120]}"
+                + ("…" if len(agent_input) > 120 else ""), "90"))
+            to_run[slot] = (edge, agent_input)
+        results = dict(zip(to_run, self._run_react_agents(list(to_run.values()),
+                                                          react_cfg.max_parallel_agents)))
+        if ledger.memo is not None:
+            ledger.memo.update(results)
+        agent_outputs = [
+            ledger.memo[key] if cached[position] else results[key if key is not None else position]
+            for position, key in enumerate(keys)
+        ]
+
+        controller = self.nodes[controller_edge.node]
+        observations: list[str] = []
+        for position, ((name, agent_input), agent_output) in enumerate(zip(dispatches, agent_outputs)):
+            logger.info(_c(
+                f"[ReAct] │    {name} output: {agent_output[:120]}"
+                + ("…" if len(agent_output) > 120 else ""), "90"))
+            observation = self._shape_observation(controller, name, agent_output)
+            # Controller tokens are counted once per iteration, on its first dispatch
+            trace_iters.append(ReactIteration(
+                iteration=iteration,
+                agent_name=name,
+                agent_output=agent_output,
+                reasoning=reasoning,
+                agent_input=agent_input,
+                controller_input_tokens=response.input_size if position == 0 else 0,
+                controller_output_tokens=response.output_size if position == 0 else 0,
+                cached=cached[position],
+                observation=observation if observation != agent_output else None,
+            ))
+            observations.append(f"[observation from {name}]\n{observation}")
+
+        conversation.append(LLmMessage(role="user", content="\n\n".join(observations)))
+        return True
+
+    def _agent_memo_key(self, agent_edge: GraphEdge, agent_input: str) -> tuple[str, str, tuple[str, ...]]:
+        """Memo key of a dispatch: agent, normalized input and the version of every board its nodes read."""
+        node_ids: set[str] = set()
+        self._collect_subgraph_ids(agent_edge, node_ids)
+        board_ids = sorted({
+            self.nodes[nid].blackboard.id for nid in node_ids
+            if nid in self.nodes and self.nodes[nid].blackboard is not None and self.nodes[nid].blackboard.read
+        })
+        versions = tuple(
+            hashlib.sha256(self._assemble_board(board_id).encode("utf-8")).hexdigest() for board_id in board_ids
+        )
+        return agent_edge.node, _normalize_agent_input(agent_input), versions
+
+    def _run_react_agents(self, dispatches: list[tuple[GraphEdge, str]],
+                          max_parallel: int | None = None) -> list[str]:
+        """Run agent subgraphs concurrently, each in its own scope; outputs in dispatch order."""
+        if len(dispatches) == 1:
+            return [self._run_react_agent(*dispatches[0])]
+        # Restore the pre-batch boards once every agent has finished, not per agent
+        saved_boards = dict(self._boards)
+        workers = min(len(dispatches), max_parallel or len(dispatches))
+        try:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="kegal-react") as executor:
+                futures = [executor.submit(self._run_react_agent, edge, agent_input, restore_boards=False)
+                           for edge, agent_input in dispatches]
+                return [future.result() for future in futures]
+        finally:
+            self._boards = saved_boards
+
+    def _early_dispatchable(self, agent_edge: GraphEdge) -> bool:
+        """True when an agent can start before the controller's decision is final.
+
+        An early agent runs in a _SpeculativeScope, so its blackboard writes
+        are held back until the dispatch is confirmed.  Agents whose nodes
+        call tools (a tool call cannot be taken back) or read a board (or an
+        import of one) that another of their nodes writes are not dispatched
+        early.
+        """
+        node_ids: set[str] = set()
+        self._collect_subgraph_ids(agent_edge, node_ids)
+        agent_nodes = [self.nodes[nid] for nid in node_ids if nid in self.nodes]
+        if any(n.tools or n.mcp_servers for n in agent_nodes):
+            return False
+        written_boards = {n.blackboard.id for n in agent_nodes if n.blackboard is not None and n.blackboard.write}
+        for n in agent_nodes:
+            if n.blackboard is not None and n.blackboard.read:
+                entry = self._board_entries.get(n.blackboard.id)
+                read = {n.blackboard.id, *(entry.imports if entry is not None else [])}
+                if read & written_boards:
+                    return False
+        return True
+
+    def _commit_early_dispatch(self, scope: _SpeculativeScope, future: Future) -> str:
+        """Wait for a confirmed early agent, apply its blackboard writes and events; return its output."""
+        agent_output = future.result()
+        for board_id, content in scope.board_writes:
+            self._write_to_board(board_id, content)
+        for event in scope.events:
+            self._emit(event)
+        return agent_output
+
+    def _discard_early_dispatch(self, scope: _SpeculativeScope, future: Future) -> None:
+        """Cancel an early agent without waiting for it; its tokens are reported as wasted once it stops.
+
+        Its streamed calls stop at their next chunk; a call in flight to a
+        client that cannot stream runs to completion and is counted then.
+        """
+        scope.cancelled.set()
+        outputs = self.outputs
+
+        def report(_future: Future) -> None:
+            with self._outputs_lock:
+                outputs.early_dispatch_input_size += scope.input_size
+                outputs.early_dispatch_output_size += scope.output_size
+
+        future.add_done_callback(report)
+
+    def _run_agent_level(self, scope: _AgentScope, node_ids: list[str]) -> None:
+        """Run the nodes of one agent level concurrently, keeping their effects in node_ids order.
+
+        Message pipe entries and blackboard writes are buffered per node and
+        applied once the level completes, and the level's outputs are sorted,
+        so the agent's result never depends on which node finishes first.
+        """
+        scope.pipe_buffer = {nid: [] for nid in node_ids}
+        scope.board_buffer = {}
+        for nid in node_ids:
+            node = self.nodes[nid]
+            if node.blackboard is not None and node.blackboard.write:
+                scope.board_buffer.setdefault(node.blackboard.id, {})[nid] = ""
+        first_output = len(scope.outputs.nodes)
+        try:
+            self._run_parallel(node_ids)
+        finally:
+            pipe_buffer, board_buffer = scope.pipe_buffer, scope.board_buffer
+            scope.pipe_buffer = scope.board_buffer = None
+            order = {nid: i for i, nid in enumerate(node_ids)}
+            scope.outputs.nodes[first_output:] = sorted(
+                scope.outputs.nodes[first_output:], key=lambda output: order[output.node_id]
+            )
+            for nid in node_ids:
+                scope.message_passing.extend(pipe_buffer[nid])
+            for board_id, node_writes in board_buffer.items():
+                for text in node_writes.values():
+                    if text:
+                        self._write_to_board(board_id, text)
+
+    def _run_react_agent(self, agent_edge: GraphEdge, agent_input: str,
+                         speculation: _SpeculativeScope | None = None, restore_boards: bool = True) -> str:
+        """Run an agent subgraph in isolation and return its text output.
+
+        With speculation (an early dispatch) the agent runs in that scope:
+        its blackboard writes and events are held there for the caller to
+        commit, and the boards are left untouched when it ends.  With
+        restore_boards False (an agent of a concurrent batch) the caller
+        restores the boards once every agent of the batch has finished.
+        """
         # Guard: agent subgraphs must not themselves contain react controllers.
         # Nested controllers would invalidate the state-swap isolation model.
         for nid in (agent_edge.react or []):
@@ -1404,18 +2618,24 @@ class Compiler:
         collect(agent_edge)
         levels = self._topological_levels(local_deps)
 
-        # Swap global state for isolated execution
-        saved_mp = self.message_passing
-        saved_out = self.outputs
-        saved_boards = dict(getattr(self, "_boards", {}))  # shallow copy — values are immutable strings
-        self.message_passing = [agent_input] if agent_input else []
+        # Isolated execution: message_passing and outputs resolve to this scope on this thread
+        saved_boards = dict(self._boards)  # shallow copy — values are immutable strings
+        scope = speculation if speculation is not None else _AgentScope(self, [agent_input] if agent_input else [])
+        token = _agent_scope.set(scope)
         initial_mp_len = len(self.message_passing)
-        self.outputs = CompiledOutput()
 
         try:
             for level in levels:
-                for nid in sorted(level):  # sequential — no concurrency in react agents
+                # Guards first, then the rest of the level concurrently, as in compile();
+                # pool threads inherit this agent's scope through _run_parallel
+                guard_ids = sorted(nid for nid in level if self._is_guard_node(self.nodes[nid]))
+                regular_ids = sorted(nid for nid in level if nid not in guard_ids)
+                for nid in guard_ids:
                     self._run_node(self.nodes[nid])
+                if len(regular_ids) > 1:
+                    self._run_agent_level(scope, regular_ids)
+                elif regular_ids:
+                    self._run_node(self.nodes[regular_ids[0]])
 
             # Result priority: new message_passing entries > last node response
             if len(self.message_passing) > initial_mp_len:
@@ -1441,9 +2661,9 @@ class Compiler:
                 )
                 result = agent_input
         finally:
-            self.message_passing = saved_mp
-            self.outputs = saved_out
-            if hasattr(self, "_boards"):
+            _agent_scope.reset(token)
+            # An early agent wrote no board, and may outlive the iteration that discarded it
+            if speculation is None and restore_boards:
                 self._boards = saved_boards
 
         return result
@@ -1456,45 +2676,92 @@ class Compiler:
         last_response: LLmResponse,
     ) -> None:
         """Compact the conversation buffer when it approaches the token budget."""
-        context_window = self.context_windows[node.model]
+        if not self._compaction_due(node, threshold, last_response):
+            return
+
+        summary = self._summarize_conversation(node, conversation)
+        if summary is not None:
+            conversation.clear()
+            conversation.append(
+                LLmMessage(role="user", content=f"[compacted state]\n{summary}")
+            )
+            logger.info(_c(f"[ReAct] │  conversation compacted", "90"))
+
+    def _compaction_due(self, node: GraphNode, threshold: float, last_response: LLmResponse) -> bool:
+        """True when the last controller prompt reached threshold × the model's context window."""
+        context_window = self.context_windows[self._serving_model(node)]
         if context_window is None:
             logger.warning(
                 f"[ReAct] Node '{node.id}': context_window not set — "
                 f"conversation compaction skipped (set 'context_window' on the model to enable)"
             )
-            return
+            return False
         limit = context_window
         if last_response.input_size < limit * threshold:
-            return
+            return False
 
         logger.info(_c(
             f"[ReAct] │  compacting conversation "
             f"({last_response.input_size}/{limit} tokens, "
             f"threshold={threshold:.0%})", "90"
         ))
+        return True
 
+    def _summarize_conversation(self, node: GraphNode, messages: list[LLmMessage]) -> str | None:
+        """Ask the controller's model for a dense state record of messages; None when it returns nothing."""
         compact_prompt = (
             self.react_compact_prompts[0]
             if self.react_compact_prompts
             else _DEFAULT_REACT_COMPACT_PROMPT
         )
 
-        client = self.clients[node.model]
-        compact_response = client.complete(
+        compact_response = self._complete(
+            node,
             system_prompt=compact_prompt.get("system"),
             user_message=compact_prompt.get("user"),
-            chat_history=conversation,
+            chat_history=messages,
             temperature=0.1,
             max_tokens=node.max_tokens,
         )
-
         if compact_response.messages:
-            compacted = "\n".join(compact_response.messages)
-            conversation.clear()
-            conversation.append(
-                LLmMessage(role="user", content=f"[compacted state]\n{compacted}")
-            )
-            logger.info(_c(f"[ReAct] │  conversation compacted", "90"))
+            return "\n".join(compact_response.messages)
+        return None
+
+    def _start_background_compaction(
+        self,
+        conversation: list[LLmMessage],
+        node: GraphNode,
+        react_cfg: NodeReact,
+        last_response: LLmResponse,
+    ) -> tuple[Future, int] | None:
+        """Summarize all but the recent turns on a background thread.
+
+        Returns (future, cut): once the future holds a summary, it replaces
+        conversation[:cut]. The cut is placed on an assistant turn, so the
+        summary (a user turn) keeps roles alternating. None when compaction
+        is not due or there are too few older turns to summarize.
+        """
+        cut = len(conversation) - react_cfg.compact_keep_recent
+        while cut > 0 and conversation[cut].role != "assistant":
+            cut -= 1
+        if cut < 2 or not self._compaction_due(node, react_cfg.compact_threshold, last_response):
+            return None
+        logger.info(_c(f"[ReAct] │  summarizing {cut} older message(s) in the background", "90"))
+        return _run_in_thread(self._summarize_conversation, node, list(conversation[:cut])), cut
+
+    @staticmethod
+    def _apply_background_compaction(conversation: list[LLmMessage], pending: tuple[Future, int]) -> None:
+        """Swap a finished background summary in for the turns it covers."""
+        future, cut = pending
+        try:
+            summary = future.result()
+        except Exception as e:
+            logger.warning(f"[ReAct] │  background compaction failed ({e}) — keeping the full conversation")
+            return
+        if summary is None:
+            return
+        conversation[:cut] = [LLmMessage(role="user", content=f"[compacted state]\n{summary}")]
+        logger.info(_c(f"[ReAct] │  conversation compacted — {cut} message(s) replaced by a summary", "90"))
 
     # -------------------------------------------------------------------------
     # Output helpers — react trace
@@ -1553,33 +2820,87 @@ class Compiler:
             return False
         return True
 
+    def _tool_index_for(self, node: GraphNode) -> _NodeToolIndex:
+        """Return the cached tool routing table for a node, building it on first use."""
+        cache = self._tool_index
+        index = cache.get(node.id)
+        if index is None:
+            index = self._build_tool_index(node)
+            # Invalidation swaps in a fresh dict, so an index built from a stale
+            # tool list lands in the discarded dict and is never served.
+            cache[node.id] = index
+        return index
+
+    def _build_tool_index(self, node: GraphNode) -> _NodeToolIndex:
+        static_tools: tuple[LLMTool, ...] = ()
+        if self._tools_check(node):
+            static_tools = tuple(compose_tools(self.tools, node.tools))
+
+        mcp_tools: list[LLMTool] = []
+        mcp_routes: dict[str, Any] = {}
+        for ref in (node.mcp_servers or []):
+            handler = self.mcp_handlers.get(ref.id)
+            if handler is None:
+                logger.error(f"MCP server '{ref.id}' not connected — skipping for node '{node.id}'")
+                continue
+            server_tools = handler.list_tools()
+            if ref.tools is not None:
+                server_tools = [t for t in server_tools if t.name in ref.tools]
+            mcp_tools.extend(server_tools)
+            for name in handler.tool_names():
+                if ref.tools is not None and name not in ref.tools:
+                    continue
+                # First server listed on the node wins, matching declaration order.
+                mcp_routes.setdefault(name, handler)
+
+        ranker = None
+        if node.tool_selection is not None:
+            ranker = ToolRanker([*static_tools, *mcp_tools], self.tool_embedder)
+
+        return _NodeToolIndex(
+            static_tools=static_tools,
+            mcp_tools=tuple(mcp_tools),
+            mcp_routes=mcp_routes,
+            ranker=ranker,
+        )
+
+    def _invalidate_tool_index(self) -> None:
+        """Drop all cached routing tables — called when an MCP tool list changes."""
+        self._tool_index = {}
+
     def _mcp_tools_for_node(self, node: GraphNode) -> list:
         """Return LLMTool list from all MCP servers assigned to this node."""
         if not node.mcp_servers:
             return []
-        tools = []
-        for ref in node.mcp_servers:
-            handler = self.mcp_handlers.get(ref.id)
-            if handler:
-                server_tools = handler.list_tools()
-                if ref.tools is not None:
-                    server_tools = [t for t in server_tools if t.name in ref.tools]
-                tools.extend(server_tools)
-            else:
-                logger.error(f"MCP server '{ref.id}' not connected — skipping for node '{node.id}'")
-        return tools
+        return list(self._tool_index_for(node).mcp_tools)
 
     def _mcp_server_for_tool(self, tool_name: str, node: GraphNode) -> McpHandler | None:
         """Return the McpHandler that owns the given tool name, for this node."""
         if not node.mcp_servers:
             return None
-        for ref in node.mcp_servers:
-            if ref.tools is not None and tool_name not in ref.tools:
-                continue
-            handler = self.mcp_handlers.get(ref.id)
-            if handler and tool_name in handler.tool_names():
-                return handler
-        return None
+        return self._tool_index_for(node).mcp_routes.get(tool_name)
+
+    def _select_tools(self, node: GraphNode, ranker: ToolRanker, body: dict[str, Any]) -> list[LLMTool]:
+        """Top-k tools for the node's prompt, plus the expand meta-tool if enabled."""
+        query = body.get("user_message") or body.get("system_prompt") or ""
+        selected = ranker.top_k(query, node.tool_selection.top_k)
+        logger.debug(
+            f"Node '{node.id}': tool selection kept {len(selected)}/{len(ranker.tools)} tools: "
+            f"{[t.name for t in selected]}"
+        )
+        if node.tool_selection.expand:
+            selected.append(EXPAND_TOOL)
+        return selected
+
+    def _expand_tools(self, node: GraphNode, body: dict[str, Any], query: str) -> str:
+        """Handle an EXPAND_TOOL call: add the next top-k matching tools to the loop's body."""
+        ranker = self._tool_index_for(node).ranker
+        offered = [t.name for t in body.get("tools_data") or []]
+        added = ranker.top_k(query, node.tool_selection.top_k, exclude=offered) if ranker else []
+        if not added:
+            return "No further tools are available."
+        body["tools_data"] = [*body["tools_data"], *added]
+        return "Now available: " + "; ".join(f"{t.name} — {t.description}" for t in added)
 
     def _compose_node_prompt(self, node):
         prompt_elements: dict[str, Any] = {
@@ -1626,10 +2947,10 @@ class Compiler:
         if self._documents_check(node):
             body["pdfs_b64"] = compose_documents(self.documents, node.documents)
 
-        all_tools = []
-        if self._tools_check(node):
-            all_tools.extend(compose_tools(self.tools, node.tools))
-        all_tools.extend(self._mcp_tools_for_node(node))
+        index = self._tool_index_for(node)
+        all_tools = [*index.static_tools, *index.mcp_tools]
+        if index.ranker is not None and len(all_tools) > node.tool_selection.top_k:
+            all_tools = self._select_tools(node, index.ranker, body)
         if all_tools:
             body["tools_data"] = all_tools
 
@@ -1641,19 +2962,21 @@ class Compiler:
         return body
 
     def _record_output(self, node, response: LLmResponse, compiled_time: float, enable_history: bool) -> None:
+        output = CompiledNodeOutput(
+            node_id=node.id,
+            response=response,
+            compiled_time=compiled_time,
+            show=node.show,
+            history=enable_history,
+            context_window=self.context_windows[self._serving_model(node)],
+            model=self._serving_model(node),
+        )
         with self._outputs_lock:
-            self.outputs.nodes.append(
-                CompiledNodeOutput(
-                    node_id=node.id,
-                    response=response,
-                    compiled_time=compiled_time,
-                    show=node.show,
-                    history=enable_history,
-                    context_window=self.context_windows[node.model],
-                )
-            )
+            self.outputs.nodes.append(output)
             self.outputs.input_size += response.input_size
             self.outputs.output_size += response.output_size
+            self.outputs.cached_input_size += response.cached_input_size
+        self._emit(NodeFinishedEvent(node_id=node.id, output=output))
 
     def _update_blackboard(self, node: GraphNode, response: LLmResponse) -> None:
         """Append node response to the board the node is assigned to write.
@@ -1663,6 +2986,8 @@ class Compiler:
         The buffer is pre-initialised in declaration order; after all Cat-2 threads
         join, _flush_blackboard_write_buffer writes the entries to the board in that
         order, making Cat-2 write order deterministic regardless of thread scheduling.
+        Inside a ReAct agent the buffer is the agent scope's, set by _run_agent_level
+        for every writer of a concurrent level.
 
         Outside the Cat-2 phase (buffer is None or node has no buffer entry),
         writes directly to the board under _blackboard_lock.
@@ -1673,8 +2998,9 @@ class Compiler:
             return
         board_id = node.blackboard.id
         new_content = "\n\n".join(response.messages)
-        # Cat-2 buffered phase: store instead of writing directly
-        buf = self._blackboard_write_buffer
+        # Cat-2 buffered phase (or a concurrent agent level): store instead of writing directly
+        scope = self._scope()
+        buf = scope.board_buffer if scope is not None else self._blackboard_write_buffer
         if (buf is not None
                 and board_id in buf
                 and node.id in buf[board_id]):
@@ -1685,6 +3011,10 @@ class Compiler:
 
     def _write_to_board(self, board_id: str, new_content: str) -> None:
         """Append new_content to a board under the blackboard lock."""
+        scope = self._scope()
+        if isinstance(scope, _SpeculativeScope):
+            scope.board_writes.append((board_id, new_content))
+            return
         with self._blackboard_lock:
             path = self._board_paths.get(board_id)
             # Always read from disk when available — keeps write consistent with
@@ -1746,15 +3076,22 @@ class Compiler:
             file_path.write_text(json.dumps(history, indent=2, ensure_ascii=False), encoding="utf-8")
 
     def _check_message_passing(self, response, node):
+        if not node.message_passing.output:
+            return
+        if response.messages is not None and len(response.messages) > 0:
+            entries = list(response.messages)
+        elif response.tool_results:
+            entries = list(response.tool_results)
+        elif response.json_output is not None:
+            entries = [response.json_output]
+        else:
+            return
+        scope = self._scope()
         with self._message_passing_lock:
-            if not node.message_passing.output:
-                return
-            if response.messages is not None and len(response.messages) > 0:
-                self.message_passing.extend(response.messages)
-            elif response.tool_results:
-                self.message_passing.extend(response.tool_results)
-            elif response.json_output is not None:
-                self.message_passing.append(response.json_output)
+            if scope is not None and scope.pipe_buffer is not None and node.id in scope.pipe_buffer:
+                scope.pipe_buffer[node.id] = entries
+            else:
+                self.message_passing.extend(entries)
 
     @staticmethod
     def _check_validation_gate(response: LLmResponse) -> bool:
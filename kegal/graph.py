@@ -10,12 +10,14 @@ from .llm.llm_model import LLMTool
 
 # Sub-module imports (also re-exported for backward compatibility)
 from .graph_mcp import GraphMcpServer
-from .graph_model import GraphModel
+from .graph_model import GraphModel, ModelRetryPolicy, ModelReplica, ModelConcurrency
 from .graph_react import NodeReact
 from .graph_edge import GraphEdge
 from .graph_blackboard import GraphBlackboard, BlackboardEntry, NodeBlackboardRef
 from .graph_history import ChatHistoryFile
-from .graph_node import NodePrompt, NodeMessagePassing, NodeBatchMessagePassing, NodeMcpServerRef, GraphNode
+from .graph_node import (
+    NodePrompt, NodeMessagePassing, NodeBatchMessagePassing, NodeMcpServerRef, NodeToolSelection, NodeHedging, NodeObservation, GraphNode,
+)
 
 
 class GraphInputData(BaseModel):
@@ -38,6 +40,9 @@ class Graph(BaseModel):
     batch_user_messages: list[str] | None = None
     retrieved_chunks: str | None = None
     blackboard: GraphBlackboard | None = None
+    # Start the nodes gated only by the first level's global guards while those
+    # guards run; their effects are kept back until every guard has passed
+    speculative_guards: bool = False
     nodes: list[GraphNode]
     edges: list[GraphEdge]
 
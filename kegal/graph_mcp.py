@@ -1,5 +1,5 @@
 import re
-from pydantic import BaseModel, field_validator
+from pydantic import BaseModel, field_validator, model_validator
 from typing import Literal
 
 # Characters that have special meaning in shells — reject them in the command name
@@ -9,13 +9,69 @@ _SHELL_SPECIAL = re.compile(r'[;&|`$<>(){}\[\]\n\r\t\\\'"]')
 
 class GraphMcpServer(BaseModel):
     id: str
-    transport: Literal["stdio", "sse"]
+    transport: Literal["stdio", "sse", "streamable_http"]
     # stdio transport
     command: str | None = None
     args: list[str] | None = None
     env: dict[str, str] | None = None
-    # sse transport
+    # sse / streamable_http transports
     url: str | None = None
+    # session pool: N stdio subprocesses / N SSE connections, least-busy dispatch
+    pool_size: int = 1
+    health_check_interval: float | None = None
+    # lazy start: connect on the first tool listing/call instead of at Compiler init;
+    # idle_timeout shuts a lazy server down after that many seconds without use
+    lazy: bool = False
+    idle_timeout: float | None = None
+    # reconnect a dropped session with exponential backoff (0 disables); calls cut off
+    # mid-flight are retried only for tools listed in idempotent_tools
+    max_reconnect_attempts: int = 5
+    reconnect_backoff: float = 0.5
+    idempotent_tools: list[str] | None = None
+
+    @field_validator("pool_size")
+    @classmethod
+    def _validate_pool_size(cls, v: int) -> int:
+        if v < 1:
+            raise ValueError(f"MCP server 'pool_size' must be >= 1, got {v}")
+        return v
+
+    @field_validator("health_check_interval")
+    @classmethod
+    def _validate_health_check_interval(cls, v: float | None) -> float | None:
+        if v is not None and v <= 0:
+            raise ValueError(f"MCP server 'health_check_interval' must be > 0 seconds, got {v}")
+        return v
+
+    @field_validator("idle_timeout")
+    @classmethod
+    def _validate_idle_timeout(cls, v: float | None) -> float | None:
+        if v is not None and v <= 0:
+            raise ValueError(f"MCP server 'idle_timeout' must be > 0 seconds, got {v}")
+        return v
+
+    @field_validator("max_reconnect_attempts")
+    @classmethod
+    def _validate_max_reconnect_attempts(cls, v: int) -> int:
+        if v < 0:
+            raise ValueError(f"MCP server 'max_reconnect_attempts' must be >= 0, got {v}")
+        return v
+
+    @field_validator("reconnect_backoff")
+    @classmethod
+    def _validate_reconnect_backoff(cls, v: float) -> float:
+        if v <= 0:
+            raise ValueError(f"MCP server 'reconnect_backoff' must be > 0 seconds, got {v}")
+        return v
+
+    @model_validator(mode="after")
+    def _validate_idle_timeout_requires_lazy(self) -> "GraphMcpServer":
+        if self.idle_timeout is not None and not self.lazy:
+            raise ValueError(
+                f"MCP server '{self.id}': 'idle_timeout' requires 'lazy: true' — "
+                f"an eager server is not restarted after an idle shutdown"
+            )
+        return self
 
     @field_validator("command")
     @classmethod
@@ -1,4 +1,92 @@
-from pydantic import BaseModel, SecretStr
+from typing import Literal
+
+from pydantic import BaseModel, SecretStr, field_validator, model_validator
+
+_SECRET_FIELDS = ("api_key", "aws_access_key", "aws_secret_key")
+
+
+class ModelRetryPolicy(BaseModel):
+    """Retry, backoff and circuit breaker settings applied by LlmHandler to every call of a model."""
+    max_attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+    # Retries allowed per call on average (token bucket refilled by every call)
+    retry_budget: float = 0.2
+    breaker_threshold: int = 5
+    breaker_cooldown: float = 30.0
+
+    @field_validator("max_attempts", "breaker_threshold")
+    @classmethod
+    def _validate_positive_int(cls, v: int, info) -> int:
+        if v < 1:
+            raise ValueError(f"'{info.field_name}' must be >= 1, got {v}")
+        return v
+
+    @field_validator("base_delay", "retry_budget", "breaker_cooldown")
+    @classmethod
+    def _validate_non_negative(cls, v: float, info) -> float:
+        if v < 0:
+            raise ValueError(f"'{info.field_name}' must be >= 0, got {v}")
+        return v
+
+    @model_validator(mode="after")
+    def _validate_delays(self) -> "ModelRetryPolicy":
+        if self.max_delay < self.base_delay:
+            raise ValueError(
+                f"'max_delay' ({self.max_delay}) must be >= 'base_delay' ({self.base_delay})"
+            )
+        return self
+
+
+class ModelConcurrency(BaseModel):
+    """Adaptive (AIMD) limit on concurrent calls to a model, driven by throttling signals."""
+    initial_limit: int = 4
+    min_limit: int = 1
+    max_limit: int = 32
+    decrease_factor: float = 0.5
+    # Rate-limit headers reporting less than this fraction of quota left count as throttling
+    low_remaining: float = 0.05
+
+    @field_validator("initial_limit", "min_limit", "max_limit")
+    @classmethod
+    def _validate_limit(cls, v: int, info) -> int:
+        if v < 1:
+            raise ValueError(f"'{info.field_name}' must be >= 1, got {v}")
+        return v
+
+    @field_validator("decrease_factor")
+    @classmethod
+    def _validate_decrease_factor(cls, v: float) -> float:
+        if not 0 < v < 1:
+            raise ValueError(f"'decrease_factor' must be between 0 and 1 (exclusive), got {v}")
+        return v
+
+    @field_validator("low_remaining")
+    @classmethod
+    def _validate_low_remaining(cls, v: float) -> float:
+        if not 0 <= v < 1:
+            raise ValueError(f"'low_remaining' must be in [0, 1), got {v}")
+        return v
+
+    @model_validator(mode="after")
+    def _validate_bounds(self) -> "ModelConcurrency":
+        if not self.min_limit <= self.initial_limit <= self.max_limit:
+            raise ValueError(
+                f"limits must satisfy min_limit <= initial_limit <= max_limit, got "
+                f"{self.min_limit} / {self.initial_limit} / {self.max_limit}"
+            )
+        return self
+
+
+class ModelReplica(BaseModel):
+    """One endpoint of a replicated model. Unset fields inherit the GraphModel value."""
+    api_key: SecretStr | None = None
+    host: str | None = None
+    aws_region_name: str | None = None
+    aws_access_key: SecretStr | None = None
+    aws_secret_key: SecretStr | None = None
+    # Per-replica model id, e.g. a region-specific Bedrock inference profile
+    model: str | None = None
 
 
 class GraphModel(BaseModel):
@@ -13,11 +101,64 @@ class GraphModel(BaseModel):
     batch_role_arn: str | None = None
     batch_s3_input_uri: str | None = None
     batch_s3_output_uri: str | None = None
+    # HTTP connection settings of the pooled SDK client (SDK defaults when unset).
+    # http2 applies to httpx-based SDKs only; boto3 ignores it.
+    max_connections: int | None = None
+    keepalive_expiry: float | None = None
+    http2: bool = False
+    # Cross-provider retry / circuit breaker (ModelRetryPolicy defaults when unset)
+    retry: ModelRetryPolicy | None = None
+    # Several endpoints serving this model; requests are spread across them
+    replicas: list[ModelReplica] | None = None
+    routing: Literal["least_in_flight", "round_robin"] = "least_in_flight"
+    # Consecutive retryable failures that take a replica out of rotation, and for how long
+    eject_after: int = 3
+    eject_for: float = 30.0
+    # Adaptive concurrency limit (per replica when replicas are set); unlimited when unset
+    concurrency: ModelConcurrency | None = None
+    # Share one provider call among identical temperature-0 requests in flight
+    coalesce: bool = True
+
+    @field_validator("max_connections")
+    @classmethod
+    def _validate_max_connections(cls, v: int | None) -> int | None:
+        if v is not None and v < 1:
+            raise ValueError(f"'max_connections' must be >= 1, got {v}")
+        return v
+
+    @field_validator("keepalive_expiry")
+    @classmethod
+    def _validate_keepalive_expiry(cls, v: float | None) -> float | None:
+        if v is not None and v < 0:
+            raise ValueError(f"'keepalive_expiry' must be >= 0 seconds, got {v}")
+        return v
+
+    @field_validator("replicas")
+    @classmethod
+    def _validate_replicas(cls, v: list[ModelReplica] | None) -> list[ModelReplica] | None:
+        if v is not None and len(v) == 0:
+            raise ValueError("'replicas' must be None or a non-empty list of endpoints")
+        return v
+
+    @field_validator("eject_after")
+    @classmethod
+    def _validate_eject_after(cls, v: int) -> int:
+        if v < 1:
+            raise ValueError(f"'eject_after' must be >= 1, got {v}")
+        return v
+
+    @field_validator("eject_for")
+    @classmethod
+    def _validate_eject_for(cls, v: float) -> float:
+        if v < 0:
+            raise ValueError(f"'eject_for' must be >= 0 seconds, got {v}")
+        return v
 
     def model_dump(self, **kwargs):
         """Override to expose credential values as plain strings for LLM adapter kwargs."""
         data = super().model_dump(**kwargs)
-        for field in ("api_key", "aws_access_key", "aws_secret_key"):
-            if field in data and data[field] is not None:
-                data[field] = data[field].get_secret_value()
+        for entry in [data] + list(data.get("replicas") or []):
+            for field in _SECRET_FIELDS:
+                if field in entry and entry[field] is not None:
+                    entry[field] = entry[field].get_secret_value()
         return data
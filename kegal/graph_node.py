@@ -1,5 +1,5 @@
-from pydantic import BaseModel, field_validator
-from typing import Any
+from pydantic import BaseModel, field_validator, model_validator
+from typing import Any, Literal
 
 from .graph_react import NodeReact
 from .graph_blackboard import NodeBlackboardRef
@@ -39,6 +39,78 @@ class NodeMcpServerRef(BaseModel):
         return v
 
 
+class NodeToolSelection(BaseModel):
+    top_k: int
+    expand: bool = True
+
+    @field_validator('top_k')
+    @classmethod
+    def _check_top_k(cls, v):
+        if v < 1:
+            raise ValueError(f"'top_k' must be >= 1, got {v}")
+        return v
+
+
+class NodeHedging(BaseModel):
+    # Send a duplicate once a call outlasts this percentile of the model's recent latencies
+    percentile: float = 95.0
+    # Calls the model must have completed before hedging starts
+    min_samples: int = 20
+    # "same": duplicate to the same model; "fallback": to the next model in fallback_models
+    target: Literal["same", "fallback"] = "same"
+
+    @field_validator('percentile')
+    @classmethod
+    def _check_percentile(cls, v):
+        if not 0 < v < 100:
+            raise ValueError(f"'percentile' must be between 0 and 100 (exclusive), got {v}")
+        return v
+
+    @field_validator('min_samples')
+    @classmethod
+    def _check_min_samples(cls, v):
+        if v < 1:
+            raise ValueError(f"'min_samples' must be >= 1, got {v}")
+        return v
+
+
+class NodeObservation(BaseModel):
+    # Observations up to this many characters are passed through unchanged
+    max_chars: int = 4000
+    # How a longer one is shrunk before it enters the conversation
+    strategy: Literal["truncate", "extract", "summarize", "blackboard"] = "truncate"
+    # truncate: share of max_chars kept from the head; the rest comes from the tail
+    head_ratio: float = 0.7
+    # extract: dotted JSON fields to keep
+    fields: list[str] | None = None
+    # summarize: model index of the summarizer (default: the node's model)
+    summary_model: int | None = None
+    # blackboard: board the full payload is written to
+    board: str | None = None
+
+    @field_validator('max_chars')
+    @classmethod
+    def _check_max_chars(cls, v):
+        if v < 1:
+            raise ValueError(f"'max_chars' must be >= 1, got {v}")
+        return v
+
+    @field_validator('head_ratio')
+    @classmethod
+    def _check_head_ratio(cls, v):
+        if not 0 <= v <= 1:
+            raise ValueError(f"'head_ratio' must be between 0 and 1, got {v}")
+        return v
+
+    @model_validator(mode='after')
+    def _check_strategy_options(self):
+        if self.strategy == "extract" and not self.fields:
+            raise ValueError("strategy 'extract' requires a non-empty 'fields' list")
+        if self.strategy == "blackboard" and self.board is None:
+            raise ValueError("strategy 'blackboard' requires 'board'")
+        return self
+
+
 class GraphNode(BaseModel):
     id: str
     model: int
@@ -51,12 +123,35 @@ class GraphNode(BaseModel):
     structured_output: dict[str, Any] | None = None
     react_output: dict[str, Any] | None = None
     react: NodeReact | None = None
+    # Guard nodes only: "global" gates every other node, "dependents" only the
+    # nodes that depend on the guard (other branches run alongside it)
+    guard_scope: Literal["global", "dependents"] = "global"
     max_tool_calls: int | None = None
     images: list[int] | None = None
     documents: list[int] | None = None
+    # How images/documents travel across the turns of a tool or ReAct loop:
+    # resent on every call, sent on the first call only, or pinned to the
+    # first user turn as a provider prompt-cache breakpoint
+    media_policy: Literal["every_turn", "first_turn", "cached"] = "every_turn"
     tools: list[str] | None = None
     mcp_servers: list[NodeMcpServerRef] | None = None
+    tool_selection: NodeToolSelection | None = None
+    # Model indices tried in order when `model` is unavailable
+    fallback_models: list[int] | None = None
+    hedge: NodeHedging | None = None
     blackboard: NodeBlackboardRef | None = None
+    # Size policy for tool results (keyed by tool) or, on a ReAct controller, agent outputs
+    # (keyed by agent); "*" applies to all others
+    observations: dict[str, NodeObservation] | None = None
+
+    @field_validator('fallback_models')
+    @classmethod
+    def _check_fallback_models(cls, v):
+        if v is not None and len(v) == 0:
+            raise ValueError("'fallback_models' must be None or a non-empty list of model indices")
+        if v is not None and len(set(v)) != len(v):
+            raise ValueError(f"'fallback_models' contains duplicate model indices: {v}")
+        return v
 
     @field_validator('mcp_servers', mode='before')
     @classmethod
@@ -1,7 +1,33 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
 
 
 class NodeReact(BaseModel):
     max_iterations: int = 10
     compact: bool = False
     compact_threshold: float = 0.8
+    # Summarize older turns on a background thread, keeping the last compact_keep_recent verbatim
+    compact_background: bool = False
+    compact_keep_recent: int = 4
+    # Stream the controller and start the agent once next_agent and agent_input are complete
+    early_dispatch: bool = False
+    # Let the controller return a "dispatches" list of {agent, input} run concurrently
+    parallel_dispatch: bool = False
+    max_parallel_agents: int | None = None
+    # Reuse the observation of an identical earlier dispatch (same agent, input and boards)
+    memoize_agents: bool = False
+    # Stop the loop when the controller asks for the same agent/input more than this many times
+    max_repeated_dispatches: int | None = None
+
+    @field_validator("compact_keep_recent")
+    @classmethod
+    def _validate_keep_recent(cls, v: int) -> int:
+        if v < 1:
+            raise ValueError(f"'compact_keep_recent' must be >= 1, got {v}")
+        return v
+
+    @field_validator("max_parallel_agents", "max_repeated_dispatches")
+    @classmethod
+    def _validate_positive(cls, v: int | None, info) -> int | None:
+        if v is not None and v < 1:
+            raise ValueError(f"'{info.field_name}' must be >= 1, got {v}")
+        return v
@@ -7,6 +7,8 @@ including Anthropic, OpenAI, Ollama, and AWS Bedrock.
 
 from .llm_model import LlmModel, LLMStructuredSchema
 from .llm_handler import LlmHandler
+from .llm_client_pool import LlmClientPool
+from .llm_resilience import LlmResilience, LlmCircuitOpenError
 from .llm_anthropic import LlmAnthropic
 from .llm_openai import LlmOpenai
 from .llm_ollama import LlmOllama
@@ -17,6 +19,9 @@ __all__ = [
     "LlmModel",
     "LLMStructuredSchema",
     "LlmHandler",
+    "LlmClientPool",
+    "LlmResilience",
+    "LlmCircuitOpenError",
     "LlmAnthropic",
     "LlmOpenai",
     "LlmOllama",
@@ -1,11 +1,13 @@
 import json
 import logging
-from typing import Any
+from typing import Any, Iterable, Iterator
 
 AWS_READ_TIMEOUT_SECONDS = 300  # Increased from default 60s to handle large model responses
 
 logger = logging.getLogger(__name__)
 
+from .llm_client_pool import httpx_client_kwargs
+from .llm_concurrency import rate_limit_remaining
 from .llm_model import (LlmModel,
                        LLMImageData,
                        LLMPdfData,
@@ -14,6 +16,7 @@ from .llm_model import (LlmModel,
                        LLMStructuredOutput,
                        LLMFunctionCall,
                        LLmResponse,
+                       LLmStreamChunk,
                        DEFAULT_JSON_OUTPUT_NAME)
 
 class LlmAnthropic(LlmModel):
@@ -21,10 +24,12 @@ class LlmAnthropic(LlmModel):
 
     IMPORTANT — two Bedrock code paths exist in this codebase:
       - LlmAnthropic(aws=True) uses boto3 invoke_model + raw Messages API JSON body.
-        Retry config (botocore Config) is applied here.
       - LlmBedrock uses boto3 converse API (model-agnostic; also covers Anthropic on Bedrock).
 
-    Changes to error handling, retry logic, or tool formats must be applied to BOTH paths
+    Retries are done by LlmHandler (llm_resilience) for every provider, so SDK and botocore
+    retries are disabled on both paths.
+
+    Changes to error handling or tool formats must be applied to BOTH paths
     or the behaviour will silently diverge. The long-term fix is to consolidate Anthropic-on-
     Bedrock under LlmBedrock and remove the aws=True branch here.
 
@@ -42,7 +47,17 @@ class LlmAnthropic(LlmModel):
                 import anthropic
             except ImportError:
                 raise ImportError("anthropic package required. Install with: pip install kegal[anthropic]")
-            self.client = anthropic.Anthropic(api_key=kwargs.get("api_key"))
+            api_key = kwargs.get("api_key")
+            http = httpx_client_kwargs(kwargs.get("max_connections"), kwargs.get("keepalive_expiry"),
+                                       kwargs.get("http2", False))
+
+            def build():
+                if http:
+                    return anthropic.Anthropic(api_key=api_key, max_retries=0,
+                                               http_client=anthropic.DefaultHttpxClient(**http))
+                return anthropic.Anthropic(api_key=api_key, max_retries=0)
+
+            self._init_client(("anthropic", api_key, repr(http)), build, kwargs.get("client_pool"))
             self.aws = False
         else:
             try:
@@ -54,18 +69,30 @@ class LlmAnthropic(LlmModel):
             if "aws_region_name" not in kwargs.keys():
                 raise ValueError("Missing required parameter: region_name")
 
+            max_connections = kwargs.get("max_connections")
+            keepalive = kwargs.get("keepalive_expiry") is not None
+            if kwargs.get("http2"):
+                logger.warning("LlmAnthropic(aws): boto3 does not support HTTP/2 — 'http2' ignored")
             config = Config(
                 read_timeout=AWS_READ_TIMEOUT_SECONDS,
                 connect_timeout=60,
-                retries={'max_attempts': 3}
+                retries={'total_max_attempts': 1},
+                max_pool_connections=max_connections or 10,
+                tcp_keepalive=keepalive,
             )
 
-
-            self.client = boto3.client(service_name='bedrock-runtime',
-                                       region_name=kwargs.get("aws_region_name"),
-                                       aws_access_key_id=kwargs.get("aws_access_key"),
-                                       aws_secret_access_key=kwargs.get("aws_secret_key"),
-                                       config=config)
+            region = kwargs.get("aws_region_name")
+            access_key = kwargs.get("aws_access_key")
+            secret_key = kwargs.get("aws_secret_key")
+            self._init_client(
+                ("anthropic_aws", region, access_key, secret_key, max_connections, keepalive),
+                lambda: boto3.client(service_name='bedrock-runtime',
+                                     region_name=region,
+                                     aws_access_key_id=access_key,
+                                     aws_secret_access_key=secret_key,
+                                     config=config),
+                kwargs.get("client_pool"),
+            )
 
             self.anthropic_version = "bedrock-2023-05-31"
             self.aws = True
@@ -80,13 +107,114 @@ class LlmAnthropic(LlmModel):
                  tools_data: list[LLMTool] | None = None,
                  structured_output: LLMStructuredOutput | None = None,
                  temperature: float = 0.5,
-                 max_tokens: int = 3000) -> LLmResponse:
+                 max_tokens: int = 3000,
+                 media_turn: int | None = None) -> LLmResponse:
+        body = self._request_body(system_prompt, user_message, chat_history, imgs_b64, pdfs_b64,
+                                  tools_data, structured_output, temperature, max_tokens, media_turn)
+
+        # Return Aws response
+        return self._get_response(body)
+
+
+    def stream(self,
+               system_prompt: str | None = None,
+               user_message: str = "",
+               chat_history: list[LLmMessage] | None = None,
+               imgs_b64: list[LLMImageData] | None = None,
+               pdfs_b64: list[LLMPdfData] | None = None,
+               tools_data: list[LLMTool] | None = None,
+               structured_output: LLMStructuredOutput | None = None,
+               temperature: float = 0.5,
+               max_tokens: int = 3000,
+               media_turn: int | None = None) -> Iterator[LLmStreamChunk]:
+        body = self._request_body(system_prompt, user_message, chat_history, imgs_b64, pdfs_b64,
+                                  tools_data, structured_output, temperature, max_tokens, media_turn)
+        try:
+            if self.aws:
+                body["anthropic_version"] = self.anthropic_version
+                model_response = self.client.invoke_model_with_response_stream(
+                    body=json.dumps(body), modelId=self.model
+                )
+                events = (json.loads(e["chunk"]["bytes"]) for e in model_response["body"] if "chunk" in e)
+                rate_limit = None
+            else:
+                body["model"] = self.model
+                raw_response = self.client.messages.with_raw_response.create(**body, stream=True)
+                events = (event.model_dump() for event in raw_response.parse())
+                rate_limit = rate_limit_remaining(raw_response.headers)
+            llm_response = yield from self._stream_events(events)
+            llm_response.rate_limit_remaining = rate_limit
+        except Exception as e:
+            logger.error(f"Can't stream '{self.model}' endpoint: {e}")
+            raise RuntimeError(f"Can't stream '{self.model}' endpoint: {e}") from e
+        yield LLmStreamChunk(response=llm_response)
+
+    def _stream_events(self, events: Iterable[dict]) -> Iterator[LLmStreamChunk]:
+        """Yield text deltas from Messages API stream events; return the assembled LLmResponse.
+
+        The native SDK and Bedrock's invoke_model_with_response_stream emit the
+        same event shapes, so both paths share this parser.
+        """
+        llm_response = LLmResponse()
+        # Content blocks by index: {"type", "name", "text" | "json"}
+        blocks: dict[int, dict[str, Any]] = {}
+        for event in events:
+            kind = event.get("type")
+            if kind == "message_start":
+                usage = event["message"].get("usage") or {}
+                self._set_input_usage(llm_response, usage)
+                llm_response.output_size = usage.get("output_tokens") or 0
+            elif kind == "content_block_start":
+                block = event["content_block"]
+                blocks[event["index"]] = {"type": block["type"], "name": block.get("name"), "text": "", "json": ""}
+            elif kind == "content_block_delta":
+                delta = event["delta"]
+                block = blocks[event["index"]]
+                if delta["type"] == "text_delta":
+                    block["text"] += delta["text"]
+                    yield LLmStreamChunk(delta=delta["text"])
+                elif delta["type"] == "input_json_delta":
+                    block["json"] += delta["partial_json"]
+                    if block["name"] == DEFAULT_JSON_OUTPUT_NAME:
+                        yield LLmStreamChunk(json_delta=delta["partial_json"])
+            elif kind == "message_delta":
+                usage = event.get("usage") or {}
+                if usage.get("output_tokens") is not None:
+                    llm_response.output_size = usage["output_tokens"]
+
+        for index in sorted(blocks):
+            block = blocks[index]
+            if block["type"] == "text":
+                if llm_response.messages is None:
+                    llm_response.messages = [block["text"]]
+                else:
+                    llm_response.messages.append(block["text"])
+            elif block["type"] == "tool_use":
+                if block["name"] == DEFAULT_JSON_OUTPUT_NAME:
+                    llm_response.json_output = json.loads(block["json"]) if block["json"].strip() else {}
+                else:
+                    self._add_tool(llm_response, block["name"], block["json"])
+        return llm_response
+
+    def _request_body(self,
+                      system_prompt: str | None,
+                      user_message: str,
+                      chat_history: list[LLmMessage] | None,
+                      imgs_b64: list[LLMImageData] | None,
+                      pdfs_b64: list[LLMPdfData] | None,
+                      tools_data: list[LLMTool] | None,
+                      structured_output: LLMStructuredOutput | None,
+                      temperature: float,
+                      max_tokens: int,
+                      media_turn: int | None = None) -> dict[str, Any]:
+        """Messages API request body shared by complete() and stream()."""
         # Compose messages to pass to the model
         messages = self._compose_messages(
             user_message,
             chat_history,
             imgs_b64,
-            pdfs_b64
+            pdfs_b64,
+            media_turn
         )
 
         # Model setup and chat messages
@@ -113,11 +241,22 @@ class LlmAnthropic(LlmModel):
                 body["tools"] = [self._structured_output_data(structured_output)]
             body["tool_choice"] =  {"type": "tool", "name": DEFAULT_JSON_OUTPUT_NAME}
 
+        return body
 
+    def _set_input_usage(self, llm_response: LLmResponse, usage: Any) -> None:
+        """Fill input_size and cached_input_size from a Messages API usage block (dict or SDK object).
 
-        # Return Aws response
-        return self._get_response(body)
+        ``input_tokens`` leaves out the tokens written to and read from the
+        prompt cache; input_size counts the whole prompt, like the other providers.
+        """
+        def get(key: str) -> Any:
+            return usage.get(key) if isinstance(usage, dict) else getattr(usage, key, None)
 
+        cached = self._token_count(get("cache_read_input_tokens"))
+        llm_response.input_size = (self._token_count(get("input_tokens"))
+                                   + self._token_count(get("cache_creation_input_tokens"))
+                                   + cached)
+        llm_response.cached_input_size = cached
 
     @staticmethod
     def _chat_message(message: str):
@@ -190,19 +329,35 @@ class LlmAnthropic(LlmModel):
                           user_message: str | None = None,
                           chat_history: list[LLmMessage] | None = None,
                           imgs_b64: list[LLMImageData] | None = None,
-                          pdfs_b64: list[LLMPdfData] | None = None, ):
+                          pdfs_b64: list[LLMPdfData] | None = None,
+                          media_turn: int | None = None):
         # Inserting chat history if provided
         messages: list[dict] = []
         if chat_history is not None:
             messages.extend(self._chat_history(chat_history))
 
+        media: list[dict] = []
+        if imgs_b64 is not None:
+            media.extend(self._images_data(imgs_b64))
+        if pdfs_b64 is not None:
+            media.extend(self._pdfs_data(pdfs_b64))
+
+        # Pinned media: attached to a fixed history turn and marked as a prompt-cache
+        # breakpoint, so every later call reads the same prefix from the cache
+        if media and media_turn is not None and 0 <= media_turn < len(messages):
+            media[-1] = {**media[-1], "cache_control": {"type": "ephemeral"}}
+            pinned = dict(messages[media_turn])
+            content = pinned["content"]
+            if isinstance(content, str):
+                content = [self._chat_message(content)]
+            pinned["content"] = [*content, *media]
+            messages[media_turn] = pinned
+            media = []
+
         user_content: list[dict] = []
         if user_message:
             user_content.append(self._chat_message(user_message))
-        if imgs_b64 is not None:
-            user_content.extend(self._images_data(imgs_b64))
-        if pdfs_b64 is not None:
-            user_content.extend(self._pdfs_data(pdfs_b64))
+        user_content.extend(media)
 
         if user_content:
             messages.append({
@@ -219,7 +374,7 @@ class LlmAnthropic(LlmModel):
             response_body = json.loads(model_response.get("body").read())
 
             llm_response = LLmResponse()
-            llm_response.input_size = response_body["usage"]["input_tokens"]
+            self._set_input_usage(llm_response, response_body["usage"])
             llm_response.output_size = response_body["usage"]["output_tokens"]
 
             response_contents = response_body["content"]
@@ -252,10 +407,13 @@ class LlmAnthropic(LlmModel):
     def _get_anthropic_response(self, body):
         try:
             body["model"] = self.model
-            response_body = self.client.messages.create(**body)
+            # Raw response: the rate-limit headers feed the adaptive concurrency limiter
+            raw_response = self.client.messages.with_raw_response.create(**body)
+            response_body = raw_response.parse()
 
             llm_response = LLmResponse()
-            llm_response.input_size = response_body.usage.input_tokens
+            llm_response.rate_limit_remaining = rate_limit_remaining(raw_response.headers)
+            self._set_input_usage(llm_response, response_body.usage)
             llm_response.output_size = response_body.usage.output_tokens
 
             response_contents = response_body.content
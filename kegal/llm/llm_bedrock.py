@@ -1,5 +1,7 @@
 import base64
-from typing import Any
+import json
+import logging
+from typing import Any, Iterator
 
 from .llm_model import (LlmModel,
                        LLMImageData,
@@ -9,17 +11,23 @@ from .llm_model import (LlmModel,
                        LLMStructuredOutput,
                        LLMFunctionCall,
                        LLmResponse,
+                       LLmStreamChunk,
                        DEFAULT_JSON_OUTPUT_NAME)
 
+logger = logging.getLogger(__name__)
+
 
 class LlmBedrock(LlmModel):
     """Non-Anthropic (and optionally Anthropic) models via the AWS Bedrock Converse API.
 
     IMPORTANT — two Bedrock code paths exist in this codebase:
-      - LlmBedrock uses boto3 converse (this class, no retry config).
-      - LlmAnthropic(aws=True) uses boto3 invoke_model with botocore retry Config.
+      - LlmBedrock uses boto3 converse (this class).
+      - LlmAnthropic(aws=True) uses boto3 invoke_model.
+
+    Retries are done by LlmHandler (llm_resilience) for every provider, so botocore
+    retries are disabled on both paths.
 
-    Changes to error handling, retry logic, or tool formats must be applied to BOTH paths
+    Changes to error handling or tool formats must be applied to BOTH paths
     or the behaviour will silently diverge. The long-term fix is to route all Anthropic-on-
     Bedrock traffic through this class and remove the aws=True branch in LlmAnthropic.
 
@@ -38,10 +46,28 @@ class LlmBedrock(LlmModel):
             raise ImportError("boto3 package required. Install with: pip install kegal[aws]")
 
         super().__init__(kwarg.get("model"))
-        self.client = boto3.client(service_name='bedrock-runtime',
-                                   region_name=kwarg.get("aws_region_name"),
-                                   aws_access_key_id=kwarg.get("aws_access_key"),
-                                   aws_secret_access_key=kwarg.get("aws_secret_key"))
+        region = kwarg.get("aws_region_name")
+        access_key = kwarg.get("aws_access_key")
+        secret_key = kwarg.get("aws_secret_key")
+        max_connections = kwarg.get("max_connections")
+        if kwarg.get("http2"):
+            logger.warning("LlmBedrock: boto3 does not support HTTP/2 — 'http2' ignored")
+
+        def build():
+            from botocore.config import Config
+            config_kwargs: dict[str, Any] = {"retries": {"total_max_attempts": 1}}
+            if max_connections is not None or kwarg.get("keepalive_expiry") is not None:
+                config_kwargs.update(max_pool_connections=max_connections or 10, tcp_keepalive=True)
+            return boto3.client(service_name='bedrock-runtime',
+                                region_name=region,
+                                aws_access_key_id=access_key,
+                                aws_secret_access_key=secret_key,
+                                config=Config(**config_kwargs))
+
+        self._init_client(
+            ("bedrock", region, access_key, secret_key, max_connections, kwarg.get("keepalive_expiry") is not None),
+            build, kwarg.get("client_pool"),
+        )
 
     def complete(self,
                  system_prompt: str | None = None,
@@ -52,51 +78,138 @@ class LlmBedrock(LlmModel):
                  tools_data: list[LLMTool] | None = None,
                  structured_output: LLMStructuredOutput | None = None,
                  temperature: float = 0.5,
-                 max_tokens: int = 3000) -> LLmResponse:
+                 max_tokens: int = 3000,
+                 media_turn: int | None = None) -> LLmResponse:
 
 
-            messages = self._compose_messages(
-                user_message,
-                chat_history,
-                imgs_b64,
-                pdfs_b64
-            )
+            body = self._request_body(system_prompt, user_message, chat_history, imgs_b64, pdfs_b64,
+                                      tools_data, structured_output, temperature, max_tokens, media_turn)
+
+            return self._get_response(body)
 
-            # Model setup and chat messages
-            body: dict[str, Any] = {
-                "modelId": self.model,
-                "inferenceConfig": {
-                    "temperature": temperature,
-                    "maxTokens": max_tokens
-                },
-                "messages": messages
-            }
 
-            # Add system prompt if provided
-            if system_prompt is not None:
-                body["system"] = [self._chat_message(system_prompt)]
+    def stream(self,
+               system_prompt: str | None = None,
+               user_message: str = "",
+               chat_history: list[LLmMessage] | None = None,
+               imgs_b64: list[LLMImageData] | None = None,
+               pdfs_b64: list[LLMPdfData] | None = None,
+               tools_data: list[LLMTool] | None = None,
+               structured_output: LLMStructuredOutput | None = None,
+               temperature: float = 0.5,
+               max_tokens: int = 3000,
+               media_turn: int | None = None) -> Iterator[LLmStreamChunk]:
+        from botocore.exceptions import ClientError
+        body = self._request_body(system_prompt, user_message, chat_history, imgs_b64, pdfs_b64,
+                                  tools_data, structured_output, temperature, max_tokens, media_turn)
+        try:
+            response_stream = self.client.converse_stream(**body)["stream"]
+            llm_response = LLmResponse()
+            # Content blocks by index: {"name": tool name or None, "text", "json"}
+            blocks: dict[int, dict[str, Any]] = {}
+            for event in response_stream:
+                if "contentBlockStart" in event:
+                    start = event["contentBlockStart"]
+                    tool_use = start.get("start", {}).get("toolUse")
+                    blocks[start["contentBlockIndex"]] = {
+                        "name": tool_use["name"] if tool_use else None, "text": "", "json": ""
+                    }
+                elif "contentBlockDelta" in event:
+                    delta_event = event["contentBlockDelta"]
+                    block = blocks.setdefault(delta_event["contentBlockIndex"], {"name": None, "text": "", "json": ""})
+                    delta = delta_event["delta"]
+                    if "text" in delta:
+                        block["text"] += delta["text"]
+                        yield LLmStreamChunk(delta=delta["text"])
+                    elif "toolUse" in delta:
+                        fragment = delta["toolUse"].get("input", "")
+                        block["json"] += fragment
+                        if block["name"] == DEFAULT_JSON_OUTPUT_NAME:
+                            yield LLmStreamChunk(json_delta=fragment)
+                elif "metadata" in event:
+                    usage = event["metadata"].get("usage", {})
+                    self._set_input_usage(llm_response, usage)
+                    llm_response.output_size = usage.get("outputTokens", 0)
+
+            for index in sorted(blocks):
+                block = blocks[index]
+                if block["name"] is None:
+                    if llm_response.messages is None:
+                        llm_response.messages = [block["text"]]
+                    else:
+                        llm_response.messages.append(block["text"])
+                elif block["name"] == DEFAULT_JSON_OUTPUT_NAME:
+                    llm_response.json_output = json.loads(block["json"]) if block["json"].strip() else {}
+                else:
+                    self._add_tool(llm_response, block["name"], block["json"])
+        except ClientError as e:
+            raise RuntimeError(f"Can't stream '{self.model}' endpoint: {e}") from e
+        yield LLmStreamChunk(response=llm_response)
+
+    def _request_body(self,
+                      system_prompt: str | None,
+                      user_message: str,
+                      chat_history: list[LLmMessage] | None,
+                      imgs_b64: list[LLMImageData] | None,
+                      pdfs_b64: list[LLMPdfData] | None,
+                      tools_data: list[LLMTool] | None,
+                      structured_output: LLMStructuredOutput | None,
+                      temperature: float,
+                      max_tokens: int,
+                      media_turn: int | None = None) -> dict[str, Any]:
+        """Converse request body shared by complete() and stream()."""
+        messages = self._compose_messages(
+            user_message,
+            chat_history,
+            imgs_b64,
+            pdfs_b64,
+            media_turn
+        )
+
+        # Model setup and chat messages
+        body: dict[str, Any] = {
+            "modelId": self.model,
+            "inferenceConfig": {
+                "temperature": temperature,
+                "maxTokens": max_tokens
+            },
+            "messages": messages
+        }
 
+        # Add system prompt if provided
+        if system_prompt is not None:
+            body["system"] = [self._chat_message(system_prompt)]
 
-            if tools_data is not None:
-                body["toolConfig"] = {
-                     "tools": self._tools_data(tools_data)
-                 }
 
+        if tools_data is not None:
+            body["toolConfig"] = {
+                 "tools": self._tools_data(tools_data)
+             }
 
-            # Force model to structured JSON output, else use regular tools
-            if structured_output is not None:
-                if "toolConfig" in body:
-                    body["toolConfig"]["tools"].append(self._structured_output_data(structured_output))
-                else:
-                    body["toolConfig"] = {
-                        "tools": [self._structured_output_data(structured_output)]
-                    }
-                body["toolConfig"]["toolChoice"] = {"tool": { "name": DEFAULT_JSON_OUTPUT_NAME }}
 
+        # Force model to structured JSON output, else use regular tools
+        if structured_output is not None:
+            if "toolConfig" in body:
+                body["toolConfig"]["tools"].append(self._structured_output_data(structured_output))
+            else:
+                body["toolConfig"] = {
+                    "tools": [self._structured_output_data(structured_output)]
+                }
+            body["toolConfig"]["toolChoice"] = {"tool": { "name": DEFAULT_JSON_OUTPUT_NAME }}
 
+        return body
 
-            return self._get_response(body)
+    def _set_input_usage(self, llm_response: LLmResponse, usage: dict) -> None:
+        """Fill input_size and cached_input_size from a Converse usage block.
 
+        ``inputTokens`` leaves out the tokens written to and read from the
+        prompt cache; input_size counts the whole prompt, like the other providers.
+        """
+        cached = self._token_count(usage.get("cacheReadInputTokens"))
+        llm_response.input_size = (self._token_count(usage.get("inputTokens"))
+                                   + self._token_count(usage.get("cacheWriteInputTokens"))
+                                   + cached)
+        llm_response.cached_input_size = cached
 
     @staticmethod
     def _chat_message(message: str):
@@ -182,19 +295,29 @@ class LlmBedrock(LlmModel):
                           user_message: str | None = None,
                           chat_history: list[LLmMessage] | None = None,
                           imgs_b64: list[LLMImageData] | None = None,
-                          pdfs_b64: list[LLMPdfData] | None = None, ):
+                          pdfs_b64: list[LLMPdfData] | None = None,
+                          media_turn: int | None = None):
         # Inserting chat history if provided
         messages: list[dict] = []
         if chat_history is not None:
             messages.extend(self._chat_history(chat_history))
 
+        media: list[dict] = []
+        if imgs_b64 is not None:
+            media.extend(self._images_data(imgs_b64))
+        if pdfs_b64 is not None:
+            media.extend(self._pdfs_data(pdfs_b64))
+
+        # Pinned media: attached to a fixed history turn and followed by a cache point,
+        # so every later call reads the same prefix from the prompt cache
+        if media and media_turn is not None and 0 <= media_turn < len(messages):
+            messages[media_turn]["content"].extend([*media, {"cachePoint": {"type": "default"}}])
+            media = []
+
         user_content: list[dict] = []
         if user_message:
             user_content.append(self._chat_message(user_message))
-        if imgs_b64 is not None:
-            user_content.extend(self._images_data(imgs_b64))
-        if pdfs_b64 is not None:
-            user_content.extend(self._pdfs_data(pdfs_b64))
+        user_content.extend(media)
 
         if user_content:
             messages.append({
@@ -210,7 +333,7 @@ class LlmBedrock(LlmModel):
             response_body = self.client.converse(**body)
 
             llm_response = LLmResponse()
-            llm_response.input_size = response_body["usage"]["inputTokens"]
+            self._set_input_usage(llm_response, response_body["usage"])
             llm_response.output_size = response_body["usage"]["outputTokens"]
 
             response_contents = response_body["output"]["message"]["content"]
@@ -239,6 +362,11 @@ class LlmBedrock(LlmModel):
             raise RuntimeError(f"Can't invoke '{self.model}' endpoint: {e}") from e
 
     def close(self) -> None:
-        """Close the underlying boto3 client and release its connections."""
+        """Close the underlying boto3 client and release its connections.
+
+        A pooled client is shared with other adapters and left to the pool.
+        """
+        if self.pooled:
+            return
         self.client.close()
 
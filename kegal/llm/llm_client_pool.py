@@ -0,0 +1,98 @@
+"""Process-wide pool of provider SDK clients.
+
+Every adapter used to build its own SDK client, so two GraphModel entries
+with the same credentials held separate connection pools and every new
+Compiler paid client construction (and fresh TLS handshakes) again.
+LlmHandler now hands adapters this pool: clients are keyed on provider,
+credentials, endpoint and HTTP settings, built on first use, and then
+shared by every adapter in the process with the same key.
+
+Pooled clients are owned by the pool — adapter close() leaves them open
+for the next Compiler.  Call ``LlmClientPool.shared().clear()`` to close
+them explicitly (e.g. on application shutdown).
+"""
+
+import logging
+import threading
+from typing import Any, Callable, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+def httpx_client_kwargs(max_connections: int | None = None,
+                        keepalive_expiry: float | None = None,
+                        http2: bool = False) -> dict[str, Any]:
+    """httpx.Client keyword arguments for the given HTTP settings ({} when all default).
+
+    Used by the SDKs built on httpx (anthropic, openai, ollama, google-genai).
+    """
+    kwargs: dict[str, Any] = {}
+    if max_connections is not None or keepalive_expiry is not None:
+        import httpx
+        limits: dict[str, Any] = {}
+        if max_connections is not None:
+            limits["max_connections"] = max_connections
+            limits["max_keepalive_connections"] = max_connections
+        if keepalive_expiry is not None:
+            limits["keepalive_expiry"] = keepalive_expiry
+        kwargs["limits"] = httpx.Limits(**limits)
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            raise ImportError("HTTP/2 requires the h2 package. Install with: pip install httpx[http2]")
+        kwargs["http2"] = True
+    return kwargs
+
+
+class LlmClientPool:
+    _shared: "LlmClientPool | None" = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._clients: dict[Hashable, Any] = {}
+        # One lock per key: building a slow client (boto3) does not block other providers
+        self._key_locks: dict[Hashable, threading.Lock] = {}
+
+    @classmethod
+    def shared(cls) -> "LlmClientPool":
+        """Return the process-wide client pool."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def get(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """Return the client for key, building it with factory on first use."""
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = factory()
+                self._clients[key] = client
+                logger.debug(f"LLM client pool: built {type(client).__name__}")
+        return client
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def clear(self) -> None:
+        """Close every pooled client that exposes close() and empty the pool."""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+            self._key_locks.clear()
+        for client in clients:
+            # ollama.Client keeps its httpx client in _client
+            close = getattr(client, "close", None) or getattr(getattr(client, "_client", None), "close", None)
+            if close is None:
+                continue
+            try:
+                close()
+            except Exception as e:
+                logger.warning(f"Error closing pooled LLM client {type(client).__name__}: {e}")
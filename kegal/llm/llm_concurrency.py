@@ -0,0 +1,105 @@
+"""Adaptive (AIMD) concurrency limit per model.
+
+A fixed number of parallel calls is either too low for a generous key or
+too high for a tight one, which ends in a 429 storm.  AimdLimiter gates
+every provider call of a model and adjusts the allowed in-flight count
+from what the provider reports:
+
+- **Additive increase** — each successful call while the limiter is at
+  least half used adds ``1 / limit``, i.e. about +1 per window of calls.
+- **Multiplicative decrease** — a throttling error (429, 529, Bedrock
+  ThrottlingException) or a response whose rate-limit headers show less
+  than ``low_remaining`` of the quota left multiplies the limit by
+  ``decrease_factor``.  Only calls started after the previous decrease
+  can shrink it again, so one burst of 429s counts as a single signal.
+
+The limit stays within [min_limit, max_limit].  Callers over the limit
+block until a slot frees up.
+"""
+
+import logging
+import threading
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# (remaining, limit) header pairs reported by OpenAI and Anthropic
+_RATE_LIMIT_HEADERS = (
+    ("x-ratelimit-remaining-requests", "x-ratelimit-limit-requests"),
+    ("x-ratelimit-remaining-tokens", "x-ratelimit-limit-tokens"),
+    ("anthropic-ratelimit-requests-remaining", "anthropic-ratelimit-requests-limit"),
+    ("anthropic-ratelimit-tokens-remaining", "anthropic-ratelimit-tokens-limit"),
+    ("anthropic-ratelimit-input-tokens-remaining", "anthropic-ratelimit-input-tokens-limit"),
+    ("anthropic-ratelimit-output-tokens-remaining", "anthropic-ratelimit-output-tokens-limit"),
+)
+
+
+def rate_limit_remaining(headers: Any) -> float | None:
+    """Smallest remaining/limit fraction across the rate-limit headers present, None if none are."""
+    fractions: list[float] = []
+    for remaining_key, limit_key in _RATE_LIMIT_HEADERS:
+        try:
+            remaining, limit = headers.get(remaining_key), headers.get(limit_key)
+            if remaining is not None and limit is not None and float(limit) > 0:
+                fractions.append(float(remaining) / float(limit))
+        except (AttributeError, TypeError, ValueError):
+            continue
+    return min(fractions) if fractions else None
+
+
+class AimdLimiter:
+    """Blocking in-flight limiter whose limit follows AIMD on throttling signals."""
+
+    def __init__(self,
+                 model: str = "",
+                 initial_limit: int = 4,
+                 min_limit: int = 1,
+                 max_limit: int = 32,
+                 decrease_factor: float = 0.5,
+                 low_remaining: float = 0.05) -> None:
+        self.model = model
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        self.low_remaining = low_remaining
+        self._limit = float(min(max(initial_limit, min_limit), max_limit))
+        self._in_flight = 0
+        self._started = 0           # calls admitted so far; tickets are their sequence numbers
+        self._last_decrease = -1    # ticket count at the last decrease
+        self._cond = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def acquire(self) -> int:
+        """Wait for a free slot; returns the ticket to pass to release()."""
+        with self._cond:
+            while self._in_flight >= int(self._limit):
+                self._cond.wait()
+            self._in_flight += 1
+            self._started += 1
+            return self._started
+
+    def release(self, ticket: int, throttled: bool = False, remaining: float | None = None) -> None:
+        """Free the slot and adapt the limit from the call's outcome."""
+        with self._cond:
+            busy = self._in_flight
+            self._in_flight -= 1
+            low = remaining is not None and remaining < self.low_remaining
+            if throttled or low:
+                if ticket > self._last_decrease:
+                    old = self._limit
+                    self._limit = max(self.min_limit, self._limit * self.decrease_factor)
+                    self._last_decrease = self._started
+                    logger.info(
+                        f"[{self.model}] {'throttled' if throttled else f'rate limit {remaining:.0%} left'} "
+                        f"— concurrency {int(old)} → {int(self._limit)}"
+                    )
+            elif busy >= self._limit / 2:
+                self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+            self._cond.notify_all()
@@ -1,10 +1,11 @@
 import base64
 import json
 import logging
-from typing import Any
+from typing import Any, Iterator
 
 logger = logging.getLogger(__name__)
 
+from .llm_client_pool import httpx_client_kwargs
 from .llm_model import (
     LlmModel,
     LLMImageData,
@@ -14,6 +15,7 @@ from .llm_model import (
     LLMStructuredOutput,
     LLMFunctionCall,
     LLmResponse,
+    LLmStreamChunk,
 )
 
 # JSON Schema type string → Gemini Type enum name
@@ -42,7 +44,17 @@ class LlmGemini(LlmModel):
             )
 
         super().__init__(kwargs["model"])
-        self.client = genai.Client(api_key=kwargs["api_key"])
+        api_key = kwargs["api_key"]
+        http = httpx_client_kwargs(kwargs.get("max_connections"), kwargs.get("keepalive_expiry"),
+                                   kwargs.get("http2", False))
+
+        def build():
+            if http:
+                from google.genai import types
+                return genai.Client(api_key=api_key, http_options=types.HttpOptions(client_args=http))
+            return genai.Client(api_key=api_key)
+
+        self._init_client(("gemini", api_key, repr(http)), build, kwargs.get("client_pool"))
 
     def complete(self,
                  system_prompt: str | None = None,
@@ -53,37 +65,11 @@ class LlmGemini(LlmModel):
                  tools_data: list[LLMTool] | None = None,
                  structured_output: LLMStructuredOutput | None = None,
                  temperature: float = 0.5,
-                 max_tokens: int = 3000) -> LLmResponse:
-
-        from google.genai import types
-
-        contents = []
-        if chat_history:
-            contents.extend(self._chat_history(chat_history))
-
-        user_parts = []
-        if user_message:
-            user_parts.append(types.Part.from_text(text=user_message))
-        if imgs_b64:
-            user_parts.extend(self._images_data(imgs_b64))
-        if pdfs_b64:
-            user_parts.extend(self._pdfs_data(pdfs_b64))
+                 max_tokens: int = 3000,
+                 media_turn: int | None = None) -> LLmResponse:
 
-        if user_parts:
-            contents.append(types.Content(role="user", parts=user_parts))
-
-        config_kwargs: dict[str, Any] = {
-            "temperature": temperature,
-            "max_output_tokens": max_tokens,
-        }
-        if system_prompt:
-            config_kwargs["system_instruction"] = system_prompt
-        if tools_data:
-            config_kwargs["tools"] = [self._tools_data(tools_data)]
-        if structured_output:
-            config_kwargs.update(self._structured_output_data(structured_output))
-
-        config = types.GenerateContentConfig(**config_kwargs)
+        contents, config = self._request(system_prompt, user_message, chat_history, imgs_b64, pdfs_b64,
+                                         tools_data, structured_output, temperature, max_tokens, media_turn)
 
         try:
             response = self.client.models.generate_content(
@@ -96,6 +82,7 @@ class LlmGemini(LlmModel):
             usage = response.usage_metadata
             llm_response.input_size = getattr(usage, "prompt_token_count", 0) or 0
             llm_response.output_size = getattr(usage, "candidates_token_count", 0) or 0
+            llm_response.cached_input_size = self._token_count(getattr(usage, "cached_content_token_count", None))
 
             if response.candidates:
                 for part in response.candidates[0].content.parts:
@@ -123,6 +110,102 @@ class LlmGemini(LlmModel):
             logger.error(f"Can't invoke '{self.model}' endpoint: {e}")
             raise RuntimeError(f"Can't invoke '{self.model}' endpoint: {e}") from e
 
+    def stream(self,
+               system_prompt: str | None = None,
+               user_message: str = "",
+               chat_history: list[LLmMessage] | None = None,
+               imgs_b64: list[LLMImageData] | None = None,
+               pdfs_b64: list[LLMPdfData] | None = None,
+               tools_data: list[LLMTool] | None = None,
+               structured_output: LLMStructuredOutput | None = None,
+               temperature: float = 0.5,
+               max_tokens: int = 3000,
+               media_turn: int | None = None) -> Iterator[LLmStreamChunk]:
+
+        contents, config = self._request(system_prompt, user_message, chat_history, imgs_b64, pdfs_b64,
+                                         tools_data, structured_output, temperature, max_tokens, media_turn)
+
+        try:
+            llm_response = LLmResponse()
+            text: list[str] = []
+            for chunk in self.client.models.generate_content_stream(
+                model=self.model,
+                contents=contents,
+                config=config,
+            ):
+                usage = chunk.usage_metadata
+                if usage is not None:
+                    llm_response.input_size = getattr(usage, "prompt_token_count", 0) or 0
+                    llm_response.output_size = getattr(usage, "candidates_token_count", 0) or 0
+                    llm_response.cached_input_size = self._token_count(
+                        getattr(usage, "cached_content_token_count", None)
+                    )
+                if not chunk.candidates or chunk.candidates[0].content is None:
+                    continue
+                for part in chunk.candidates[0].content.parts or []:
+                    if part.function_call:
+                        self._add_tool(llm_response, part.function_call.name, dict(part.function_call.args))
+                    elif part.text:
+                        text.append(part.text)
+                        yield LLmStreamChunk(delta=part.text)
+            self._add_text(llm_response, "".join(text))
+        except Exception as e:
+            logger.error(f"Can't stream '{self.model}' endpoint: {e}")
+            raise RuntimeError(f"Can't stream '{self.model}' endpoint: {e}") from e
+        yield LLmStreamChunk(response=llm_response)
+
+    def _request(self,
+                 system_prompt: str | None,
+                 user_message: str,
+                 chat_history: list[LLmMessage] | None,
+                 imgs_b64: list[LLMImageData] | None,
+                 pdfs_b64: list[LLMPdfData] | None,
+                 tools_data: list[LLMTool] | None,
+                 structured_output: LLMStructuredOutput | None,
+                 temperature: float,
+                 max_tokens: int,
+                 media_turn: int | None = None) -> tuple[list, Any]:
+        """Contents and GenerateContentConfig shared by complete() and stream()."""
+        from google.genai import types
+
+        contents = []
+        if chat_history:
+            contents.extend(self._chat_history(chat_history))
+
+        media = []
+        if imgs_b64:
+            media.extend(self._images_data(imgs_b64))
+        if pdfs_b64:
+            media.extend(self._pdfs_data(pdfs_b64))
+        # Pinned media stay on one history turn, so Gemini's implicit prefix cache
+        # sees the same prompt prefix on every call of a loop
+        if media and media_turn is not None and 0 <= media_turn < len(contents):
+            contents[media_turn].parts.extend(media)
+            media = []
+
+        user_parts = []
+        if user_message:
+            user_parts.append(types.Part.from_text(text=user_message))
+        user_parts.extend(media)
+
+        if user_parts:
+            contents.append(types.Content(role="user", parts=user_parts))
+
+        config_kwargs: dict[str, Any] = {
+            "temperature": temperature,
+            "max_output_tokens": max_tokens,
+        }
+        if system_prompt:
+            config_kwargs["system_instruction"] = system_prompt
+        if tools_data:
+            config_kwargs["tools"] = [self._tools_data(tools_data)]
+        if structured_output:
+            config_kwargs.update(self._structured_output_data(structured_output))
+
+        config = types.GenerateContentConfig(**config_kwargs)
+
+        return contents, config
+
     @staticmethod
     def _chat_message(message: str):
         from google.genai import types
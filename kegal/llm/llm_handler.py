@@ -1,6 +1,14 @@
-from typing import Any
+import itertools
+import time
+from typing import Any, Iterator
 
-from .llm_model import LLmResponse
+from .llm_model import LLmResponse, LLmStreamChunk
+from .llm_client_pool import LlmClientPool
+from .llm_resilience import LlmResilience, is_throttling
+from .llm_concurrency import AimdLimiter
+from .llm_latency import LatencyTracker
+from .llm_singleflight import SingleFlight, request_key
+from .llm_replicas import ReplicaRouter, replica_label
 from .llm_openai import LlmOpenai
 from .llm_anthropic import LlmAnthropic
 from .llm_bedrock import LlmBedrock
@@ -30,10 +38,130 @@ class LlmHandler:
             available_models = list(self._MODEL_MAPPING.keys())
             raise ValueError(f"Unknown LLM model: {llm}. Available models: {available_models}")
 
-        self.model = model_class(**kwargs)
+        # SDK clients come from the process-wide pool unless the caller passes
+        # client_pool=None (adapter-owned client) or a pool of its own
+        kwargs.setdefault("client_pool", LlmClientPool.shared())
+        # Identical temperature-0 calls in flight share one provider call
+        self.coalesce: bool = kwargs.pop("coalesce", True)
+        self._scope = request_key("", {k: v for k, v in kwargs.items() if k != "client_pool"})
+        # Retries happen here for every provider; adapters disable their SDK's own retries
+        retry = kwargs.pop("retry", None) or {}
+        concurrency = kwargs.pop("concurrency", None)
+        replicas = kwargs.pop("replicas", None)
+        routing = {k: kwargs.pop(k) for k in ("routing", "eject_after", "eject_for") if k in kwargs}
+        self.router: ReplicaRouter | None = None
+        if replicas:
+            # One adapter per endpoint; replica fields override the model-level ones
+            models = [model_class(**{**kwargs, **{k: v for k, v in r.items() if v is not None}})
+                      for r in replicas]
+            labels = [replica_label(r, i) for i, r in enumerate(replicas)]
+            self.router = ReplicaRouter(models, labels, **routing)
+            self.model = models[0]
+        else:
+            self.model = model_class(**kwargs)
+        self.resilience = LlmResilience(model=kwargs.get("model", llm), **retry)
+        # Durations of successful provider calls (one attempt, retries excluded)
+        self.latency = LatencyTracker()
+        # Adaptive concurrency limit per endpoint: adapter id → limiter
+        self.limiters: dict[int, AimdLimiter] = {}
+        if concurrency is not None:
+            models = self.router.models if self.router is not None else [self.model]
+            for model in models:
+                self.limiters[id(model)] = AimdLimiter(model=kwargs.get("model", llm), **concurrency)
 
 
-    def complete(self, **kwargs: Any) -> LLmResponse:
-        return self.model.complete(**kwargs)
+    def complete(self, coalesce: bool = True, **kwargs: Any) -> LLmResponse:
+        """Call the model with retries; identical deterministic calls in flight are coalesced.
 
+        Only requests with ``temperature == 0`` are coalesced: sampled calls
+        are expected to differ.  Pass ``coalesce=False`` to force a call of
+        one's own (e.g. a hedged duplicate).
+        """
+        if not (coalesce and self.coalesce and kwargs.get("temperature") == 0):
+            return self.resilience.call(lambda: self._timed_complete(kwargs))
+        key = request_key(self._scope, kwargs)
+        response, leader = SingleFlight.shared().call(
+            key, lambda: self.resilience.call(lambda: self._timed_complete(kwargs))
+        )
+        if leader or not isinstance(response, LLmResponse):
+            return response
+        # Each waiter gets its own copy: callers may edit the response
+        return response.model_copy(deep=True, update={"coalesced": True})
 
+    def _timed_complete(self, kwargs: dict[str, Any]) -> LLmResponse:
+        if self.router is not None:
+            return self.router.call(lambda model: self._call(model, kwargs))
+        return self._call(self.model, kwargs)
+
+    def _call(self, model: Any, kwargs: dict[str, Any]) -> LLmResponse:
+        """One attempt on one endpoint: wait for a concurrency slot, call, record latency."""
+        limiter = self.limiters.get(id(model))
+        ticket = limiter.acquire() if limiter is not None else 0
+        start = time.monotonic()
+        try:
+            response = model.complete(**kwargs)
+        except Exception as e:
+            if limiter is not None:
+                limiter.release(ticket, throttled=is_throttling(e))
+            raise
+        self.latency.record(time.monotonic() - start)
+        if limiter is not None:
+            limiter.release(ticket, remaining=getattr(response, "rate_limit_remaining", None))
+        return response
+
+    def stream(self, **kwargs: Any) -> Iterator[LLmStreamChunk]:
+        """Stream the completion; the last chunk carries the full LLmResponse.
+
+        Retries, replica routing and the concurrency limit apply until the
+        first chunk arrives.  A failure after that is raised to the caller:
+        text already yielded cannot be taken back.  Streams are never coalesced.
+        """
+        chunks = self.resilience.call(lambda: self._open_stream(kwargs))
+        yield from chunks
+
+    def _open_stream(self, kwargs: dict[str, Any]) -> Iterator[LLmStreamChunk]:
+        if self.router is None:
+            return self._start_stream(self.model, kwargs)
+        # The replica stays acquired until _drain_stream ends, not just until the first chunk
+        replica = self.router.acquire()
+        try:
+            return self._start_stream(replica.model, kwargs, replica)
+        except Exception as e:
+            self.router.release(replica, e)
+            raise
+
+    def _start_stream(self, model: Any, kwargs: dict[str, Any], replica: Any = None) -> Iterator[LLmStreamChunk]:
+        """Open a stream on one endpoint and pull its first chunk, so connection errors are retried."""
+        limiter = self.limiters.get(id(model))
+        ticket = limiter.acquire() if limiter is not None else 0
+        start = time.monotonic()
+        try:
+            chunks = iter(model.stream(**kwargs))
+            first = next(chunks)
+        except Exception as e:
+            if limiter is not None:
+                limiter.release(ticket, throttled=is_throttling(e))
+            raise
+        return self._drain_stream(first, chunks, limiter, ticket, start, replica)
+
+    def _drain_stream(self, first: LLmStreamChunk, chunks: Iterator[LLmStreamChunk],
+                      limiter: AimdLimiter | None, ticket: int, start: float,
+                      replica: Any = None) -> Iterator[LLmStreamChunk]:
+        throttled, remaining = False, None
+        error: Exception | None = None
+        try:
+            for chunk in itertools.chain([first], chunks):
+                if chunk.response is not None:
+                    self.latency.record(time.monotonic() - start)
+                    remaining = chunk.response.rate_limit_remaining
+                yield chunk
+        except Exception as e:
+            throttled = is_throttling(e)
+            error = e
+            raise
+        finally:
+            # Also runs when the consumer stops early and the generator is closed
+            if limiter is not None:
+                limiter.release(ticket, throttled=throttled, remaining=remaining)
+            if replica is not None:
+                self.router.release(replica, error)
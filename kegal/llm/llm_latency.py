@@ -0,0 +1,34 @@
+"""Rolling latency statistics per model.
+
+LlmHandler records the duration of every successful provider call here.
+The compiler reads a percentile of the recent window to decide when a
+slow call is worth hedging with a duplicate request.
+"""
+
+import math
+import threading
+from collections import deque
+
+
+class LatencyTracker:
+    """Thread-safe window of the most recent call durations (seconds)."""
+
+    def __init__(self, window: int = 200) -> None:
+        self._samples: deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, p: float, min_samples: int = 1) -> float | None:
+        """Nearest-rank p-th percentile (0 < p <= 100); None until min_samples calls are recorded."""
+        with self._lock:
+            if len(self._samples) < max(min_samples, 1):
+                return None
+            ordered = sorted(self._samples)
+        rank = max(math.ceil(p / 100 * len(ordered)), 1)
+        return ordered[min(rank, len(ordered)) - 1]
@@ -1,7 +1,7 @@
 import base64
 import json
 from abc import ABC, abstractmethod
-from typing import Any
+from typing import Any, Callable, Hashable, Iterator
 
 from pydantic import BaseModel, Field
 import fitz
@@ -160,6 +160,22 @@ class LLmResponse(BaseModel):
     json_output: dict | None = Field(default=None)
     input_size: int = 0
     output_size: int = 0
+    # Part of input_size the provider read from its prompt cache (billed at a discount)
+    cached_input_size: int = 0
+    # Smallest remaining/limit fraction from the provider's rate-limit headers (not serialized)
+    rate_limit_remaining: float | None = Field(default=None, exclude=True)
+    # True when this response was shared from an identical call already in flight (not serialized)
+    coalesced: bool = Field(default=False, exclude=True)
+
+
+class LLmStreamChunk(BaseModel):
+    # Text generated since the previous chunk (empty on the last chunk)
+    delta: str = ""
+    # Fragment of the structured (json_output) response when the provider streams it
+    # as tool input rather than text (Anthropic, Bedrock)
+    json_delta: str = ""
+    # Set on the last chunk only: the complete response, as complete() returns it
+    response: LLmResponse | None = None
 
 
 
@@ -167,6 +183,35 @@ class LlmModel(ABC):
     """Abstract base class for all LLM handlers"""
     def __init__(self, model: str):
         self.model = model
+        self._client: Any = None
+        self._client_key: Hashable | None = None
+        self._client_factory: Callable[[], Any] | None = None
+        self._client_pool: Any = None
+
+    @property
+    def client(self) -> Any:
+        """Provider SDK client. A pooled client is fetched (and built) on first use."""
+        if self._client is None and self._client_factory is not None:
+            self._client = self._client_pool.get(self._client_key, self._client_factory)
+        return self._client
+
+    @client.setter
+    def client(self, value: Any) -> None:
+        self._client = value
+
+    @property
+    def pooled(self) -> bool:
+        """True when the client belongs to an LlmClientPool rather than to this adapter."""
+        return self._client_pool is not None
+
+    def _init_client(self, key: Hashable, factory: Callable[[], Any], pool: Any = None) -> None:
+        """Build the SDK client now, or defer it to the shared pool when one is given."""
+        if pool is None:
+            self.client = factory()
+            return
+        self._client_key = key
+        self._client_factory = factory
+        self._client_pool = pool
 
     @abstractmethod
     def complete(self,
@@ -178,9 +223,57 @@ class LlmModel(ABC):
                  tools_data: list[LLMTool] | None,
                  structured_output: LLMStructuredOutput | None,
                  temperature: float,
-                 max_tokens: int) -> LLmResponse:
+                 max_tokens: int,
+                 media_turn: int | None = None) -> LLmResponse:
+        """Run one completion.
+
+        media_turn pins imgs_b64/pdfs_b64 to chat_history[media_turn] instead of
+        the trailing user turn, keeping the request prefix identical across the
+        turns of a loop; providers with explicit prompt caching mark it as a
+        cache breakpoint.
+        """
         pass
 
+    def stream(self, **kwargs: Any) -> Iterator[LLmStreamChunk]:
+        """Yield the completion as it is generated; the last chunk carries the full LLmResponse.
+
+        Takes the same arguments as complete().  Adapters override this with the
+        provider's streaming API; the default sends one complete() call and
+        yields its text as a single delta.
+        """
+        response = self.complete(**kwargs)
+        text = "".join(response.messages or [])
+        if text:
+            yield LLmStreamChunk(delta=text)
+        yield LLmStreamChunk(response=response)
+
+    @staticmethod
+    def _token_count(value: Any) -> int:
+        """A usage counter from a provider response; 0 when absent."""
+        return value if isinstance(value, int) else 0
+
+    def _add_text(self, llm_response: LLmResponse, text: str) -> None:
+        """Store streamed text as json_output when it parses as JSON, else as a message."""
+        if not text:
+            return
+        if self._is_json(text):
+            llm_response.json_output = json.loads(text)
+        elif llm_response.messages is None:
+            llm_response.messages = [text]
+        else:
+            llm_response.messages.append(text)
+
+    @staticmethod
+    def _add_tool(llm_response: LLmResponse, name: str, arguments: str | dict | None) -> None:
+        """Append a streamed tool call; arguments arrive as accumulated JSON text."""
+        if isinstance(arguments, str):
+            arguments = json.loads(arguments) if arguments.strip() else {}
+        function_call = LLMFunctionCall(name=name, parameters=arguments or {})
+        if llm_response.tools is None:
+            llm_response.tools = [function_call]
+        else:
+            llm_response.tools.append(function_call)
+
     # text -> text
     @staticmethod
     @abstractmethod
@@ -1,8 +1,9 @@
 import json
 import logging
-from typing import Any
+from typing import Any, Iterator
 
 logger = logging.getLogger(__name__)
+from .llm_client_pool import httpx_client_kwargs
 from .llm_model import (LlmModel,
                        LLMImageData,
                        LLMPdfData,
@@ -10,7 +11,8 @@ from .llm_model import (LlmModel,
                        LLmMessage,
                        LLMStructuredOutput,
                        LLMFunctionCall,
-                       LLmResponse)
+                       LLmResponse,
+                       LLmStreamChunk)
 
 
 
@@ -24,9 +26,16 @@ class LlmOllama(LlmModel):
         except ImportError:
             raise ImportError("ollama package required. Install with: pip install kegal[ollama]")
         super().__init__(kwargs.get("model"))
-        self.client = Client(host=kwargs.get("host", "http://localhost:11434"))
+        host = kwargs.get("host", "http://localhost:11434")
+        http = httpx_client_kwargs(kwargs.get("max_connections"), kwargs.get("keepalive_expiry"),
+                                   kwargs.get("http2", False))
+        self._init_client(("ollama", host, repr(http)), lambda: Client(host=host, **http),
+                          kwargs.get("client_pool"))
 
     def close(self):
+        # A pooled client is shared with other adapters; the pool owns its lifetime
+        if self.pooled:
+            return
         self.client._client.close()
 
     def complete(self,
@@ -38,37 +47,14 @@ class LlmOllama(LlmModel):
                  tools_data: list[LLMTool] | None = None,
                  structured_output: LLMStructuredOutput | None = None,
                  temperature: float = 0.5,
-                 max_tokens: int = 3000) -> LLmResponse:
-
-        # Compose messages to pass to the model
-        messages = self._compose_messages(
-            system_prompt,
-            user_message,
-            chat_history,
-            imgs_b64
-        )
-
-        options = {
-            "temperature": temperature
-        }
-
-        tools: list | None = None
-        if tools_data is not None:
-            tools = self._tools_data(tools_data)
-
-        json_format  = None
-        if structured_output is not None:
-            json_format = self._structured_output_data(structured_output)
+                 max_tokens: int = 3000,
+                 media_turn: int | None = None) -> LLmResponse:
 
+        request = self._request(system_prompt, user_message, chat_history, imgs_b64,
+                                tools_data, structured_output, temperature, media_turn)
 
         try:
-            model_response = self.client.chat(
-                model=self.model,
-                messages=messages,
-                tools=tools,
-                format=json_format,
-                options=options
-            )
+            model_response = self.client.chat(**request)
 
             llm_response = LLmResponse()
             llm_response.input_size = model_response.get('prompt_eval_count', 0)
@@ -103,6 +89,74 @@ class LlmOllama(LlmModel):
             raise RuntimeError(f"Can't invoke '{self.model}' endpoint: {e}") from e
 
 
+    def stream(self,
+               system_prompt: str | None = None,
+               user_message: str = "",
+               chat_history: list[LLmMessage] | None = None,
+               imgs_b64: list[LLMImageData] | None = None,
+               pdfs_b64: list[LLMPdfData] | None = None,
+               tools_data: list[LLMTool] | None = None,
+               structured_output: LLMStructuredOutput | None = None,
+               temperature: float = 0.5,
+               max_tokens: int = 3000,
+               media_turn: int | None = None) -> Iterator[LLmStreamChunk]:
+
+        request = self._request(system_prompt, user_message, chat_history, imgs_b64,
+                                tools_data, structured_output, temperature, media_turn)
+
+        try:
+            llm_response = LLmResponse()
+            text: list[str] = []
+            for chunk in self.client.chat(**request, stream=True):
+                message = chunk["message"]
+                if message.get("content"):
+                    text.append(message["content"])
+                    yield LLmStreamChunk(delta=message["content"])
+                for tool in message.get("tool_calls") or []:
+                    self._add_tool(llm_response, tool["function"]["name"], tool["function"]["arguments"])
+                if chunk.get("done"):
+                    llm_response.input_size = chunk.get("prompt_eval_count", 0) or 0
+                    llm_response.output_size = chunk.get("eval_count", 0) or 0
+            self._add_text(llm_response, "".join(text))
+        except Exception as e:
+            logger.error(f"Can't stream '{self.model}' endpoint: {e}")
+            raise RuntimeError(f"Can't stream '{self.model}' endpoint: {e}") from e
+        yield LLmStreamChunk(response=llm_response)
+
+    def _request(self,
+                 system_prompt: str | None,
+                 user_message: str,
+                 chat_history: list[LLmMessage] | None,
+                 imgs_b64: list[LLMImageData] | None,
+                 tools_data: list[LLMTool] | None,
+                 structured_output: LLMStructuredOutput | None,
+                 temperature: float,
+                 media_turn: int | None = None) -> dict[str, Any]:
+        """Keyword arguments of Client.chat shared by complete() and stream()."""
+        # Compose messages to pass to the model
+        messages = self._compose_messages(
+            system_prompt,
+            user_message,
+            chat_history,
+            imgs_b64,
+            media_turn
+        )
+
+        options = {
+            "temperature": temperature
+        }
+
+        tools: list | None = None
+        if tools_data is not None:
+            tools = self._tools_data(tools_data)
+
+        json_format  = None
+        if structured_output is not None:
+            json_format = self._structured_output_data(structured_output)
+
+        return {"model": self.model, "messages": messages, "tools": tools,
+                "format": json_format, "options": options}
+
     @staticmethod
     def _chat_message(message: str) -> dict:
         return {"role": "user", "content": message}
@@ -160,7 +214,8 @@ class LlmOllama(LlmModel):
                           system_message: str | None,
                           user_message: str | None,
                           chat_history: list[LLmMessage] | None,
-                          imgs_b64: list[LLMImageData] | None):
+                          imgs_b64: list[LLMImageData] | None,
+                          media_turn: int | None = None):
         messages = []
         if system_message is not None:
             messages = [{
@@ -168,8 +223,12 @@ class LlmOllama(LlmModel):
                 "content": system_message
             }]
 
-        if chat_history is not None:
-            messages.extend(self._chat_history(chat_history))
+        history: list[dict] = self._chat_history(chat_history) if chat_history is not None else []
+        # Pinned images stay on one history turn, keeping the prompt prefix stable across a loop
+        if imgs_b64 is not None and media_turn is not None and 0 <= media_turn < len(history):
+            history[media_turn]["images"] = self._images_data(imgs_b64)
+            imgs_b64 = None
+        messages.extend(history)
 
         if user_message is not None or imgs_b64 is not None:
             user_data: dict[str, Any] = {
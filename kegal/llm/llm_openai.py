@@ -1,8 +1,10 @@
 import json
 import logging
-from typing import Any
+from typing import Any, Iterator
 
 logger = logging.getLogger(__name__)
+from .llm_client_pool import httpx_client_kwargs
+from .llm_concurrency import rate_limit_remaining
 from .llm_model import (LlmModel,
                        LLMImageData,
                        LLMPdfData,
@@ -10,7 +12,8 @@ from .llm_model import (LlmModel,
                        LLmMessage,
                        LLMStructuredOutput,
                        LLMFunctionCall,
-                       LLmResponse)
+                       LLmResponse,
+                       LLmStreamChunk)
 
 class LlmOpenai(LlmModel):
     def __init__(self, **kwargs):
@@ -23,7 +26,17 @@ class LlmOpenai(LlmModel):
         except ImportError:
             raise ImportError("openai package required. Install with: pip install kegal[openai]")
         super().__init__(kwargs.get("model"))
-        self.client = openai.OpenAI(api_key=kwargs.get("api_key"))
+        api_key = kwargs.get("api_key")
+        http = httpx_client_kwargs(kwargs.get("max_connections"), kwargs.get("keepalive_expiry"),
+                                   kwargs.get("http2", False))
+
+        def build():
+            if http:
+                return openai.OpenAI(api_key=api_key, max_retries=0,
+                                     http_client=openai.DefaultHttpxClient(**http))
+            return openai.OpenAI(api_key=api_key, max_retries=0)
+
+        self._init_client(("openai", api_key, repr(http)), build, kwargs.get("client_pool"))
 
     def complete(self,
                  system_prompt: str | None = None,
@@ -34,32 +47,22 @@ class LlmOpenai(LlmModel):
                  tools_data: list[LLMTool] | None = None,
                  structured_output: LLMStructuredOutput | None = None,
                  temperature: float = 0.5,
-                 max_tokens: int = 3000) -> LLmResponse:
-
-        messages = self._compose_messages(system_prompt,
-                                          user_message,
-                                          chat_history,
-                                          imgs_b64)
-
-        tools = None
-        if tools_data is not None:
-            tools = self._tools_data(tools_data)
+                 max_tokens: int = 3000,
+                 media_turn: int | None = None) -> LLmResponse:
 
-        json_format = None
-        if structured_output is not None:
-            json_format = self._structured_output_data(structured_output)
+        request = self._request(system_prompt, user_message, chat_history, imgs_b64, tools_data, structured_output,
+                                media_turn)
 
         try:
-            model_response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                tools=tools,
-                response_format=json_format
-            )
+            # Raw response: the rate-limit headers feed the adaptive concurrency limiter
+            raw_response = self.client.chat.completions.with_raw_response.create(**request)
+            model_response = raw_response.parse()
 
             llm_response = LLmResponse()
+            llm_response.rate_limit_remaining = rate_limit_remaining(raw_response.headers)
             llm_response.input_size = model_response.usage.prompt_tokens
             llm_response.output_size = model_response.usage.completion_tokens
+            llm_response.cached_input_size = self._cached_tokens(model_response.usage)
 
             for choice in model_response.choices:
                 msg = choice.message
@@ -88,6 +91,84 @@ class LlmOpenai(LlmModel):
             raise RuntimeError(f"Can't invoke '{self.model}' endpoint: {e}") from e
 
 
+    def stream(self,
+               system_prompt: str | None = None,
+               user_message: str = "",
+               chat_history: list[LLmMessage] | None = None,
+               imgs_b64: list[LLMImageData] | None = None,
+               pdfs_b64: list[LLMPdfData] | None = None,
+               tools_data: list[LLMTool] | None = None,
+               structured_output: LLMStructuredOutput | None = None,
+               temperature: float = 0.5,
+               max_tokens: int = 3000,
+               media_turn: int | None = None) -> Iterator[LLmStreamChunk]:
+
+        request = self._request(system_prompt, user_message, chat_history, imgs_b64, tools_data, structured_output,
+                                media_turn)
+
+        try:
+            raw_response = self.client.chat.completions.with_raw_response.create(
+                **request, stream=True, stream_options={"include_usage": True}
+            )
+            llm_response = LLmResponse()
+            llm_response.rate_limit_remaining = rate_limit_remaining(raw_response.headers)
+            text: list[str] = []
+            # Tool calls arrive in fragments keyed by index: [name, arguments so far]
+            tool_calls: dict[int, list[str]] = {}
+            for chunk in raw_response.parse():
+                if chunk.usage is not None:
+                    llm_response.input_size = chunk.usage.prompt_tokens
+                    llm_response.output_size = chunk.usage.completion_tokens
+                    llm_response.cached_input_size = self._cached_tokens(chunk.usage)
+                for choice in chunk.choices:
+                    delta = choice.delta
+                    if delta.content:
+                        text.append(delta.content)
+                        yield LLmStreamChunk(delta=delta.content)
+                    for tool_call in delta.tool_calls or []:
+                        entry = tool_calls.setdefault(tool_call.index, ["", ""])
+                        if tool_call.function.name:
+                            entry[0] = tool_call.function.name
+                        entry[1] += tool_call.function.arguments or ""
+
+            self._add_text(llm_response, "".join(text))
+            for index in sorted(tool_calls):
+                self._add_tool(llm_response, *tool_calls[index])
+        except Exception as e:
+            logger.error(f"Can't stream '{self.model}' endpoint: {e}")
+            raise RuntimeError(f"Can't stream '{self.model}' endpoint: {e}") from e
+        yield LLmStreamChunk(response=llm_response)
+
+    def _request(self,
+                 system_prompt: str | None,
+                 user_message: str,
+                 chat_history: list[LLmMessage] | None,
+                 imgs_b64: list[LLMImageData] | None,
+                 tools_data: list[LLMTool] | None,
+                 structured_output: LLMStructuredOutput | None,
+                 media_turn: int | None = None) -> dict[str, Any]:
+        """Keyword arguments of chat.completions.create shared by complete() and stream()."""
+        messages = self._compose_messages(system_prompt,
+                                          user_message,
+                                          chat_history,
+                                          imgs_b64,
+                                          media_turn)
+
+        tools = None
+        if tools_data is not None:
+            tools = self._tools_data(tools_data)
+
+        json_format = None
+        if structured_output is not None:
+            json_format = self._structured_output_data(structured_output)
+
+        return {"model": self.model, "messages": messages, "tools": tools, "response_format": json_format}
+
+    @classmethod
+    def _cached_tokens(cls, usage: Any) -> int:
+        """Prompt tokens served from OpenAI's automatic prefix cache."""
+        return cls._token_count(getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", None))
+
     # text -> text
     @staticmethod
     def _chat_message(message: str):
@@ -164,7 +245,8 @@ class LlmOpenai(LlmModel):
                           system_message: str | None,
                           user_message: str | None,
                           chat_history: list[LLmMessage] | None,
-                          imgs_b64: list[LLMImageData] | None):
+                          imgs_b64: list[LLMImageData] | None,
+                          media_turn: int | None = None):
 
         messages: list[dict] = []
         if system_message is not None:
@@ -173,8 +255,14 @@ class LlmOpenai(LlmModel):
                 "content": system_message
             }]
 
-        if chat_history is not None:
-            messages.extend(self._chat_history(chat_history))
+        history: list[dict] = self._chat_history(chat_history) if chat_history is not None else []
+        # Pinned images stay on one history turn, so the prompt prefix (and OpenAI's
+        # automatic cache of it) is the same on every call of a loop
+        if imgs_b64 is not None and media_turn is not None and 0 <= media_turn < len(history):
+            pinned = history[media_turn]
+            pinned["content"] = [self._chat_message(pinned["content"]), *self._images_data(imgs_b64)]
+            imgs_b64 = None
+        messages.extend(history)
 
         user_content: list[dict] = []
         if user_message:
@@ -0,0 +1,135 @@
+"""Replica routing for one logical model served by several endpoints.
+
+A GraphModel with ``replicas`` gets one adapter per endpoint (API key,
+Bedrock region / inference profile, Ollama host) and LlmHandler sends
+each attempt through ReplicaRouter:
+
+- **Routing** — ``least_in_flight`` picks the replica with the fewest
+  calls currently running (ties rotate); ``round_robin`` cycles through
+  the healthy replicas.
+- **Health ejection** — ``eject_after`` consecutive retryable failures
+  (throttling, 5xx, transport errors) take a replica out of rotation for
+  ``eject_for`` seconds.  When it comes back, one more failure ejects it
+  again; a success restores it fully.  If every replica is ejected, the
+  one that is due back first still serves, so the model degrades instead
+  of failing outright.
+
+Retries in LlmResilience call the router again, so a retried attempt
+normally lands on a different replica.  A streamed call holds its replica
+through acquire() / release() until the stream ends, so in-flight counts
+and ejection also cover the chunks after the first.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, TypeVar
+
+from .llm_model import LlmModel
+from .llm_resilience import classify_error
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+ROUTING_POLICIES = ("least_in_flight", "round_robin")
+
+
+class _Replica:
+    def __init__(self, model: LlmModel, label: str) -> None:
+        self.model = model
+        self.label = label
+        self.in_flight = 0
+        self.failures = 0
+        self.ejected_until: float | None = None
+
+
+class ReplicaRouter:
+    """Thread-safe replica selection with passive health ejection."""
+
+    def __init__(self,
+                 models: list[LlmModel],
+                 labels: list[str] | None = None,
+                 routing: str = "least_in_flight",
+                 eject_after: int = 3,
+                 eject_for: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        if not models:
+            raise ValueError("ReplicaRouter needs at least one replica")
+        if routing not in ROUTING_POLICIES:
+            raise ValueError(f"Unknown routing policy: {routing}. Available: {list(ROUTING_POLICIES)}")
+        labels = labels or [f"replica {i}" for i in range(len(models))]
+        self.replicas = [_Replica(model, label) for model, label in zip(models, labels)]
+        self.routing = routing
+        self.eject_after = eject_after
+        self.eject_for = eject_for
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._next = 0
+
+    @property
+    def models(self) -> list[LlmModel]:
+        return [r.model for r in self.replicas]
+
+    def healthy(self) -> list[str]:
+        """Labels of the replicas currently in rotation."""
+        now = self._clock()
+        with self._lock:
+            return [r.label for r in self.replicas if self._available(r, now)]
+
+    @staticmethod
+    def _available(replica: _Replica, now: float) -> bool:
+        return replica.ejected_until is None or replica.ejected_until <= now
+
+    def acquire(self) -> _Replica:
+        """Select a replica and count a call in flight on it; pair with release()."""
+        now = self._clock()
+        with self._lock:
+            n = len(self.replicas)
+            # Rotate the scan start so ties (and round_robin) spread across replicas
+            order = [self.replicas[(self._next + i) % n] for i in range(n)]
+            self._next = (self._next + 1) % n
+            candidates = [r for r in order if self._available(r, now)]
+            if not candidates:
+                candidates = [min(order, key=lambda r: r.ejected_until)]
+            if self.routing == "least_in_flight":
+                replica = min(candidates, key=lambda r: r.in_flight)
+            else:
+                replica = candidates[0]
+            replica.in_flight += 1
+            return replica
+
+    def release(self, replica: _Replica, error: BaseException | None = None) -> None:
+        """End a call started with acquire(); a retryable error counts toward ejection."""
+        with self._lock:
+            replica.in_flight -= 1
+            if error is None or not classify_error(error)[0]:
+                # Success, or an error the endpoint answered with (bad request, auth): it is up
+                replica.failures = 0
+                replica.ejected_until = None
+                return
+            replica.failures += 1
+            if replica.failures >= self.eject_after:
+                replica.ejected_until = self._clock() + self.eject_for
+                # Back in rotation on probation: a single failure ejects it again
+                replica.failures = self.eject_after - 1
+                logger.warning(f"Replica '{replica.label}' ejected for {self.eject_for}s: {error}")
+
+    def call(self, fn: Callable[[LlmModel], T]) -> T:
+        """Run fn on the selected replica's adapter and record the outcome."""
+        replica = self.acquire()
+        try:
+            result = fn(replica.model)
+        except Exception as e:
+            self.release(replica, e)
+            raise
+        self.release(replica)
+        return result
+
+
+def replica_label(replica: dict[str, Any], index: int) -> str:
+    """Human-readable replica name for logs; never includes credentials."""
+    for field in ("host", "aws_region_name", "model"):
+        if replica.get(field):
+            return str(replica[field])
+    return f"replica {index}"
@@ -0,0 +1,275 @@
+"""Retry, backoff and circuit breaking shared by every LLM provider.
+
+Adapters used to handle failures differently: Anthropic-on-Bedrock relied
+on botocore's retry config, the SDK paths on their own built-in retries,
+and the rest wrapped the first exception in RuntimeError.  LlmHandler now
+runs every ``complete()`` through LlmResilience instead, and the SDK-level
+retries are switched off so attempts do not multiply.
+
+- **Classification** — ``classify_error()`` walks the exception chain
+  (adapters re-raise SDK errors as RuntimeError ``from e``) and treats
+  throttling, overload, 5xx and transport errors as retryable.
+- **Backoff** — exponential with full jitter, never shorter than the
+  provider's Retry-After.  A Retry-After longer than ``max_delay`` ends
+  the retries instead of parking the node.
+- **Retry budget** — a token bucket per model: every call deposits
+  ``retry_budget`` tokens, every retry spends one, so retries stay a
+  bounded fraction of traffic during an outage.
+- **Circuit breaker** — ``breaker_threshold`` consecutive retryable
+  failures open the circuit; calls then fail fast with
+  LlmCircuitOpenError until ``breaker_cooldown`` elapses and a single
+  probe call is let through.
+"""
+
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# HTTP statuses worth retrying: timeout, too early, throttled, server errors, Anthropic overload
+RETRYABLE_STATUS = frozenset({408, 425, 429, 500, 502, 503, 504, 529})
+
+# botocore error codes with the same meaning
+RETRYABLE_AWS_CODES = frozenset({
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "ServiceUnavailableException",
+    "InternalServerException",
+    "ModelNotReadyException",
+    "ModelTimeoutException",
+})
+
+# Subset meaning "slow down" rather than "broken" (drives the AIMD concurrency limiter)
+THROTTLE_STATUS = frozenset({429, 529})
+THROTTLE_AWS_CODES = frozenset({"ThrottlingException", "TooManyRequestsException"})
+
+# Transport failures (httpx, SDK wrappers, botocore, builtins) recognised by class name
+# so the classifier needs none of the provider SDKs installed
+_TRANSPORT_MARKERS = ("Timeout", "Connect", "RemoteProtocol")
+
+# Retry tokens a model starts with (and can bank at most)
+_BUDGET_CAPACITY = 10.0
+
+
+class LlmCircuitOpenError(RuntimeError):
+    """Raised without calling the provider while a model's circuit breaker is open."""
+
+    def __init__(self, model: str, retry_in: float) -> None:
+        self.model = model
+        self.retry_in = retry_in
+        super().__init__(
+            f"Circuit open for '{model}': provider failing, next probe in {retry_in:.1f}s"
+        )
+
+
+def _exception_chain(exc: BaseException):
+    seen: set[int] = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        yield exc
+        exc = exc.__cause__ or exc.__context__
+
+
+def _status_and_code(exc: BaseException) -> tuple[int | None, str | None]:
+    response = getattr(exc, "response", None)
+    if isinstance(response, dict):
+        # botocore ClientError
+        status = response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+        return status, response.get("Error", {}).get("Code")
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        # google-genai APIError carries the HTTP status in ``code``
+        code = getattr(exc, "code", None)
+        status = code if isinstance(code, int) else None
+    return status, None
+
+
+def _headers(exc: BaseException) -> Any:
+    response = getattr(exc, "response", None)
+    if isinstance(response, dict):
+        return response.get("ResponseMetadata", {}).get("HTTPHeaders") or {}
+    return getattr(response, "headers", None) or {}
+
+
+def parse_retry_after(headers: Any) -> float | None:
+    """Seconds to wait from Retry-After / retry-after-ms headers, None when absent or malformed."""
+    try:
+        value = headers.get("retry-after-ms")
+        if value is not None:
+            return max(float(value) / 1000, 0.0)
+        value = headers.get("retry-after")
+    except (AttributeError, ValueError):
+        return None
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def classify_error(exc: BaseException) -> tuple[bool, float | None]:
+    """Return (retryable, retry_after_seconds) for an exception raised by an adapter."""
+    for e in _exception_chain(exc):
+        if isinstance(e, LlmCircuitOpenError):
+            return False, None
+        status, code = _status_and_code(e)
+        if code is not None and code in RETRYABLE_AWS_CODES:
+            return True, parse_retry_after(_headers(e))
+        if status is not None:
+            return status in RETRYABLE_STATUS, parse_retry_after(_headers(e))
+        if isinstance(e, (ConnectionError, TimeoutError)):
+            return True, None
+        names = [cls.__name__ for cls in type(e).__mro__]
+        if any(marker in name for name in names for marker in _TRANSPORT_MARKERS):
+            return True, None
+    return False, None
+
+
+def is_throttling(exc: BaseException) -> bool:
+    """True when the provider rejected the call for rate or capacity reasons."""
+    for e in _exception_chain(exc):
+        status, code = _status_and_code(e)
+        if code in THROTTLE_AWS_CODES or status in THROTTLE_STATUS:
+            return True
+    return False
+
+
+class LlmResilience:
+    """Per-model retry loop, retry budget and circuit breaker. Thread-safe; one per LlmHandler."""
+
+    def __init__(self,
+                 model: str = "",
+                 max_attempts: int = 3,
+                 base_delay: float = 0.5,
+                 max_delay: float = 30.0,
+                 retry_budget: float = 0.2,
+                 breaker_threshold: int = 5,
+                 breaker_cooldown: float = 30.0,
+                 sleep: Callable[[float], None] = time.sleep,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.model = model
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_budget = retry_budget
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self._sleep = sleep
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._tokens = _BUDGET_CAPACITY
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probing = False
+
+    # ── circuit breaker ──────────────────────────────────────────────────────
+
+    @property
+    def state(self) -> str:
+        """"closed", "open" or "half_open"."""
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "open" if self._clock() - self._opened_at < self.breaker_cooldown else "half_open"
+
+    def _admit(self) -> bool:
+        """Let a call through, or raise while the circuit is open. True when the call is the probe."""
+        with self._lock:
+            if self._opened_at is None:
+                return False
+            remaining = self.breaker_cooldown - (self._clock() - self._opened_at)
+            if remaining > 0 or self._probing:
+                raise LlmCircuitOpenError(self.model, max(remaining, 0.0))
+            self._probing = True
+            return True
+
+    def _record_success(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info(f"[{self.model}] probe succeeded — circuit closed")
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def _record_failure(self, retryable: bool, probe: bool) -> None:
+        with self._lock:
+            self._probing = False
+            if not retryable:
+                # The provider answered (bad request, auth, ...): it is up
+                self._failures = 0
+                self._opened_at = None
+                return
+            self._failures += 1
+            if probe or self._failures >= self.breaker_threshold:
+                if self._opened_at is None or probe:
+                    logger.warning(
+                        f"[{self.model}] circuit opened after {self._failures} consecutive "
+                        f"failure(s) — failing fast for {self.breaker_cooldown}s"
+                    )
+                self._opened_at = self._clock()
+
+    def _is_open(self) -> bool:
+        with self._lock:
+            return self._opened_at is not None
+
+    # ── retry budget ─────────────────────────────────────────────────────────
+
+    def _deposit(self) -> None:
+        with self._lock:
+            self._tokens = min(self._tokens + self.retry_budget, _BUDGET_CAPACITY)
+
+    def _withdraw(self) -> bool:
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    # ── retry loop ───────────────────────────────────────────────────────────
+
+    def backoff(self, attempt: int, retry_after: float | None = None) -> float | None:
+        """Delay before retry number ``attempt`` (1-based); None when Retry-After exceeds max_delay."""
+        if retry_after is not None and retry_after > self.max_delay:
+            return None
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        return max(delay, retry_after or 0.0)
+
+    def call(self, fn: Callable[[], T]) -> T:
+        """Run fn, retrying retryable failures within the attempt limit, budget and breaker."""
+        self._deposit()
+        attempt = 0
+        while True:
+            probe = self._admit()
+            attempt += 1
+            try:
+                result = fn()
+            except Exception as e:
+                retryable, retry_after = classify_error(e)
+                self._record_failure(retryable, probe)
+                if not retryable or attempt >= self.max_attempts or self._is_open():
+                    raise
+                delay = self.backoff(attempt, retry_after)
+                if delay is None:
+                    logger.warning(f"[{self.model}] Retry-After {retry_after:.0f}s exceeds "
+                                   f"max_delay {self.max_delay}s — not retrying")
+                    raise
+                if not self._withdraw():
+                    logger.warning(f"[{self.model}] retry budget exhausted — not retrying")
+                    raise
+                logger.warning(f"[{self.model}] attempt {attempt}/{self.max_attempts} failed "
+                               f"({e}) — retrying in {delay:.2f}s")
+                self._sleep(delay)
+                continue
+            self._record_success()
+            return result
@@ -0,0 +1,112 @@
+"""Single-flight coalescing of identical in-flight LLM calls.
+
+In fan-out graphs and concurrent runs several nodes often send
+byte-identical requests at the same moment (same template, same inputs,
+``temperature: 0``).  A response cache cannot help because none has
+finished yet.  LlmHandler routes such calls through SingleFlight: the
+first caller for a request key (the leader) makes the provider call, and
+callers arriving with the same key while it runs wait for it and share
+its result — or its exception.
+
+Keys are SHA-256 digests of the canonical request (sorted JSON of every
+argument, pydantic models dumped) prefixed with the endpoint scope, so
+credentials never sit in the table and different models or API keys
+never share a call.  A key only lives while its call is in flight:
+nothing is cached once it completes.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from typing import Any, Callable, TypeVar
+
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def _canonical(value: Any) -> Any:
+    """JSON-serializable form of value with a stable layout."""
+    if isinstance(value, BaseModel):
+        return _canonical(value.model_dump(mode="json"))
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, (bytes, bytearray)):
+        return hashlib.sha256(value).hexdigest()
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return repr(value)
+
+
+def request_key(scope: str, kwargs: dict[str, Any]) -> str:
+    """Digest identifying a request: equal only for identical arguments within one scope."""
+    payload = json.dumps(_canonical(kwargs), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(f"{scope}\n{payload}".encode()).hexdigest()
+
+
+class _Flight:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """Table of in-flight calls keyed by request; thread-safe."""
+
+    _shared: "SingleFlight | None" = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._flights: dict[str, _Flight] = {}
+
+    @classmethod
+    def shared(cls) -> "SingleFlight":
+        """Return the process-wide table, so identical calls coalesce across Compilers."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._flights)
+
+    def call(self, key: str, fn: Callable[[], T]) -> tuple[T, bool]:
+        """Run fn, or wait for the identical call already running.
+
+        Returns (result, leader): leader is False when the result came from
+        another caller's call.  A failed call raises in every waiter.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                flight.followers += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, False
+
+        try:
+            flight.result = fn()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            if flight.followers:
+                logger.debug(f"single-flight: {flight.followers} identical call(s) shared one provider call")
+            flight.done.set()
+        return flight.result, True
@@ -5,107 +5,370 @@ executes tool calls on behalf of the compiler.  The LLM layer never
 talks MCP directly — it only sees translated LLMTool definitions and
 receives plain-string results back.
 
-The async MCP session runs on a dedicated background thread with its own
-event loop.  The entire session lifetime — connect, tool calls, disconnect —
-executes within a single async task so that anyio cancel scopes are always
-entered and exited from the same task, avoiding the
+The async MCP sessions run as tasks on the process-wide McpRuntime loop
+(one thread for all servers), or on a caller-supplied loop.  A server
+may be opened as a pool of ``pool_size`` sessions (one subprocess or
+connection each); tool calls go to the least-busy healthy session.
+A ``lazy`` server is only started by its first tool listing or call,
+and with ``idle_timeout`` is shut down again when unused.  A session
+that drops (server crash, failed health check, broken transport) is
+reopened with exponential backoff; calls interrupted by the drop are
+retried when they never reached the server or the tool is declared
+idempotent.  Each session's lifetime — connect, tool calls,
+disconnect — executes within a single async task so that anyio cancel
+scopes are always entered and exited from the same task, avoiding the
 "Attempted to exit cancel scope in a different task" error.
 """
 
 import asyncio
+import functools
 import json
 import logging
 import threading
-from concurrent.futures import Future
-from typing import Any
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Callable
 
-from mcp import ClientSession, StdioServerParameters
+import anyio
+from mcp import ClientSession, StdioServerParameters, types as mcp_types
 from mcp.client.stdio import stdio_client
 from mcp.client.sse import sse_client
+from mcp.client.streamable_http import streamablehttp_client
+from mcp.shared.exceptions import McpError
 
 from .graph import GraphMcpServer
+from .mcp_runtime import McpRuntime
 from .llm.llm_model import LLMTool, LLMStructuredSchema
 
 logger = logging.getLogger(__name__)
 
 
 _DEFAULT_CALL_TIMEOUT = 60  # seconds per tool call
+_PING_TIMEOUT = 10          # seconds before a health-check ping counts as failed
+_MAX_RECONNECT_BACKOFF = 30 # seconds — cap on the exponential reconnect delay
+
+# Errors raised by a session whose transport is gone. "Unsent" errors come from
+# writing the request, so the server never saw the call and it is always safe
+# to retry; the others may surface after the server already ran the tool.
+_UNSENT_ERRORS = (anyio.ClosedResourceError, anyio.BrokenResourceError)
+_LOST_ERRORS = (anyio.EndOfStream, ConnectionError)
+
+
+def _connection_lost(e: Exception) -> bool:
+    if isinstance(e, _UNSENT_ERRORS + _LOST_ERRORS):
+        return True
+    return isinstance(e, McpError) and e.error.code == mcp_types.CONNECTION_CLOSED
+
+
+class _PoolSlot:
+    """One pooled MCP session (one stdio subprocess or one SSE connection)."""
+
+    def __init__(self, index: int) -> None:
+        self.index = index
+        self.session: ClientSession | None = None
+        self.in_flight = 0
+        self.healthy = False
+        self.error: Exception | None = None
+        self.ready = asyncio.Event()
+        # set when a call or health check finds the session dead; the slot then reconnects
+        self.broken = asyncio.Event()
+        self.reconnecting = False
 
 
 class McpHandler:
-    def __init__(self, server: GraphMcpServer, call_timeout: float = _DEFAULT_CALL_TIMEOUT) -> None:
+    def __init__(self, server: GraphMcpServer,
+                 call_timeout: float = _DEFAULT_CALL_TIMEOUT,
+                 runtime: McpRuntime | None = None) -> None:
         self._server = server
         self._call_timeout = call_timeout
-        self._session: ClientSession | None = None
+        self._slots: list[_PoolSlot] = []
         self._tools: dict[str, LLMTool] = {}
-
-        # threading.Event: set once the session is ready (or failed)
+        # Immutable snapshots rebuilt only when the tool list changes, so
+        # list_tools() / tool_names() never rebuild containers per call.
+        self._tool_list: tuple[LLMTool, ...] = ()
+        self._tool_names: frozenset[str] = frozenset()
+        self._tools_changed_listeners: list[Callable[[], None]] = []
+        self._listeners_lock = threading.Lock()
+
+        # Set once the session pool is ready (or failed): threading.Event for
+        # synchronous callers, asyncio.Event for coroutines on the runtime loop
         self._ready = threading.Event()
+        self._aready = asyncio.Event()
         self._connect_error: Exception | None = None
 
-        # asyncio.Event: set by disconnect() to trigger session teardown
-        self._stop_event: asyncio.Event | None = None
+        # asyncio.Event: set by disconnect() or the idle watch to trigger session teardown
+        self._stop_event = asyncio.Event()
+        self._last_used = time.monotonic()
+        # asyncio.Event: set whenever a session (re)opens, wakes calls waiting for one
+        self._slot_up = asyncio.Event()
+
+        # All handlers share one loop thread per process unless a runtime is given
+        self._runtime = runtime or McpRuntime.shared()
+        self._lifetime: Future | None = None
+        self._start_lock = threading.Lock()
+        if not server.lazy:
+            self._start()
+
+    @property
+    def lazy(self) -> bool:
+        return self._server.lazy
+
+    def is_connected(self) -> bool:
+        """True while a session pool is up and not shutting down."""
+        return (
+            self._lifetime is not None
+            and not self._lifetime.done()
+            and self._ready.is_set()
+            and self._connect_error is None
+            and not self._stop_event.is_set()
+        )
 
-        # Dedicated event loop running on a background thread
-        self._loop = asyncio.new_event_loop()
-        self._thread = threading.Thread(target=self._run_loop, daemon=True)
-        self._thread.start()
+    def _start(self) -> None:
+        """Schedule a fresh session pool on the runtime loop."""
+        self._ready = threading.Event()
+        self._aready = asyncio.Event()
+        self._connect_error = None
+        self._stop_event = asyncio.Event()
+        self._slot_up = asyncio.Event()
+        self._last_used = time.monotonic()
+        self._lifetime = self._runtime.submit(self._session_lifetime())
+
+    def _stopping_lifetime(self) -> Future | None:
+        """The previous pool's task while it is still tearing down, else None."""
+        if self._lifetime is not None and not self._lifetime.done() and self._stop_event.is_set():
+            return self._lifetime
+        return None
+
+    def _ensure_started(self) -> None:
+        """Start the pool if it has never run, failed to connect or was shut down idle."""
+        with self._start_lock:
+            self._last_used = time.monotonic()
+            stopping = self._stopping_lifetime()
+            if stopping is not None:
+                try:
+                    stopping.result(timeout=5)
+                except Exception:
+                    pass
+            if self._lifetime is None or self._lifetime.done():
+                self._start()
+
+    def _ensure_connected(self) -> None:
+        """Lazy servers: connect on first use (and again after an idle shutdown)."""
+        if self._server.lazy and not self.is_connected():
+            self.connect()
 
     # ------------------------------------------------------------------
-    # Background thread — runs the entire session lifetime in one task
+    # Runtime loop — runs the session pool; each pooled session lives
+    # entirely inside its own task
     # ------------------------------------------------------------------
 
-    def _run_loop(self) -> None:
-        self._loop.run_until_complete(self._session_lifetime())
+    def _set_ready(self) -> None:
+        self._ready.set()
+        self._aready.set()
 
     async def _session_lifetime(self) -> None:
-        """Single long-lived coroutine: connect → wait for stop → disconnect."""
-        self._stop_event = asyncio.Event()
+        """Long-lived task: open pool_size sessions → wait for stop → disconnect."""
+        self._slots = [_PoolSlot(i) for i in range(self._server.pool_size)]
+        tasks = [asyncio.ensure_future(self._slot_lifetime(slot)) for slot in self._slots]
         try:
-            if self._server.transport == "stdio":
-                if not self._server.command:
-                    raise ValueError(f"MCP server '{self._server.id}': 'command' required for stdio")
-                params = StdioServerParameters(
-                    command=self._server.command,
-                    args=self._server.args or [],
-                    env=self._server.env,
-                )
-                transport_cm = stdio_client(params)
-            else:
-                if not self._server.url:
-                    raise ValueError(f"MCP server '{self._server.id}': 'url' required for sse")
-                transport_cm = sse_client(self._server.url)
-
-            async with transport_cm as (read, write):
-                async with ClientSession(read, write) as session:
-                    self._session = session
-                    await session.initialize()
-                    await self._refresh_tools()
-                    logger.info(
-                        f"MCP server '{self._server.id}' connected — "
-                        f"{len(self._tools)} tools available"
-                    )
-                    self._ready.set()
-                    # Hold the session open until disconnect() signals us
-                    await self._stop_event.wait()
-
+            await asyncio.gather(*(slot.ready.wait() for slot in self._slots))
+            failed = [slot for slot in self._slots if slot.error is not None]
+            if failed:
+                raise failed[0].error
+            await self._refresh_tools()
+            logger.info(
+                f"MCP server '{self._server.id}' connected — "
+                f"{len(self._tools)} tools available"
+                + (f", {len(self._slots)} sessions" if len(self._slots) > 1 else "")
+            )
+            self._set_ready()
+            if self._server.idle_timeout is not None:
+                self._last_used = time.monotonic()  # idle time counts from ready, not spawn
+                tasks.append(asyncio.ensure_future(self._idle_watch()))
         except Exception as e:
             self._connect_error = e
-            self._ready.set()
+            self._set_ready()
+            self._stop_event.set()
+        # Each slot task returns once _stop_event is set and its session is closed
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _idle_watch(self) -> None:
+        """Shut the pool down once no tool call has used it for idle_timeout seconds."""
+        timeout = self._server.idle_timeout
+        while not self._stop_event.is_set():
+            idle = time.monotonic() - self._last_used
+            if idle >= timeout and not any(slot.in_flight for slot in self._slots):
+                logger.info(
+                    f"MCP server '{self._server.id}' idle for {idle:.1f}s — disconnecting"
+                )
+                self._stop_event.set()
+                return
+            try:
+                await asyncio.wait_for(
+                    self._stop_event.wait(), timeout=timeout - idle if idle < timeout else timeout
+                )
+            except asyncio.TimeoutError:
+                pass
+
+    def _open_transport(self):
+        if self._server.transport == "stdio":
+            if not self._server.command:
+                raise ValueError(f"MCP server '{self._server.id}': 'command' required for stdio")
+            params = StdioServerParameters(
+                command=self._server.command,
+                args=self._server.args or [],
+                env=self._server.env,
+            )
+            return stdio_client(params)
+        if not self._server.url:
+            raise ValueError(
+                f"MCP server '{self._server.id}': 'url' required for {self._server.transport}"
+            )
+        if self._server.transport == "streamable_http":
+            # One pooled httpx client per session: HTTP connections are kept alive
+            # across requests instead of being reopened per tool call.
+            return streamablehttp_client(self._server.url)
+        return sse_client(self._server.url)
+
+    async def _slot_lifetime(self, slot: _PoolSlot) -> None:
+        """Open one session and hold it until stopped, reopening it with exponential
+        backoff (up to max_reconnect_attempts in a row) whenever it drops."""
+        attempt = 0
+        try:
+            while True:
+                try:
+                    async with self._open_transport() as streams:
+                        # streamable_http also yields a session-id getter
+                        read, write = streams[0], streams[1]
+                        async with ClientSession(
+                            read, write, message_handler=functools.partial(self._on_message, slot=slot)
+                        ) as session:
+                            await session.initialize()
+                            slot.session = session
+                            slot.healthy = True
+                            slot.reconnecting = False
+                            if attempt:
+                                logger.info(
+                                    f"MCP server '{self._server.id}': session {slot.index} reconnected"
+                                )
+                                # A restarted server may expose a different catalog
+                                asyncio.get_running_loop().create_task(self._refresh_and_notify(slot))
+                            attempt = 0
+                            slot.ready.set()
+                            self._slot_up.set()
+                            await self._hold_slot(slot)
+                except Exception as e:
+                    if not slot.ready.is_set():
+                        slot.error = e
+                        return
+                    logger.warning(
+                        f"MCP server '{self._server.id}': session {slot.index} closed unexpectedly: {e}"
+                    )
+                finally:
+                    slot.session = None
+                    slot.healthy = False
+                if self._stop_event.is_set():
+                    return
+                if attempt >= self._server.max_reconnect_attempts:
+                    if attempt:
+                        logger.error(
+                            f"MCP server '{self._server.id}': session {slot.index} gave up "
+                            f"after {attempt} reconnect attempt(s)"
+                        )
+                    return
+                delay = min(self._server.reconnect_backoff * 2 ** attempt, _MAX_RECONNECT_BACKOFF)
+                attempt += 1
+                slot.reconnecting = True
+                slot.broken = asyncio.Event()
+                logger.info(
+                    f"MCP server '{self._server.id}': reconnecting session {slot.index} in {delay:.1f}s "
+                    f"(attempt {attempt}/{self._server.max_reconnect_attempts})"
+                )
+                try:
+                    await asyncio.wait_for(self._stop_event.wait(), timeout=delay)
+                    return
+                except asyncio.TimeoutError:
+                    pass
         finally:
-            self._session = None
+            slot.reconnecting = False
+            slot.ready.set()
+
+    async def _wait_released(self, slot: _PoolSlot, timeout: float | None) -> bool:
+        """Wait until disconnect() or the slot breaks; False if the timeout ran out first."""
+        waiters = [
+            asyncio.ensure_future(self._stop_event.wait()),
+            asyncio.ensure_future(slot.broken.wait()),
+        ]
+        done, pending = await asyncio.wait(
+            waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+        )
+        for task in pending:
+            task.cancel()
+        return bool(done)
+
+    def _break_slot(self, slot: _PoolSlot) -> None:
+        """Take a dead session out of dispatch and let its task reopen it."""
+        slot.healthy = False
+        slot.reconnecting = self._server.max_reconnect_attempts > 0
+        slot.broken.set()
+
+    async def _hold_slot(self, slot: _PoolSlot) -> None:
+        """Hold the session until disconnect() or until it breaks; ping it every
+        health_check_interval seconds when configured."""
+        interval = self._server.health_check_interval
+        while not (self._stop_event.is_set() or slot.broken.is_set()):
+            if await self._wait_released(slot, interval):
+                return
+            try:
+                await asyncio.wait_for(slot.session.send_ping(), timeout=_PING_TIMEOUT)
+                if not slot.healthy:
+                    logger.info(f"MCP server '{self._server.id}': session {slot.index} healthy again")
+                slot.healthy = True
+            except Exception as e:
+                if slot.healthy:
+                    logger.warning(
+                        f"MCP server '{self._server.id}': session {slot.index} failed health check: {e}"
+                    )
+                slot.healthy = False
+                if _connection_lost(e):
+                    self._break_slot(slot)
+
+    def _pick_slot(self) -> _PoolSlot | None:
+        """Least-busy healthy session; ties go to the lowest index."""
+        candidates = [s for s in self._slots if s.session is not None and s.healthy]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda s: s.in_flight)
 
     def _run(self, coro) -> Any:
-        """Submit a coroutine to the background loop and block until done."""
-        future: Future = asyncio.run_coroutine_threadsafe(coro, self._loop)
-        return future.result(timeout=self._call_timeout)
+        """Submit a coroutine to the runtime loop and block until done."""
+        if self._runtime.in_loop():
+            coro.close()
+            raise RuntimeError(
+                f"MCP server '{self._server.id}': blocking call made from the MCP runtime loop — "
+                f"await the async variant (aconnect / acall_tool / adisconnect) instead."
+            )
+        future: Future = self._runtime.submit(coro)
+        try:
+            return future.result(timeout=self._call_timeout)
+        except FutureTimeoutError:
+            # Stop the coroutine too, so a timed-out tool call is not retried later
+            future.cancel()
+            raise
+
+    async def _on_runtime(self, coro) -> Any:
+        """Await a coroutine on the runtime loop from any event loop."""
+        if self._runtime.in_loop():
+            return await coro
+        return await asyncio.wrap_future(self._runtime.submit(coro))
 
     # ------------------------------------------------------------------
     # Lifecycle
     # ------------------------------------------------------------------
 
     def connect(self) -> None:
-        """Block until the session is ready (or raise on failure)."""
+        """Start the session pool if needed and block until it is ready (or raise on failure)."""
+        self._ensure_started()
         if not self._ready.wait(timeout=30):
             raise TimeoutError(
                 f"MCP server '{self._server.id}' did not become ready within 30 seconds. "
@@ -116,22 +379,104 @@ class McpHandler:
         logger.info(f"MCP server '{self._server.id}' ready")
 
     def disconnect(self) -> None:
-        """Signal the session to shut down and wait for the thread to exit."""
-        if self._stop_event is not None:
-            self._loop.call_soon_threadsafe(self._stop_event.set)
-        self._thread.join(timeout=5)
-        self._loop.close()
+        """Signal the sessions to shut down and wait for their task to finish."""
+        if self._lifetime is None:
+            return
+        self._runtime.call_soon(self._stop_event.set)
+        try:
+            self._lifetime.result(timeout=5)
+        except Exception as e:
+            logger.warning(f"MCP server '{self._server.id}' did not shut down cleanly: {e}")
+        logger.info(f"MCP server '{self._server.id}' disconnected")
+
+    async def aconnect(self) -> None:
+        """Async connect() for callers running their own event loop."""
+        while (stopping := self._stopping_lifetime()) is not None:
+            await asyncio.wrap_future(stopping)
+        self._ensure_started()
+        try:
+            await asyncio.wait_for(self._on_runtime(self._aready.wait()), timeout=30)
+        except asyncio.TimeoutError:
+            raise TimeoutError(
+                f"MCP server '{self._server.id}' did not become ready within 30 seconds. "
+                f"Check that the command/URL is correct and the server process starts successfully."
+            ) from None
+        if self._connect_error is not None:
+            raise self._connect_error
+        logger.info(f"MCP server '{self._server.id}' ready")
+
+    async def adisconnect(self) -> None:
+        """Async disconnect() for callers running their own event loop."""
+        if self._lifetime is None:
+            return
+        self._runtime.call_soon(self._stop_event.set)
+        await asyncio.wrap_future(self._lifetime)
         logger.info(f"MCP server '{self._server.id}' disconnected")
 
     # ------------------------------------------------------------------
     # Tool discovery
     # ------------------------------------------------------------------
 
-    async def _refresh_tools(self) -> None:
-        result = await self._session.list_tools()
-        self._tools = {}
+    async def _refresh_tools(self, slot: _PoolSlot | None = None) -> bool:
+        """Reload the tool list; True when it differs from the previous one."""
+        slot = slot or self._pick_slot()
+        if slot is None:
+            raise RuntimeError(f"MCP server '{self._server.id}' is not connected")
+        result = await slot.session.list_tools()
+        tools: dict[str, LLMTool] = {}
         for tool in result.tools:
-            self._tools[tool.name] = self._translate_tool(tool)
+            tools[tool.name] = self._translate_tool(tool)
+        changed = tools != self._tools
+        self._tools = tools
+        self._tool_list = tuple(tools.values())
+        self._tool_names = frozenset(tools)
+        return changed
+
+    async def _on_message(self, message, slot: _PoolSlot | None = None) -> None:
+        """Session message handler — refresh tools on notifications/tools/list_changed.
+
+        The refresh runs as a separate task: the handler is awaited from the
+        session's receive loop, so issuing list_tools() inline would deadlock
+        waiting for a response that the same loop has to read.
+        """
+        root = getattr(message, "root", message)
+        if isinstance(root, mcp_types.ToolListChangedNotification):
+            asyncio.get_running_loop().create_task(self._refresh_and_notify(slot))
+
+    async def _refresh_and_notify(self, slot: _PoolSlot | None = None) -> None:
+        if slot is not None and slot.session is None:
+            return
+        try:
+            changed = await self._refresh_tools(slot)
+        except Exception as e:
+            logger.warning(f"MCP server '{self._server.id}': tool list refresh failed: {e}")
+            return
+        if not changed:
+            return
+        logger.info(
+            f"MCP server '{self._server.id}' tool list changed — "
+            f"{len(self._tools)} tools available"
+        )
+        self._notify_tools_changed()
+
+    def _notify_tools_changed(self) -> None:
+        with self._listeners_lock:
+            listeners = list(self._tools_changed_listeners)
+        for listener in listeners:
+            try:
+                listener()
+            except Exception as e:
+                logger.warning(f"MCP server '{self._server.id}': tools-changed listener failed: {e}")
+
+    def add_tools_changed_listener(self, listener: Callable[[], None]) -> None:
+        """Register a callback invoked (from the session thread) after the tool list changes."""
+        with self._listeners_lock:
+            self._tools_changed_listeners.append(listener)
+
+    def remove_tools_changed_listener(self, listener: Callable[[], None]) -> None:
+        with self._listeners_lock:
+            if listener in self._tools_changed_listeners:
+                self._tools_changed_listeners.remove(listener)
 
     @staticmethod
     def _translate_tool(mcp_tool) -> LLMTool:
@@ -154,22 +499,83 @@ class McpHandler:
         )
 
     def list_tools(self) -> list[LLMTool]:
-        return list(self._tools.values())
+        self._ensure_connected()
+        return list(self._tool_list)
 
-    def tool_names(self) -> set[str]:
-        return set(self._tools.keys())
+    def tool_names(self) -> frozenset[str]:
+        self._ensure_connected()
+        return self._tool_names
 
     # ------------------------------------------------------------------
     # Tool execution
     # ------------------------------------------------------------------
 
     def call_tool(self, name: str, arguments: dict[str, Any]) -> str:
+        self._ensure_connected()
         return self._run(self._acall_tool(name, arguments))
 
+    async def acall_tool(self, name: str, arguments: dict[str, Any]) -> str:
+        """Await a tool call natively — no thread hop when already on the runtime loop."""
+        if self._server.lazy and not self.is_connected():
+            await self.aconnect()
+        return await asyncio.wait_for(
+            self._on_runtime(self._acall_tool(name, arguments)), timeout=self._call_timeout
+        )
+
+    async def _await_slot(self, deadline: float) -> _PoolSlot:
+        """Least-busy healthy session, waiting until deadline (loop time) while sessions reconnect."""
+        loop = asyncio.get_running_loop()
+        while (slot := self._pick_slot()) is None:
+            remaining = deadline - loop.time()
+            if (not any(s.reconnecting for s in self._slots)
+                    or self._stop_event.is_set() or remaining <= 0):
+                raise RuntimeError(f"MCP server '{self._server.id}' is not connected")
+            self._slot_up.clear()
+            try:
+                await asyncio.wait_for(self._slot_up.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                pass
+        return slot
+
     async def _acall_tool(self, name: str, arguments: dict[str, Any]) -> str:
-        if self._session is None:
-            raise RuntimeError(f"MCP server '{self._server.id}' is not connected")
-        result = await self._session.call_tool(name, arguments)
+        # One call_timeout budget covers waiting for a session, the call and its retries
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self._call_timeout
+        retries = 0
+        while True:
+            slot = await self._await_slot(deadline)
+            slot.in_flight += 1
+            self._last_used = time.monotonic()
+            try:
+                result = await asyncio.wait_for(
+                    slot.session.call_tool(name, arguments), timeout=max(deadline - loop.time(), 0)
+                )
+                break
+            except asyncio.TimeoutError:
+                raise TimeoutError(
+                    f"MCP server '{self._server.id}': call to '{name}' timed out "
+                    f"after {self._call_timeout}s"
+                ) from None
+            except Exception as e:
+                if not _connection_lost(e):
+                    raise
+                self._break_slot(slot)
+                unsent = isinstance(e, _UNSENT_ERRORS)
+                idempotent = name in (self._server.idempotent_tools or ())
+                if not (unsent or idempotent) or retries >= self._server.max_reconnect_attempts:
+                    raise RuntimeError(
+                        f"MCP server '{self._server.id}': connection lost during call to '{name}'"
+                        + ("" if unsent or idempotent else
+                           " — not retried because the tool is not listed in idempotent_tools")
+                    ) from e
+                retries += 1
+                logger.warning(
+                    f"MCP server '{self._server.id}': connection lost during call to '{name}', "
+                    f"retrying (retry {retries})"
+                )
+            finally:
+                slot.in_flight -= 1
+                self._last_used = time.monotonic()
         parts: list[str] = []
         for block in result.content:
             if hasattr(block, "text"):
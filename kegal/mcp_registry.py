@@ -0,0 +1,88 @@
+"""Process-wide registry of shared MCP handlers.
+
+Compilers built in the same process over the same tool servers used to
+spawn one set of MCP subprocesses (or SSE connections) each.  The
+registry keys handlers on the server configuration — everything in a
+GraphMcpServer except its graph-local ``id`` — and hands out the same
+McpHandler to every Compiler that declares an identical server.  Each
+acquire() takes a reference; the handler is disconnected when the last
+reference is released.
+"""
+
+import json
+import logging
+import threading
+
+from .graph import GraphMcpServer
+from .mcp_handler import McpHandler
+
+logger = logging.getLogger(__name__)
+
+
+class _RegistryEntry:
+    def __init__(self, key: str, handler: McpHandler) -> None:
+        self.key = key
+        self.handler = handler
+        self.refs = 0
+
+
+class McpRegistry:
+    _shared: "McpRegistry | None" = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._by_key: dict[str, _RegistryEntry] = {}
+        self._by_handler: dict[int, _RegistryEntry] = {}
+
+    @classmethod
+    def shared(cls) -> "McpRegistry":
+        """Return the process-wide registry."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    @staticmethod
+    def key(server: GraphMcpServer) -> str:
+        """Identity of a server: its full config minus the graph-local id."""
+        return json.dumps(server.model_dump(exclude={"id"}), sort_keys=True)
+
+    def acquire(self, server: GraphMcpServer) -> McpHandler:
+        """Return the shared handler for this config, creating it on first use."""
+        key = self.key(server)
+        with self._lock:
+            entry = self._by_key.get(key)
+            if entry is None:
+                entry = _RegistryEntry(key, McpHandler(server))
+                self._by_key[key] = entry
+                self._by_handler[id(entry.handler)] = entry
+            else:
+                logger.info(
+                    f"MCP server '{server.id}' shares the running handler of an identical config "
+                    f"({entry.refs} other reference(s))"
+                )
+            entry.refs += 1
+            return entry.handler
+
+    def release(self, handler: McpHandler) -> None:
+        """Drop one reference; disconnect the handler when none are left.
+
+        A handler that was never acquired from this registry is owned by the
+        caller alone and is disconnected immediately.
+        """
+        with self._lock:
+            entry = self._by_handler.get(id(handler))
+            if entry is not None and entry.handler is handler:
+                entry.refs -= 1
+                if entry.refs > 0:
+                    return
+                del self._by_key[entry.key]
+                del self._by_handler[id(handler)]
+        handler.disconnect()
+
+    def refcount(self, server: GraphMcpServer) -> int:
+        """Number of live references to the handler for this config (0 if none)."""
+        with self._lock:
+            entry = self._by_key.get(self.key(server))
+            return entry.refs if entry is not None else 0
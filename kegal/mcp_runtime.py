@@ -0,0 +1,74 @@
+"""Shared event loop hosting every MCP session in the process.
+
+Each McpHandler used to own an asyncio loop and a daemon thread.  The
+runtime replaces them with one loop thread per process: every pooled
+session lives in its own task on that loop, and synchronous callers
+cross into it once per call through run_coroutine_threadsafe.
+
+A runtime can also wrap a loop the caller already runs (async
+execution).  In that case no thread is started and handlers must be
+driven through their ``a*`` coroutines from that loop.
+"""
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Coroutine
+
+logger = logging.getLogger(__name__)
+
+
+class McpRuntime:
+    _shared: "McpRuntime | None" = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, loop: asyncio.AbstractEventLoop | None = None) -> None:
+        if loop is not None:
+            # Caller-managed loop: sessions run as tasks on it, no extra thread
+            self.loop = loop
+            self._thread: threading.Thread | None = None
+            return
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._run_forever, name="kegal-mcp-runtime", daemon=True
+        )
+        self._thread.start()
+
+    @classmethod
+    def shared(cls) -> "McpRuntime":
+        """Return the process-wide runtime, starting its loop thread on first use."""
+        with cls._shared_lock:
+            if cls._shared is None or cls._shared.loop.is_closed():
+                cls._shared = cls()
+            return cls._shared
+
+    def _run_forever(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    @property
+    def owns_thread(self) -> bool:
+        return self._thread is not None
+
+    def in_loop(self) -> bool:
+        """True when called from a coroutine or callback running on this runtime's loop."""
+        try:
+            return asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            return False
+
+    def submit(self, coro: Coroutine[Any, Any, Any]) -> Future:
+        """Schedule a coroutine on the runtime loop from any thread."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def call_soon(self, callback: Callable[[], Any]) -> None:
+        self.loop.call_soon_threadsafe(callback)
+
+    def close(self) -> None:
+        """Stop the loop thread of a runtime that owns one. The shared runtime is never closed."""
+        if self._thread is None or self is McpRuntime._shared:
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
+        self.loop.close()
@@ -0,0 +1,60 @@
+"""Bounding the size of observations fed back to a model.
+
+Tool results and ReAct agent outputs are appended to the conversation
+and resent on every following call, so a single large payload (a SQL
+dump, a web page) inflates every later turn.  A node's ``observations``
+policies shrink such payloads before they enter the conversation; the
+full text stays in ``tool_results`` and the ReAct trace.
+
+This module holds the model-free strategies: head/tail truncation and
+field extraction from JSON.  Summarizing and spilling to a blackboard
+need the Compiler and live there.
+"""
+
+import json
+from typing import Any
+
+
+def truncate_observation(text: str, max_chars: int, head_ratio: float = 0.7) -> str:
+    """Keep the head and tail of text within roughly max_chars, marking the omitted middle."""
+    if len(text) <= max_chars:
+        return text
+    head = int(max_chars * head_ratio)
+    tail = max_chars - head
+    omitted = len(text) - head - tail
+    marker = f"\n… [{omitted} characters omitted] …\n"
+    return text[:head] + marker + (text[-tail:] if tail else "")
+
+
+def _pick(value: Any, path: list[str]) -> tuple[bool, Any]:
+    for key in path:
+        if isinstance(value, dict) and key in value:
+            value = value[key]
+        else:
+            return False, None
+    return True, value
+
+
+def _extract(value: Any, fields: list[str]) -> Any:
+    if isinstance(value, list):
+        return [_extract(item, fields) for item in value]
+    if not isinstance(value, dict):
+        return value
+    kept: dict[str, Any] = {}
+    for field in fields:
+        found, picked = _pick(value, field.split("."))
+        if found:
+            kept[field] = picked
+    return kept
+
+
+def extract_observation(text: str, fields: list[str]) -> str | None:
+    """Keep only the given (dotted) fields of a JSON observation; None when text is not JSON.
+
+    A top-level list is treated as records and the fields are kept from each.
+    """
+    try:
+        value = json.loads(text)
+    except (json.JSONDecodeError, TypeError):
+        return None
+    return json.dumps(_extract(value, fields), ensure_ascii=False)
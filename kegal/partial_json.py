@@ -0,0 +1,104 @@
+"""Incremental parsing of a streamed JSON object.
+
+A ReAct controller streams its routing decision as one JSON object
+(text deltas, or tool-input JSON fragments on Anthropic / Bedrock).
+PartialJsonObject consumes those fragments and exposes each top-level
+field as soon as its value is complete, so the compiler can act on
+``next_agent`` / ``agent_input`` while the model is still writing a long
+``reasoning``.  Only the top level is tracked; nested values are decoded
+with json.loads once they close.
+"""
+
+import json
+from typing import Any
+
+
+class PartialJsonObject:
+    """Top-level fields of a JSON object that is still being streamed."""
+
+    def __init__(self) -> None:
+        self.fields: dict[str, Any] = {}
+        self._started = False
+        self._closed = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._key_chars: list[str] | None = None   # collecting a top-level key
+        self._key: str | None = None               # key whose value comes next / is being read
+        self._value_chars: list[str] | None = None  # collecting that value
+
+    @property
+    def closed(self) -> bool:
+        """True once the object's closing brace has been read."""
+        return self._closed
+
+    def feed(self, text: str) -> list[str]:
+        """Consume a fragment; return the names of the fields it completed, in order."""
+        completed: list[str] = []
+        for ch in text:
+            if self._closed:
+                break
+            if not self._started:
+                # Skip anything before the object (whitespace, a code fence)
+                if ch == "{":
+                    self._started = True
+                    self._depth = 1
+                continue
+            self._step(ch, completed)
+        return completed
+
+    def _step(self, ch: str, completed: list[str]) -> None:
+        if self._value_chars is not None:
+            self._value_chars.append(ch)
+        elif self._key_chars is not None and not (self._in_string and not self._escape and ch == '"'):
+            self._key_chars.append(ch)
+
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif ch == "\\":
+                self._escape = True
+            elif ch == '"':
+                self._in_string = False
+                if self._key_chars is not None:
+                    self._key = json.loads('"' + "".join(self._key_chars) + '"')
+                    self._key_chars = None
+                elif self._depth == 1 and self._value_chars is not None:
+                    self._finish(completed)
+            return
+
+        if ch == '"':
+            self._in_string = True
+            if self._depth == 1 and self._key is None and self._value_chars is None:
+                self._key_chars = []
+        elif ch == ":" and self._depth == 1 and self._key is not None and self._value_chars is None:
+            self._value_chars = []
+        elif ch in "{[":
+            self._depth += 1
+        elif ch in "}]":
+            self._depth -= 1
+            if self._depth == 1 and self._value_chars is not None:
+                self._finish(completed)
+            elif self._depth == 0:
+                if self._value_chars is not None:
+                    self._value_chars.pop()     # the object's closing brace
+                    self._finish(completed)
+                self._closed = True
+        elif ch == "," and self._depth == 1:
+            if self._value_chars is not None:
+                self._value_chars.pop()
+                self._finish(completed)
+
+    def _finish(self, completed: list[str]) -> None:
+        """Decode the value just read and record it under the current key."""
+        raw = "".join(self._value_chars or []).strip()
+        key = self._key
+        self._key = None
+        self._value_chars = None
+        if not raw or key is None:
+            return
+        try:
+            self.fields[key] = json.loads(raw)
+        except json.JSONDecodeError:
+            return
+        completed.append(key)
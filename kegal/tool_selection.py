@@ -0,0 +1,113 @@
+"""Tool retrieval: rank a node's tools against its prompt and keep the top-k.
+
+Nodes wired to large MCP catalogs would otherwise send every tool schema
+on every turn of the tool loop.  ToolRanker scores tools with BM25 over
+their name, description and parameter docs (names weighted twice, and
+split on ``_``/camelCase so ``query_db`` matches "query the database").
+An optional embedding function replaces BM25 with cosine similarity.
+
+When a node is trimmed to top-k tools it also gets EXPAND_TOOL, a
+meta-tool the model calls with a free-text need to have more matching
+tools added to the following turns.
+"""
+
+import math
+import re
+from collections import Counter
+from typing import Callable, Iterable
+
+from .llm.llm_model import LLMTool, LLMStructuredSchema
+
+# Embedding hook: batch of texts → one vector per text
+ToolEmbedder = Callable[[list[str]], list[list[float]]]
+
+EXPAND_TOOL_NAME = "kegal_find_tools"
+
+EXPAND_TOOL = LLMTool(
+    name=EXPAND_TOOL_NAME,
+    description=(
+        "Only a subset of the available tools is listed. Call this with a short description "
+        "of the capability you need to make more matching tools available on your next turn."
+    ),
+    parameters={
+        "query": LLMStructuredSchema(
+            type="string", description="What the missing tool should do, in a few words."
+        )
+    },
+    required=["query"],
+)
+
+_BM25_K1 = 1.5
+_BM25_B = 0.75
+_CAMEL = re.compile(r"([a-z0-9])([A-Z])")
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def _tokenize(text: str) -> list[str]:
+    return _TOKEN.findall(_CAMEL.sub(r"\1 \2", text).lower())
+
+
+def _tool_text(tool: LLMTool) -> str:
+    parts = [tool.name, tool.name, tool.description]
+    for name, schema in tool.parameters.items():
+        parts.append(name)
+        parts.append(schema.description or "")
+    return " ".join(parts)
+
+
+def _cosine(a: list[float], b: list[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class ToolRanker:
+    """Scores a fixed tool list against free-text queries. Build once per node, reuse per call."""
+
+    def __init__(self, tools: Iterable[LLMTool], embedder: ToolEmbedder | None = None) -> None:
+        self.tools: tuple[LLMTool, ...] = tuple(tools)
+        self._embedder = embedder
+        texts = [_tool_text(t) for t in self.tools]
+        if embedder is not None:
+            self._vectors = embedder(texts) if texts else []
+            return
+        self._docs = [Counter(_tokenize(text)) for text in texts]
+        self._lengths = [sum(doc.values()) for doc in self._docs]
+        self._avg_len = (sum(self._lengths) / len(self._lengths)) if self._lengths else 0.0
+        df: Counter = Counter()
+        for doc in self._docs:
+            df.update(doc.keys())
+        n = len(self._docs)
+        self._idf = {term: math.log(1 + (n - f + 0.5) / (f + 0.5)) for term, f in df.items()}
+
+    def scores(self, query: str) -> list[float]:
+        """One relevance score per tool, in declaration order."""
+        if self._embedder is not None:
+            if not self.tools:
+                return []
+            query_vec = self._embedder([query])[0]
+            return [_cosine(query_vec, vec) for vec in self._vectors]
+        terms = [t for t in set(_tokenize(query)) if t in self._idf]
+        result: list[float] = []
+        for doc, length in zip(self._docs, self._lengths):
+            score = 0.0
+            for term in terms:
+                tf = doc.get(term, 0)
+                if tf:
+                    norm = _BM25_K1 * (1 - _BM25_B + _BM25_B * length / (self._avg_len or 1))
+                    score += self._idf[term] * tf * (_BM25_K1 + 1) / (tf + norm)
+            result.append(score)
+        return result
+
+    def top_k(self, query: str, k: int, exclude: Iterable[str] = ()) -> list[LLMTool]:
+        """Best k tools for the query, skipping names in exclude.
+
+        Matching tools come first by score; when fewer than k match, the rest
+        is filled in declaration order so the model always sees k tools.
+        """
+        skip = set(exclude)
+        ranked = sorted(
+            ((score, i) for i, score in enumerate(self.scores(query)) if self.tools[i].name not in skip),
+            key=lambda pair: (-pair[0], pair[1]),
+        )
+        return [self.tools[i] for _, i in ranked[:k]]
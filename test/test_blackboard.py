@@ -475,6 +475,16 @@ class TestNewValidations(unittest.TestCase):
         )
         c._validate_indices()  # must not raise
 
+    def test_streamable_http_mcp_without_url_raises(self):
+        """MCP server with transport=streamable_http but no url → error."""
+        c = _bare_validate_compiler(
+            nodes={},
+            graph_mcp_servers=[GraphMcpServer(id="s", transport="streamable_http")],
+        )
+        with self.assertRaises(ValueError) as ctx:
+            c._validate_indices()
+        self.assertIn("'url' is not defined", str(ctx.exception))
+
     def test_multiple_errors_reported_together(self):
         """All validation errors are collected into a single ValueError."""
         node_a = self._node("a", blackboard=NodeBlackboardRef(id="missing_board", read=True))
@@ -70,6 +70,12 @@ def _make_compiler_with_two_cat2_nodes() -> Compiler:
     c._blackboard_write_buffer = None   # new attribute — None outside Cat-2 phase
     c._message_passing_lock = threading.Lock()
     c._outputs_lock = threading.Lock()
+    c._tool_index = {}
+    c.tool_embedder = None
+    c._hedge_pool = None
+    c._event_sink = None
+    c.speculative_guards = False
+    c._served_model = {}
     c.outputs = CompiledOutput()
     c.message_passing = []
     c.mcp_handlers = {}
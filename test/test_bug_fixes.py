@@ -85,6 +85,12 @@ def _bare_compiler(nodes_cfg=None, edges_cfg=None, extra_prompts=0) -> Compiler:
     c._graph_dir = Path.cwd()
     c._message_passing_lock = threading.Lock()
     c._outputs_lock = threading.Lock()
+    c._tool_index = {}
+    c.tool_embedder = None
+    c._hedge_pool = None
+    c._event_sink = None
+    c.speculative_guards = False
+    c._served_model = {}
     c.outputs = CompiledOutput()
     c.message_passing = []
     c.mcp_handlers = {}
@@ -335,6 +341,14 @@ class TestMcpHandlerTimeout(unittest.TestCase):
             return GraphMcpServer(id="s", transport="stdio", command="echo", args=[])
         return GraphMcpServer(id="s", transport="sse", url="http://localhost/sse")
 
+    def _mock_runtime(self):
+        from kegal.mcp_runtime import McpRuntime
+        runtime = MagicMock(spec=McpRuntime)
+        runtime.in_loop.return_value = False
+        # Close the session coroutine instead of scheduling it
+        runtime.submit.side_effect = lambda coro: (coro.close(), MagicMock())[1]
+        return runtime
+
     def test_default_call_timeout_is_set(self):
         """McpHandler must have a non-None call_timeout attribute."""
         from kegal.mcp_handler import _DEFAULT_CALL_TIMEOUT
@@ -346,29 +360,22 @@ class TestMcpHandlerTimeout(unittest.TestCase):
     def test_custom_timeout_stored(self):
         """McpHandler stores a caller-supplied call_timeout."""
         cfg = self._make_server_cfg()
-        # Prevent actual thread/loop startup by patching threading.Thread
-        with patch("kegal.mcp_handler.threading.Thread") as mock_thread, \
-             patch("kegal.mcp_handler.asyncio.new_event_loop") as mock_loop:
-            mock_thread.return_value = MagicMock()
-            mock_loop.return_value = MagicMock()
-            h = McpHandler(cfg, call_timeout=120)
+        # Prevent session startup by handing the handler a mock runtime
+        h = McpHandler(cfg, call_timeout=120, runtime=self._mock_runtime())
         self.assertEqual(h._call_timeout, 120)
 
     def test_run_passes_timeout_to_future_result(self):
         """_run() must call future.result(timeout=self._call_timeout)."""
         cfg = self._make_server_cfg()
-        with patch("kegal.mcp_handler.threading.Thread") as mock_thread, \
-             patch("kegal.mcp_handler.asyncio.new_event_loop") as mock_loop:
-            mock_thread.return_value = MagicMock()
-            mock_loop.return_value = MagicMock()
-            h = McpHandler(cfg, call_timeout=42)
+        runtime = self._mock_runtime()
+        h = McpHandler(cfg, call_timeout=42, runtime=runtime)
 
         mock_future = MagicMock()
         mock_future.result.return_value = "ok"
+        runtime.submit.side_effect = None
+        runtime.submit.return_value = mock_future
 
-        with patch("kegal.mcp_handler.asyncio.run_coroutine_threadsafe",
-                   return_value=mock_future):
-            h._run(MagicMock())  # coro is ignored since we mock run_coroutine_threadsafe
+        h._run(MagicMock())  # coro is ignored since the runtime is mocked
 
         mock_future.result.assert_called_once_with(timeout=42)
 
@@ -29,7 +29,8 @@ def _make_compiler(nodes_cfg: list, edges_cfg: list) -> Compiler:
     return c
 
 
-def _node(nid: str, mp_in: bool = False, mp_out: bool = False, guard: bool = False) -> dict:
+def _node(nid: str, mp_in: bool = False, mp_out: bool = False, guard: bool = False,
+          guard_scope: str | None = None) -> dict:
     n: dict = {
         "id": nid, "model": 0, "temperature": 0.0, "max_tokens": 10,
         "show": False,
@@ -41,6 +42,8 @@ def _node(nid: str, mp_in: bool = False, mp_out: bool = False, guard: bool = Fal
             "type": "object",
             "properties": {"validation": {"type": "boolean"}},
         }
+    if guard_scope is not None:
+        n["guard_scope"] = guard_scope
     return n
 
 
@@ -257,6 +260,74 @@ class TestEdgeSystemMessagePassingPreserved(unittest.TestCase):
         self.assertLess(_level_of(levels, "guard"), _level_of(levels, "worker"))
 
 
+class TestGuardScope(unittest.TestCase):
+    """guard_scope: "dependents" — a guard that gates only the nodes depending on it."""
+
+    def _compiler(self):
+        c = _make_compiler(
+            [_node("gate", guard=True, guard_scope="dependents"), _node("gated"), _node("other")],
+            [{"node": "gate", "children": [{"node": "gated"}]}],
+        )
+        return c
+
+    def test_unrelated_nodes_share_the_first_level(self):
+        c = self._compiler()
+        deps = c._build_dag()
+        levels = c._topological_levels(deps)
+        self.assertEqual(levels[0], ["gate", "other"])
+        self.assertEqual(deps["gated"], {"gate"})
+
+    def test_global_guard_still_gates_scoped_guard(self):
+        c = _make_compiler(
+            [_node("moderation", guard=True), _node("gate", guard=True, guard_scope="dependents"),
+             _node("other")],
+            [],
+        )
+        deps = c._build_dag()
+        self.assertEqual(deps["gate"], {"moderation"})
+        self.assertEqual(deps["other"], {"moderation"})
+
+    def test_failed_scoped_guard_skips_only_its_dependents(self):
+        import threading
+        from unittest.mock import patch
+        from kegal.compiler import CompiledOutput
+
+        c = self._compiler()
+        c._board_entries = {}
+        c._history_auto_paths = {}
+        c._react_controllers = {}
+        c._blackboard_write_buffer = None
+        c._outputs_lock = threading.Lock()
+        c._tool_index = {}
+        c.tool_embedder = None
+        c._hedge_pool = None
+        c._event_sink = None
+        c.speculative_guards = False
+        c._served_model = {}
+        c.outputs = CompiledOutput()
+        ran = []
+
+        def run_node(node):
+            ran.append(node.id)
+            return node.id != "gate"
+
+        with patch.object(c, "_run_node", side_effect=run_node):
+            c.compile()
+        self.assertEqual(sorted(ran), ["gate", "other"])
+        self.assertEqual(c.outputs.skipped_nodes, ["gated"])
+
+    def test_scope_on_non_guard_rejected(self):
+        c = _make_compiler([_node("plain", guard_scope="dependents")], [])
+        c.clients = [object()]
+        c.prompts = [{"system": "", "user": ""}]
+        c.tools = None
+        c.graph_mcp_servers = []
+        c._board_entries = {}
+        with self.assertRaises(ValueError) as ctx:
+            c._validate_indices()
+        self.assertIn("guard_scope", str(ctx.exception))
+
+
 class TestCompilerClose(unittest.TestCase):
     """Compiler.close() lifecycle — no LLM required."""
 
@@ -265,6 +336,7 @@ class TestCompilerClose(unittest.TestCase):
         c = _make_compiler([_node("A")], [])
         c.mcp_handlers = {}
         c.clients = []
+        c._hedge_pool = None
         return c
 
     def test_close_without_mcp_does_not_raise(self):
@@ -321,6 +393,126 @@ class TestCompilerClose(unittest.TestCase):
         c.close()                                # must not raise
 
 
+class TestMcpParallelConnect(unittest.TestCase):
+    """Compiler.__init__ connects all MCP servers concurrently.
+
+    Servers get distinct args so the process-wide MCP registry does not
+    fold them into one shared handler.
+    """
+
+    def _source(self, ids, lazy=()):
+        return {
+            "models": [{"llm": "ollama", "model": "dummy"}],
+            "prompts": [{"template": {"system_template": {}, "prompt_template": {}}}],
+            "mcp_servers": [
+                {"id": sid, "transport": "stdio", "command": "python", "args": [f"{sid}.py"],
+                 "lazy": sid in lazy}
+                for sid in ids
+            ],
+            "nodes": [_node("A")],
+            "edges": [],
+        }
+
+    def _fake_handler_class(self, delay=0.0, failing=()):
+        import threading
+        import time
+        created = []
+
+        class FakeHandler:
+            def __init__(self, server):
+                self.server = server
+                self.lazy = server.lazy
+                self.connected = False
+                self.disconnected = threading.Event()
+                created.append(self)
+
+            def connect(self):
+                time.sleep(delay)
+                if self.server.id in failing:
+                    raise TimeoutError(f"{self.server.id} did not start")
+                self.connected = True
+
+            def is_connected(self):
+                return self.connected
+
+            def disconnect(self):
+                self.disconnected.set()
+
+            def add_tools_changed_listener(self, _fn):
+                pass
+
+            def remove_tools_changed_listener(self, _fn):
+                pass
+
+            def tool_names(self):
+                return frozenset()
+
+        return FakeHandler, created
+
+    def test_servers_connect_concurrently(self):
+        import time
+        from unittest.mock import patch
+        fake_cls, created = self._fake_handler_class(delay=0.3)
+        with patch("kegal.mcp_registry.McpHandler", fake_cls):
+            start = time.time()
+            c = Compiler(source=self._source(["a", "b", "c", "d"]))
+            elapsed = time.time() - start
+        self.assertLess(elapsed, 0.9, "connects must overlap, not add up")
+        self.assertEqual(sorted(c.mcp_handlers), ["a", "b", "c", "d"])
+        c.close()
+
+    def test_single_failure_reraises_original_and_cleans_up(self):
+        from unittest.mock import patch
+        fake_cls, created = self._fake_handler_class(failing={"b"})
+        with patch("kegal.mcp_registry.McpHandler", fake_cls):
+            with self.assertRaises(TimeoutError):
+                Compiler(source=self._source(["a", "b", "c"]))
+        self.assertTrue(all(h.disconnected.is_set() for h in created))
+
+    def test_multiple_failures_aggregated(self):
+        from unittest.mock import patch
+        fake_cls, created = self._fake_handler_class(failing={"a", "c"})
+        with patch("kegal.mcp_registry.McpHandler", fake_cls):
+            with self.assertRaises(RuntimeError) as ctx:
+                Compiler(source=self._source(["a", "b", "c"]))
+        msg = str(ctx.exception)
+        self.assertIn("'a'", msg)
+        self.assertIn("'c'", msg)
+        self.assertNotIn("'b'", msg)
+        self.assertTrue(all(h.disconnected.is_set() for h in created))
+
+    def test_lazy_servers_not_connected_at_init(self):
+        from unittest.mock import patch
+        fake_cls, created = self._fake_handler_class()
+        with patch("kegal.mcp_registry.McpHandler", fake_cls):
+            c = Compiler(source=self._source(["a", "b", "c"], lazy={"b", "c"}))
+        self.assertEqual(sorted(c.mcp_handlers), ["a", "b", "c"])
+        self.assertEqual({h.server.id: h.connected for h in created},
+                         {"a": True, "b": False, "c": False})
+        c.close()
+
+    def test_identical_servers_shared_across_compilers(self):
+        from unittest.mock import patch
+        fake_cls, created = self._fake_handler_class()
+        with patch("kegal.mcp_registry.McpHandler", fake_cls):
+            c1 = Compiler(source=self._source(["a"]))
+            c2 = Compiler(source=self._source(["a"]))
+        self.assertEqual(len(created), 1, "second Compiler must reuse the running server")
+        self.assertIs(c1.mcp_handlers["a"], c2.mcp_handlers["a"])
+        c1.close()
+        self.assertFalse(created[0].disconnected.is_set(), "still held by the second Compiler")
+        c2.close()
+        self.assertTrue(created[0].disconnected.is_set())
+
+    def test_all_lazy_servers_start_nothing(self):
+        from unittest.mock import patch
+        fake_cls, created = self._fake_handler_class()
+        with patch("kegal.mcp_registry.McpHandler", fake_cls):
+            c = Compiler(source=self._source(["a", "b"], lazy={"a", "b"}))
+        self.assertFalse(any(h.connected for h in created))
+        c.close()
+
+
 class TestFanOutGraph(unittest.TestCase):
     graph_path = CURRENT_DIR / "graphs" / "fanout_graph.yml"
 
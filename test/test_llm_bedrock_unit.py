@@ -74,5 +74,27 @@ class TestLlmBedrockUnit(unittest.TestCase):
         self.assertEqual(resp.output_size, 3)
 
 
+    def test_pinned_media_sit_on_history_turn_with_cache_point(self):
+        """media_turn attaches the media to that history turn, followed by a cachePoint block."""
+        from kegal.llm.llm_model import LLmMessage, LLMImageData
+        b = _make_bedrock()
+        b.client.converse.return_value = _fake_converse_response()
+        history = [LLmMessage(role="user", content="describe"), LLmMessage(role="assistant", content="calling")]
+        b.complete(chat_history=history, imgs_b64=[LLMImageData(media_type="image/png", image_b64="aW1n")],
+                   media_turn=0)
+        messages = b.client.converse.call_args.kwargs["messages"]
+        self.assertEqual(len(messages), 2)
+        self.assertEqual([next(iter(block)) for block in messages[0]["content"]], ["text", "image", "cachePoint"])
+
+    def test_cache_reads_counted_in_input_size(self):
+        """inputTokens excludes cache reads/writes; input_size is the whole prompt."""
+        b = _make_bedrock()
+        response = _fake_converse_response()
+        response["usage"].update(cacheReadInputTokens=900, cacheWriteInputTokens=0)
+        b.client.converse.return_value = response
+        resp = b.complete(user_message="hi")
+        self.assertEqual((resp.input_size, resp.cached_input_size), (905, 900))
+
+
 if __name__ == "__main__":
     unittest.main()
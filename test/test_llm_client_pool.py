@@ -0,0 +1,132 @@
+"""Unit tests for the process-wide LLM client pool — no network, SDK clients are mocked."""
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from pydantic import ValidationError
+
+from kegal.graph import GraphModel
+from kegal.llm.llm_client_pool import LlmClientPool, httpx_client_kwargs
+from kegal.llm.llm_handler import LlmHandler
+
+
+class TestLlmClientPool(unittest.TestCase):
+
+    def test_client_built_once_per_key(self):
+        pool = LlmClientPool()
+        factory = MagicMock(side_effect=lambda: object())
+        a = pool.get(("openai", "k1"), factory)
+        b = pool.get(("openai", "k1"), factory)
+        c = pool.get(("openai", "k2"), factory)
+        self.assertIs(a, b)
+        self.assertIsNot(a, c)
+        self.assertEqual(factory.call_count, 2)
+        self.assertEqual(len(pool), 2)
+
+    def test_concurrent_first_use_builds_one_client(self):
+        pool = LlmClientPool()
+        built = []
+
+        def slow_factory():
+            time.sleep(0.05)
+            built.append(object())
+            return built[-1]
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(pool.get(("bedrock", "eu"), slow_factory)))
+            for _ in range(5)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(built), 1)
+        self.assertTrue(all(r is built[0] for r in results))
+
+    def test_clear_closes_clients(self):
+        pool = LlmClientPool()
+        client = MagicMock()
+        pool.get(("k",), lambda: client)
+        pool.clear()
+        client.close.assert_called_once()
+        self.assertEqual(len(pool), 0)
+
+
+class TestPooledAdapters(unittest.TestCase):
+    """LlmHandler adapters share one lazily built SDK client per provider + credentials + endpoint."""
+
+    def setUp(self):
+        self.pool = LlmClientPool()
+        patcher = patch("ollama.Client", side_effect=lambda **kw: MagicMock(host=kw["host"]))
+        self.mock_client_cls = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _handler(self, host="http://localhost:11434", **kw):
+        return LlmHandler(llm="ollama", model="m", host=host, client_pool=self.pool, **kw)
+
+    def test_client_built_lazily_on_first_use(self):
+        h = self._handler()
+        self.mock_client_cls.assert_not_called()
+        self.assertIsNotNone(h.model.client)
+        self.mock_client_cls.assert_called_once()
+
+    def test_same_endpoint_shares_client(self):
+        a, b = self._handler(), self._handler()
+        self.assertIs(a.model.client, b.model.client)
+        self.assertEqual(self.mock_client_cls.call_count, 1)
+
+    def test_different_endpoint_or_http_settings_get_own_client(self):
+        a = self._handler()
+        b = self._handler(host="http://gpu-box:11434")
+        c = self._handler(max_connections=4)
+        self.assertIsNot(a.model.client, b.model.client)
+        self.assertIsNot(a.model.client, c.model.client)
+        self.assertEqual(self.mock_client_cls.call_args.kwargs["limits"].max_connections, 4)
+
+    def test_pooled_adapter_close_leaves_client_open(self):
+        h = self._handler()
+        client = h.model.client
+        h.model.close()
+        client._client.close.assert_not_called()
+
+    def test_client_pool_none_gives_adapter_owned_client(self):
+        h = LlmHandler(llm="ollama", model="m", client_pool=None)
+        self.mock_client_cls.assert_called_once()
+        self.assertFalse(h.model.pooled)
+        h.model.close()
+        h.model.client._client.close.assert_called_once()
+
+    def test_openai_http_settings_passed_to_httpx_client(self):
+        with patch("openai.OpenAI") as mock_openai, patch("openai.DefaultHttpxClient") as mock_http:
+            h = LlmHandler(llm="openai", model="m", api_key="k", max_connections=8,
+                           keepalive_expiry=30, client_pool=self.pool)
+            h.model.client
+        limits = mock_http.call_args.kwargs["limits"]
+        self.assertEqual((limits.max_connections, limits.keepalive_expiry), (8, 30))
+        self.assertIs(mock_openai.call_args.kwargs["http_client"], mock_http.return_value)
+
+
+class TestHttpSettings(unittest.TestCase):
+
+    def test_defaults_add_no_kwargs(self):
+        self.assertEqual(httpx_client_kwargs(), {})
+
+    def test_http2_requires_h2(self):
+        try:
+            import h2  # noqa: F401
+            self.assertTrue(httpx_client_kwargs(http2=True)["http2"])
+        except ImportError:
+            with self.assertRaises(ImportError):
+                httpx_client_kwargs(http2=True)
+
+    def test_graph_model_validates_http_settings(self):
+        with self.assertRaises(ValidationError):
+            GraphModel(llm="openai", model="m", max_connections=0)
+        with self.assertRaises(ValidationError):
+            GraphModel(llm="openai", model="m", keepalive_expiry=-1)
+
+
+if __name__ == "__main__":
+    unittest.main()
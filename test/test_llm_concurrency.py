@@ -0,0 +1,164 @@
+"""Unit tests for the adaptive (AIMD) concurrency limiter — fake providers, no network."""
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from pydantic import ValidationError
+
+from kegal.graph import GraphModel, ModelConcurrency
+from kegal.llm.llm_client_pool import LlmClientPool
+from kegal.llm.llm_concurrency import AimdLimiter, rate_limit_remaining
+from kegal.llm.llm_handler import LlmHandler
+from kegal.llm.llm_model import LLmResponse
+
+
+class _Throttled(Exception):
+    status_code = 429
+
+
+def _saturate(limiter: AimdLimiter, outcome: dict) -> None:
+    """Run limiter.limit concurrent calls that all end with the same outcome."""
+    tickets = [limiter.acquire() for _ in range(limiter.limit)]
+    for ticket in tickets:
+        limiter.release(ticket, **outcome)
+
+
+class TestAimdLimiter(unittest.TestCase):
+
+    def test_successes_grow_limit_additively(self):
+        limiter = AimdLimiter(initial_limit=4, max_limit=10)
+        tickets = [limiter.acquire() for _ in range(4)]
+        # Keep every slot busy: each completion is replaced by a new call
+        for _ in range(5):
+            limiter.release(tickets.pop(0))
+            tickets.append(limiter.acquire())
+        self.assertEqual(limiter.limit, 5)
+
+    def test_growth_capped_at_max_limit(self):
+        limiter = AimdLimiter(initial_limit=2, max_limit=3)
+        for _ in range(20):
+            _saturate(limiter, {})
+        self.assertEqual(limiter.limit, 3)
+
+    def test_idle_successes_do_not_grow_limit(self):
+        limiter = AimdLimiter(initial_limit=8)
+        for _ in range(50):
+            limiter.release(limiter.acquire())
+        self.assertEqual(limiter.limit, 8)
+
+    def test_burst_of_throttles_halves_once(self):
+        limiter = AimdLimiter(initial_limit=8)
+        _saturate(limiter, {"throttled": True})
+        self.assertEqual(limiter.limit, 4)
+        _saturate(limiter, {"throttled": True})
+        self.assertEqual(limiter.limit, 2)
+
+    def test_decrease_floored_at_min_limit(self):
+        limiter = AimdLimiter(initial_limit=4, min_limit=2)
+        for _ in range(5):
+            _saturate(limiter, {"throttled": True})
+        self.assertEqual(limiter.limit, 2)
+
+    def test_low_remaining_quota_counts_as_throttling(self):
+        limiter = AimdLimiter(initial_limit=8, low_remaining=0.1)
+        limiter.release(limiter.acquire(), remaining=0.5)
+        self.assertEqual(limiter.limit, 8)
+        limiter.release(limiter.acquire(), remaining=0.02)
+        self.assertEqual(limiter.limit, 4)
+
+    def test_acquire_blocks_over_limit(self):
+        limiter = AimdLimiter(initial_limit=1)
+        first = limiter.acquire()
+        acquired = threading.Event()
+        t = threading.Thread(target=lambda: (limiter.acquire(), acquired.set()))
+        t.start()
+        self.assertFalse(acquired.wait(0.1))
+        limiter.release(first)
+        self.assertTrue(acquired.wait(1))
+        t.join()
+
+    def test_rate_limit_headers(self):
+        headers = {
+            "x-ratelimit-remaining-requests": "90", "x-ratelimit-limit-requests": "100",
+            "x-ratelimit-remaining-tokens": "1000", "x-ratelimit-limit-tokens": "40000",
+        }
+        self.assertAlmostEqual(rate_limit_remaining(headers), 0.025)
+        self.assertAlmostEqual(rate_limit_remaining({
+            "anthropic-ratelimit-requests-remaining": "5", "anthropic-ratelimit-requests-limit": "50",
+        }), 0.1)
+        self.assertIsNone(rate_limit_remaining({}))
+        self.assertIsNone(rate_limit_remaining({"x-ratelimit-remaining-requests": "n/a",
+                                                "x-ratelimit-limit-requests": "100"}))
+
+
+class TestHandlerConcurrency(unittest.TestCase):
+
+    def _handler(self, **concurrency):
+        cfg = GraphModel(llm="ollama", model="m", concurrency=concurrency, retry={"base_delay": 0})
+        with patch("ollama.Client"):
+            handler = LlmHandler(client_pool=LlmClientPool(), **cfg.model_dump(exclude_none=True))
+        return handler
+
+    def test_unset_means_no_limiter(self):
+        with patch("ollama.Client"):
+            handler = LlmHandler(llm="ollama", model="m", client_pool=LlmClientPool())
+        self.assertEqual(handler.limiters, {})
+
+    def test_throttle_error_shrinks_limit(self):
+        handler = self._handler(initial_limit=8)
+        error = RuntimeError("429")
+        error.__cause__ = _Throttled()
+        handler.model.complete = MagicMock(side_effect=[error, LLmResponse()])
+        handler.complete(user_message="hi")
+        self.assertEqual(handler.limiters[id(handler.model)].limit, 4)
+
+    def test_low_quota_header_shrinks_limit(self):
+        handler = self._handler(initial_limit=8)
+        handler.model.complete = MagicMock(return_value=LLmResponse(rate_limit_remaining=0.01))
+        handler.complete(user_message="hi")
+        self.assertEqual(handler.limiters[id(handler.model)].limit, 4)
+
+    def test_parallel_calls_gated_by_limit(self):
+        handler = self._handler(initial_limit=2, max_limit=2)
+        running, peak = [0], [0]
+        lock = threading.Lock()
+
+        def slow(**kwargs):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.05)
+            with lock:
+                running[0] -= 1
+            return LLmResponse()
+
+        handler.model.complete = slow
+        threads = [threading.Thread(target=handler.complete) for _ in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(peak[0], 2)
+
+    def test_openai_adapter_reports_rate_limit_headers(self):
+        raw = MagicMock(headers={"x-ratelimit-remaining-requests": "1", "x-ratelimit-limit-requests": "10"})
+        raw.parse.return_value = MagicMock(usage=MagicMock(prompt_tokens=3, completion_tokens=2), choices=[])
+        with patch("openai.OpenAI") as mock_openai:
+            mock_openai.return_value.chat.completions.with_raw_response.create.return_value = raw
+            handler = LlmHandler(llm="openai", model="gpt", api_key="k", client_pool=None)
+            response = handler.complete(user_message="hi")
+        self.assertAlmostEqual(response.rate_limit_remaining, 0.1)
+        self.assertNotIn("rate_limit_remaining", response.model_dump())
+
+    def test_policy_validation(self):
+        with self.assertRaises(ValidationError):
+            ModelConcurrency(initial_limit=0)
+        with self.assertRaises(ValidationError):
+            ModelConcurrency(initial_limit=64, max_limit=32)
+        with self.assertRaises(ValidationError):
+            ModelConcurrency(decrease_factor=1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
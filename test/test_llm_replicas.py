@@ -0,0 +1,214 @@
+"""Unit tests for replica pools of one logical model — fake replicas, no network."""
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+from pydantic import ValidationError
+
+from kegal.graph import GraphModel
+from kegal.llm.llm_client_pool import LlmClientPool
+from kegal.llm.llm_handler import LlmHandler
+from kegal.llm.llm_model import LLmResponse, LLmStreamChunk
+from kegal.llm.llm_replicas import ReplicaRouter
+
+
+class _Unavailable(Exception):
+    status_code = 503
+
+
+class _Replica:
+    """Adapter stand-in: complete() returns its name or raises the scripted error."""
+
+    def __init__(self, name, error=None):
+        self.name = name
+        self.error = error
+        self.calls = 0
+
+    def complete(self, **kwargs):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return self.name
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestReplicaRouter(unittest.TestCase):
+
+    def test_round_robin_cycles_replicas(self):
+        replicas = [_Replica("a"), _Replica("b"), _Replica("c")]
+        router = ReplicaRouter(replicas, routing="round_robin")
+        served = [router.call(lambda m: m.complete()) for _ in range(6)]
+        self.assertEqual(served, ["a", "b", "c", "a", "b", "c"])
+
+    def test_least_in_flight_avoids_busy_replica(self):
+        busy, idle = _Replica("busy"), _Replica("idle")
+        router = ReplicaRouter([busy, idle])
+        release = threading.Event()
+        started = threading.Event()
+
+        def slow(model):
+            started.set()
+            release.wait(2)
+            return model.complete()
+
+        # Occupy whichever replica the first call lands on
+        t = threading.Thread(target=router.call, args=(slow,))
+        t.start()
+        started.wait(2)
+        first = next(r for r in router.replicas if r.in_flight == 1)
+        served = {router.call(lambda m: m.complete()) for _ in range(3)}
+        release.set()
+        t.join()
+        self.assertNotIn(first.model.name, served)
+        self.assertEqual(len(served), 1)
+
+    def test_failing_replica_is_ejected_then_readmitted(self):
+        clock = _Clock()
+        bad, good = _Replica("bad", _Unavailable()), _Replica("good")
+        router = ReplicaRouter([bad, good], labels=["bad", "good"], routing="round_robin",
+                               eject_after=2, eject_for=10, clock=clock)
+        for _ in range(4):
+            try:
+                router.call(lambda m: m.complete())
+            except _Unavailable:
+                pass
+        self.assertEqual(bad.calls, 2)
+        self.assertEqual(router.healthy(), ["good"])
+        for _ in range(4):
+            router.call(lambda m: m.complete())
+        self.assertEqual(bad.calls, 2, "an ejected replica gets no traffic")
+
+        clock.now = 11
+        self.assertEqual(router.healthy(), ["bad", "good"])
+        bad.error = None
+        served = [router.call(lambda m: m.complete()) for _ in range(2)]
+        self.assertIn("bad", served)
+
+    def test_readmitted_replica_ejected_again_on_first_failure(self):
+        clock = _Clock()
+        bad = _Replica("bad", _Unavailable())
+        router = ReplicaRouter([bad, _Replica("good")], labels=["bad", "good"], routing="round_robin",
+                               eject_after=3, eject_for=10, clock=clock)
+        for _ in range(6):
+            try:
+                router.call(lambda m: m.complete())
+            except _Unavailable:
+                pass
+        clock.now = 11
+        for _ in range(2):
+            try:
+                router.call(lambda m: m.complete())
+            except _Unavailable:
+                pass
+        self.assertEqual(router.healthy(), ["good"])
+
+    def test_non_retryable_errors_do_not_eject(self):
+        bad = _Replica("bad", ValueError("bad request"))
+        router = ReplicaRouter([bad], eject_after=1)
+        with self.assertRaises(ValueError):
+            router.call(lambda m: m.complete())
+        self.assertEqual(router.healthy(), ["replica 0"])
+
+    def test_all_ejected_still_serves(self):
+        only = _Replica("only", _Unavailable())
+        router = ReplicaRouter([only], eject_after=1)
+        with self.assertRaises(_Unavailable):
+            router.call(lambda m: m.complete())
+        self.assertEqual(router.healthy(), [])
+        only.error = None
+        self.assertEqual(router.call(lambda m: m.complete()), "only")
+
+
+class TestReplicatedHandler(unittest.TestCase):
+
+    def setUp(self):
+        patcher = patch("ollama.Client", side_effect=lambda **kw: MagicMock(host=kw["host"]))
+        self.mock_client_cls = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _handler(self, **overrides):
+        cfg = GraphModel(llm="ollama", model="llama3",
+                         replicas=[{"host": "http://gpu-1:11434"}, {"host": "http://gpu-2:11434"}],
+                         retry={"base_delay": 0}, **overrides)
+        return LlmHandler(client_pool=LlmClientPool(), **cfg.model_dump(exclude_none=True))
+
+    def test_one_adapter_per_replica(self):
+        h = self._handler()
+        hosts = [m.client.host for m in h.router.models]
+        self.assertEqual(hosts, ["http://gpu-1:11434", "http://gpu-2:11434"])
+        self.assertIs(h.model, h.router.models[0])
+
+    def test_retry_moves_to_other_replica(self):
+        h = self._handler(routing="round_robin")
+        down, up = MagicMock(), MagicMock()
+        down.complete.side_effect = RuntimeError("down")
+        down.complete.side_effect.__cause__ = _Unavailable()
+        up.complete.return_value = "answer"
+        h.router.replicas[0].model, h.router.replicas[1].model = down, up
+        self.assertEqual(h.complete(user_message="hi"), "answer")
+        self.assertEqual(down.complete.call_count, 1)
+
+    def test_stream_holds_replica_until_it_ends(self):
+        h = self._handler(eject_after=1)
+        replica = h.router.replicas[0]
+        h.router.replicas[1].ejected_until = float("inf")
+
+        def stream(**kwargs):
+            yield LLmStreamChunk(delta="a")
+            yield LLmStreamChunk(delta="b")
+            yield LLmStreamChunk(response=LLmResponse(messages=["ab"]))
+
+        replica.model.stream = stream
+        chunks = h.stream(user_message="hi")
+        next(chunks)
+        self.assertEqual(replica.in_flight, 1, "the replica is busy until the stream ends")
+        list(chunks)
+        self.assertEqual(replica.in_flight, 0)
+
+    def test_mid_stream_failure_counts_toward_ejection(self):
+        h = self._handler(eject_after=1)
+        replica = h.router.replicas[0]
+        h.router.replicas[1].ejected_until = float("inf")
+
+        def stream(**kwargs):
+            yield LLmStreamChunk(delta="a")
+            raise _Unavailable()
+
+        replica.model.stream = stream
+        with self.assertRaises(_Unavailable):
+            list(h.stream(user_message="hi"))
+        self.assertEqual(replica.in_flight, 0)
+        self.assertIsNotNone(replica.ejected_until)
+
+    def test_replica_fields_override_model_level(self):
+        cfg = GraphModel(llm="openai", model="gpt", api_key="shared",
+                         replicas=[{}, {"api_key": "second"}])
+        with patch("openai.OpenAI") as mock_openai:
+            h = LlmHandler(client_pool=None, **cfg.model_dump(exclude_none=True))
+        keys = [c.kwargs["api_key"] for c in mock_openai.call_args_list]
+        self.assertEqual(keys, ["shared", "second"])
+        self.assertEqual(len(h.router.replicas), 2)
+
+    def test_replica_secrets_masked_in_repr(self):
+        cfg = GraphModel(llm="openai", model="gpt", replicas=[{"api_key": "sk-secret"}])
+        self.assertNotIn("sk-secret", repr(cfg))
+        self.assertEqual(cfg.model_dump()["replicas"][0]["api_key"], "sk-secret")
+
+    def test_validation(self):
+        with self.assertRaises(ValidationError):
+            GraphModel(llm="ollama", model="m", replicas=[])
+        with self.assertRaises(ValidationError):
+            GraphModel(llm="ollama", model="m", routing="random")
+        with self.assertRaises(ValidationError):
+            GraphModel(llm="ollama", model="m", eject_after=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
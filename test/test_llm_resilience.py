@@ -0,0 +1,227 @@
+"""Unit tests for the cross-provider retry / circuit breaker layer — fake provider, no network."""
+import unittest
+from unittest.mock import MagicMock, patch
+
+from pydantic import ValidationError
+
+from kegal.graph import GraphModel, ModelRetryPolicy
+from kegal.llm.llm_handler import LlmHandler
+from kegal.llm.llm_resilience import LlmResilience, LlmCircuitOpenError, classify_error, parse_retry_after
+
+
+class _StatusError(Exception):
+    """Mimics anthropic/openai APIStatusError: status_code + httpx-like response headers."""
+
+    def __init__(self, status_code: int, headers: dict | None = None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = MagicMock(headers=headers or {})
+
+
+def _wrapped(cause: Exception) -> RuntimeError:
+    """Adapters re-raise SDK errors as RuntimeError from the original."""
+    try:
+        raise RuntimeError("Can't invoke 'm' endpoint") from cause
+    except RuntimeError as e:
+        return e
+
+
+class FakeProvider:
+    """complete() replays a script of exceptions / results."""
+
+    def __init__(self, *script):
+        self.script = list(script)
+        self.calls = 0
+
+    def complete(self, **kwargs):
+        self.calls += 1
+        item = self.script.pop(0) if self.script else "ok"
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _resilience(**kw) -> tuple[LlmResilience, list[float], _Clock]:
+    sleeps: list[float] = []
+    clock = _Clock()
+    return LlmResilience(model="m", sleep=sleeps.append, clock=clock, **kw), sleeps, clock
+
+
+class TestClassifyError(unittest.TestCase):
+
+    def test_retryable_statuses_through_runtime_error_wrapper(self):
+        for status in (429, 500, 503, 529):
+            self.assertTrue(classify_error(_wrapped(_StatusError(status)))[0], status)
+
+    def test_client_errors_not_retryable(self):
+        for status in (400, 401, 404):
+            self.assertFalse(classify_error(_wrapped(_StatusError(status)))[0], status)
+
+    def test_botocore_throttling_code(self):
+        err = Exception("throttled")
+        err.response = {
+            "Error": {"Code": "ThrottlingException"},
+            "ResponseMetadata": {"HTTPStatusCode": 400, "HTTPHeaders": {"retry-after": "2"}},
+        }
+        self.assertEqual(classify_error(_wrapped(err)), (True, 2.0))
+
+    def test_transport_errors_by_class_name(self):
+        class APIConnectionError(Exception):
+            pass
+
+        self.assertTrue(classify_error(_wrapped(APIConnectionError()))[0])
+        self.assertTrue(classify_error(TimeoutError())[0])
+        self.assertFalse(classify_error(ValueError("bad schema"))[0])
+
+    def test_retry_after_headers(self):
+        self.assertEqual(parse_retry_after({"retry-after": "3"}), 3.0)
+        self.assertEqual(parse_retry_after({"retry-after-ms": "1500"}), 1.5)
+        self.assertEqual(parse_retry_after({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"}), 0.0)
+        self.assertIsNone(parse_retry_after({"retry-after": "soon"}))
+        self.assertIsNone(parse_retry_after({}))
+
+
+class TestRetry(unittest.TestCase):
+
+    def test_transient_error_retried_then_succeeds(self):
+        r, sleeps, _ = _resilience()
+        provider = FakeProvider(_wrapped(_StatusError(529)), "done")
+        self.assertEqual(r.call(provider.complete), "done")
+        self.assertEqual(provider.calls, 2)
+        self.assertEqual(len(sleeps), 1)
+
+    def test_non_retryable_error_raised_immediately(self):
+        r, sleeps, _ = _resilience()
+        provider = FakeProvider(_wrapped(_StatusError(400)))
+        with self.assertRaises(RuntimeError):
+            r.call(provider.complete)
+        self.assertEqual((provider.calls, sleeps), (1, []))
+
+    def test_gives_up_after_max_attempts(self):
+        r, sleeps, _ = _resilience(max_attempts=3)
+        provider = FakeProvider(*[_wrapped(_StatusError(503)) for _ in range(5)])
+        with self.assertRaises(RuntimeError):
+            r.call(provider.complete)
+        self.assertEqual(provider.calls, 3)
+        self.assertEqual(len(sleeps), 2)
+
+    def test_backoff_is_jittered_exponential_and_capped(self):
+        r, _, _ = _resilience(base_delay=1.0, max_delay=4.0)
+        for attempt, cap in ((1, 1.0), (2, 2.0), (3, 4.0), (6, 4.0)):
+            for _ in range(20):
+                self.assertTrue(0 <= r.backoff(attempt) <= cap)
+
+    def test_retry_after_honoured(self):
+        r, sleeps, _ = _resilience(base_delay=0.01)
+        provider = FakeProvider(_wrapped(_StatusError(429, {"retry-after": "7"})), "done")
+        r.call(provider.complete)
+        self.assertEqual(sleeps, [7.0])
+
+    def test_retry_after_beyond_max_delay_not_retried(self):
+        r, sleeps, _ = _resilience(max_delay=5.0)
+        provider = FakeProvider(_wrapped(_StatusError(429, {"retry-after": "60"})), "done")
+        with self.assertRaises(RuntimeError):
+            r.call(provider.complete)
+        self.assertEqual((provider.calls, sleeps), (1, []))
+
+    def test_retry_budget_limits_retries(self):
+        r, sleeps, _ = _resilience(max_attempts=2, retry_budget=0.0, breaker_threshold=100)
+        failures = 0
+        for _ in range(15):
+            try:
+                r.call(FakeProvider(_wrapped(_StatusError(503)), "ok").complete)
+            except RuntimeError:
+                failures += 1
+        # The bucket starts with 10 tokens and nothing refills it
+        self.assertEqual(len(sleeps), 10)
+        self.assertEqual(failures, 5)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def test_opens_after_threshold_and_fails_fast(self):
+        r, _, _ = _resilience(max_attempts=1, breaker_threshold=3)
+        provider = FakeProvider(*[_wrapped(_StatusError(503)) for _ in range(3)])
+        for _ in range(3):
+            with self.assertRaises(RuntimeError):
+                r.call(provider.complete)
+        self.assertEqual(r.state, "open")
+        with self.assertRaises(LlmCircuitOpenError):
+            r.call(provider.complete)
+        self.assertEqual(provider.calls, 3, "open circuit must not reach the provider")
+
+    def test_opening_mid_call_stops_retries(self):
+        r, sleeps, _ = _resilience(max_attempts=5, breaker_threshold=2)
+        provider = FakeProvider(*[_wrapped(_StatusError(503)) for _ in range(5)])
+        with self.assertRaises(RuntimeError):
+            r.call(provider.complete)
+        self.assertEqual(provider.calls, 2)
+
+    def test_half_open_probe_closes_on_success(self):
+        r, _, clock = _resilience(max_attempts=1, breaker_threshold=1, breaker_cooldown=10)
+        with self.assertRaises(RuntimeError):
+            r.call(FakeProvider(_wrapped(_StatusError(503))).complete)
+        clock.now = 11
+        self.assertEqual(r.state, "half_open")
+        self.assertEqual(r.call(FakeProvider("up").complete), "up")
+        self.assertEqual(r.state, "closed")
+
+    def test_half_open_probe_failure_reopens(self):
+        r, _, clock = _resilience(max_attempts=3, breaker_threshold=1, breaker_cooldown=10)
+        with self.assertRaises(RuntimeError):
+            r.call(FakeProvider(_wrapped(_StatusError(503))).complete)
+        clock.now = 11
+        provider = FakeProvider(_wrapped(_StatusError(503)), "ok")
+        with self.assertRaises(RuntimeError):
+            r.call(provider.complete)
+        self.assertEqual(provider.calls, 1, "a failed probe is not retried")
+        self.assertEqual(r.state, "open")
+
+    def test_non_retryable_errors_do_not_trip(self):
+        r, _, _ = _resilience(max_attempts=1, breaker_threshold=2)
+        for _ in range(5):
+            with self.assertRaises(RuntimeError):
+                r.call(FakeProvider(_wrapped(_StatusError(400))).complete)
+        self.assertEqual(r.state, "closed")
+
+
+class TestHandlerIntegration(unittest.TestCase):
+
+    def test_handler_applies_graph_model_policy(self):
+        cfg = GraphModel(llm="ollama", model="m", retry=ModelRetryPolicy(max_attempts=4, base_delay=0))
+        with patch("ollama.Client"):
+            handler = LlmHandler(**cfg.model_dump(exclude_none=True))
+        self.assertEqual(handler.resilience.max_attempts, 4)
+        handler.model = FakeProvider(*[_wrapped(_StatusError(503)) for _ in range(3)], "answer")
+        self.assertEqual(handler.complete(user_message="hi"), "answer")
+        self.assertEqual(handler.model.calls, 4)
+
+    def test_successful_attempts_feed_latency_tracker(self):
+        with patch("ollama.Client"):
+            handler = LlmHandler(llm="ollama", model="m", retry={"base_delay": 0})
+        handler.model = FakeProvider(_wrapped(_StatusError(503)), "answer")
+        handler.complete(user_message="hi")
+        self.assertEqual(len(handler.latency), 1, "only the successful attempt is a latency sample")
+
+    def test_default_policy_when_unset(self):
+        with patch("ollama.Client"):
+            handler = LlmHandler(llm="ollama", model="m")
+        self.assertEqual(handler.resilience.max_attempts, ModelRetryPolicy().max_attempts)
+
+    def test_policy_validation(self):
+        with self.assertRaises(ValidationError):
+            ModelRetryPolicy(max_attempts=0)
+        with self.assertRaises(ValidationError):
+            ModelRetryPolicy(base_delay=5, max_delay=1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+"""Unit tests for single-flight coalescing of identical in-flight LLM calls — no network."""
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from kegal.graph import GraphModel
+from kegal.llm.llm_client_pool import LlmClientPool
+from kegal.llm.llm_handler import LlmHandler
+from kegal.llm.llm_model import LLmMessage, LLmResponse
+from kegal.llm.llm_singleflight import SingleFlight, request_key
+
+
+def _concurrently(fn, n):
+    """Start n threads running fn at once; return their results (or exceptions)."""
+    barrier = threading.Barrier(n)
+    results = [None] * n
+
+    def run(i):
+        barrier.wait()
+        try:
+            results[i] = fn()
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    def test_identical_calls_share_one_execution(self):
+        flight = SingleFlight()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            time.sleep(0.1)
+            return "answer"
+
+        results = _concurrently(lambda: flight.call("k", slow), 5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual({r[0] for r in results}, {"answer"})
+        self.assertEqual(sum(1 for r in results if r[1]), 1, "exactly one leader")
+        self.assertEqual(flight.in_flight(), 0)
+
+    def test_error_reaches_every_waiter(self):
+        flight = SingleFlight()
+
+        def failing():
+            time.sleep(0.1)
+            raise ValueError("boom")
+
+        results = _concurrently(lambda: flight.call("k", failing), 3)
+        self.assertTrue(all(isinstance(r, ValueError) for r in results))
+
+    def test_completed_call_is_not_cached(self):
+        flight = SingleFlight()
+        fn = MagicMock(return_value="x")
+        flight.call("k", fn)
+        self.assertEqual(flight.call("k", fn), ("x", True))
+        self.assertEqual(fn.call_count, 2)
+
+    def test_request_key(self):
+        history = [LLmMessage(role="user", content="hi")]
+        a = request_key("s", {"user_message": "q", "temperature": 0, "chat_history": history})
+        b = request_key("s", {"chat_history": [LLmMessage(role="user", content="hi")],
+                              "temperature": 0, "user_message": "q"})
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, request_key("other", {"user_message": "q", "temperature": 0,
+                                                     "chat_history": history}))
+        self.assertNotEqual(a, request_key("s", {"user_message": "q", "temperature": 0}))
+
+
+class TestHandlerCoalescing(unittest.TestCase):
+
+    def setUp(self):
+        patcher = patch("ollama.Client")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _handler(self, **overrides):
+        cfg = GraphModel(llm="ollama", model="m", **overrides)
+        return LlmHandler(client_pool=LlmClientPool(), **cfg.model_dump(exclude_none=True))
+
+    @staticmethod
+    def _slow_adapter():
+        def complete(**kwargs):
+            time.sleep(0.1)
+            return LLmResponse(messages=["answer"], input_size=10, output_size=2)
+        return MagicMock(side_effect=complete)
+
+    def test_deterministic_calls_coalesce(self):
+        handler = self._handler()
+        handler.model.complete = self._slow_adapter()
+        results = _concurrently(lambda: handler.complete(user_message="q", temperature=0), 4)
+        self.assertEqual(handler.model.complete.call_count, 1)
+        self.assertEqual([r.coalesced for r in results].count(False), 1)
+        self.assertEqual(len({id(r) for r in results}), 4, "each waiter gets its own copy")
+        self.assertEqual(len(handler.latency), 1)
+
+    def test_sampled_calls_are_not_coalesced(self):
+        handler = self._handler()
+        handler.model.complete = self._slow_adapter()
+        _concurrently(lambda: handler.complete(user_message="q", temperature=0.7), 3)
+        self.assertEqual(handler.model.complete.call_count, 3)
+
+    def test_opt_out(self):
+        handler = self._handler(coalesce=False)
+        handler.model.complete = self._slow_adapter()
+        _concurrently(lambda: handler.complete(user_message="q", temperature=0), 3)
+        self.assertEqual(handler.model.complete.call_count, 3)
+
+    def _alternate(self, first, second):
+        """Run one identical deterministic call on each handler at the same moment."""
+        handlers = iter([first, second])
+        lock = threading.Lock()
+
+        def call():
+            with lock:
+                handler = next(handlers)
+            return handler.complete(user_message="q", temperature=0)
+
+        _concurrently(call, 2)
+
+    def test_handlers_with_same_config_share_calls(self):
+        first, second = self._handler(), self._handler()
+        adapter = self._slow_adapter()
+        first.model.complete = second.model.complete = adapter
+        self._alternate(first, second)
+        self.assertEqual(adapter.call_count, 1)
+
+    def test_different_endpoints_never_share(self):
+        first, second = self._handler(host="http://a:11434"), self._handler(host="http://b:11434")
+        first.model.complete, second.model.complete = self._slow_adapter(), self._slow_adapter()
+        self._alternate(first, second)
+        self.assertEqual((first.model.complete.call_count, second.model.complete.call_count), (1, 1))
+
+if __name__ == "__main__":
+    unittest.main()
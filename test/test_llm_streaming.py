@@ -0,0 +1,248 @@
+"""Unit tests for LlmModel.stream() and LlmHandler.stream() — mocked SDK clients, no network."""
+import json
+import unittest
+from types import SimpleNamespace as NS
+from unittest.mock import MagicMock, patch
+
+from kegal.llm.llm_anthropic import LlmAnthropic
+from kegal.llm.llm_bedrock import LlmBedrock
+from kegal.llm.llm_client_pool import LlmClientPool
+from kegal.llm.llm_gemini import LlmGemini
+from kegal.llm.llm_handler import LlmHandler
+from kegal.llm.llm_model import LlmModel, LLmResponse, LLmStreamChunk
+from kegal.llm.llm_ollama import LlmOllama
+from kegal.llm.llm_openai import LlmOpenai
+
+
+def _collect(chunks):
+    """Split a stream into its text deltas and its final response."""
+    chunks = list(chunks)
+    finals = [c for c in chunks if c.response is not None]
+    assert len(finals) == 1 and chunks[-1].response is not None, "exactly one final chunk, last"
+    return [c.delta for c in chunks if c.delta], chunks[-1].response
+
+
+class _Unavailable(Exception):
+    status_code = 503
+
+
+class TestAdapterStreams(unittest.TestCase):
+
+    def test_openai_text_and_tool_fragments(self):
+        def chunk(content=None, tool_calls=None, usage=None):
+            choices = [] if usage else [NS(delta=NS(content=content, tool_calls=tool_calls))]
+            return NS(choices=choices, usage=usage)
+
+        stream = [
+            chunk("Hel"), chunk("lo"),
+            chunk(tool_calls=[NS(index=0, function=NS(name="lookup", arguments='{"q": '))]),
+            chunk(tool_calls=[NS(index=0, function=NS(name=None, arguments='"x"}'))]),
+            chunk(usage=NS(prompt_tokens=7, completion_tokens=4)),
+        ]
+        raw = MagicMock(headers={})
+        raw.parse.return_value = iter(stream)
+        with patch("openai.OpenAI") as mock_openai:
+            create = mock_openai.return_value.chat.completions.with_raw_response.create
+            create.return_value = raw
+            model = LlmOpenai(model="gpt", api_key="k")
+            deltas, response = _collect(model.stream(user_message="hi"))
+        self.assertTrue(create.call_args.kwargs["stream"])
+        self.assertEqual(deltas, ["Hel", "lo"])
+        self.assertEqual(response.messages, ["Hello"])
+        self.assertEqual((response.tools[0].name, response.tools[0].parameters), ("lookup", {"q": "x"}))
+        self.assertEqual((response.input_size, response.output_size), (7, 4))
+
+    def test_anthropic_native_events(self):
+        events = [
+            {"type": "message_start", "message": {"usage": {"input_tokens": 12, "output_tokens": 1}}},
+            {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}},
+            {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": "Hi "}},
+            {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": "there"}},
+            {"type": "content_block_start", "index": 1,
+             "content_block": {"type": "tool_use", "id": "t1", "name": "search", "input": {}}},
+            {"type": "content_block_delta", "index": 1,
+             "delta": {"type": "input_json_delta", "partial_json": '{"term": "kegal"}'}},
+            {"type": "message_delta", "delta": {}, "usage": {"output_tokens": 9}},
+            {"type": "message_stop"},
+        ]
+        raw = MagicMock(headers={})
+        raw.parse.return_value = [MagicMock(model_dump=MagicMock(return_value=e)) for e in events]
+        with patch("anthropic.Anthropic") as mock_anthropic:
+            mock_anthropic.return_value.messages.with_raw_response.create.return_value = raw
+            model = LlmAnthropic(model="claude", api_key="k")
+            deltas, response = _collect(model.stream(user_message="hi"))
+        self.assertEqual(deltas, ["Hi ", "there"])
+        self.assertEqual(response.messages, ["Hi there"])
+        self.assertEqual(response.tools[0].parameters, {"term": "kegal"})
+        self.assertEqual((response.input_size, response.output_size), (12, 9))
+
+    def test_anthropic_pinned_media_and_cache_usage(self):
+        from kegal.llm.llm_model import LLmMessage, LLMPdfData
+        events = [
+            {"type": "message_start", "message": {"usage": {
+                "input_tokens": 20, "cache_read_input_tokens": 3000, "cache_creation_input_tokens": 0}}},
+            {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}},
+            {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": "ok"}},
+            {"type": "message_delta", "delta": {}, "usage": {"output_tokens": 2}},
+        ]
+        raw = MagicMock(headers={})
+        raw.parse.return_value = [MagicMock(model_dump=MagicMock(return_value=e)) for e in events]
+        history = [LLmMessage(role="user", content="summarize"), LLmMessage(role="assistant", content="[tool_call] x()"),
+                   LLmMessage(role="user", content="[tool_result] x: 1")]
+        with patch("anthropic.Anthropic") as mock_anthropic:
+            create = mock_anthropic.return_value.messages.with_raw_response.create
+            create.return_value = raw
+            model = LlmAnthropic(model="claude", api_key="k")
+            _, response = _collect(model.stream(chat_history=history, pdfs_b64=[LLMPdfData(doc_b64="cGRm")],
+                                                media_turn=0))
+        messages = create.call_args.kwargs["messages"]
+        self.assertEqual(len(messages), 3)
+        pinned = messages[0]["content"]
+        self.assertEqual([block["type"] for block in pinned], ["text", "document"])
+        self.assertEqual(pinned[-1]["cache_control"], {"type": "ephemeral"})
+        self.assertEqual(history[0].content, "summarize")
+        self.assertEqual((response.input_size, response.cached_input_size), (3020, 3000))
+
+    def test_anthropic_bedrock_structured_output(self):
+        events = [
+            {"type": "message_start", "message": {"usage": {"input_tokens": 5}}},
+            {"type": "content_block_start", "index": 0,
+             "content_block": {"type": "tool_use", "name": "json_output_schema", "input": {}}},
+            {"type": "content_block_delta", "index": 0,
+             "delta": {"type": "input_json_delta", "partial_json": '{"answer": 4'}},
+            {"type": "content_block_delta", "index": 0, "delta": {"type": "input_json_delta", "partial_json": "2}"}},
+            {"type": "message_delta", "usage": {"output_tokens": 3}},
+        ]
+        body = [{"chunk": {"bytes": json.dumps(e).encode()}} for e in events]
+        with patch("boto3.client") as mock_boto:
+            mock_boto.return_value.invoke_model_with_response_stream.return_value = {"body": body}
+            model = LlmAnthropic(model="claude", aws_region_name="eu-west-1")
+            deltas, response = _collect(model.stream(user_message="hi"))
+        self.assertEqual(deltas, [])
+        self.assertEqual(response.json_output, {"answer": 42})
+        self.assertEqual((response.input_size, response.output_size), (5, 3))
+
+    def test_bedrock_converse_stream(self):
+        events = [
+            {"messageStart": {"role": "assistant"}},
+            {"contentBlockDelta": {"contentBlockIndex": 0, "delta": {"text": "Bon"}}},
+            {"contentBlockDelta": {"contentBlockIndex": 0, "delta": {"text": "jour"}}},
+            {"contentBlockStart": {"contentBlockIndex": 1, "start": {"toolUse": {"toolUseId": "t", "name": "f"}}}},
+            {"contentBlockDelta": {"contentBlockIndex": 1, "delta": {"toolUse": {"input": '{"a": 1}'}}}},
+            {"messageStop": {"stopReason": "tool_use"}},
+            {"metadata": {"usage": {"inputTokens": 8, "outputTokens": 6}}},
+        ]
+        with patch("boto3.client") as mock_boto:
+            mock_boto.return_value.converse_stream.return_value = {"stream": events}
+            model = LlmBedrock(model="nova", aws_region_name="eu-west-1")
+            deltas, response = _collect(model.stream(user_message="hi"))
+        self.assertEqual(deltas, ["Bon", "jour"])
+        self.assertEqual(response.messages, ["Bonjour"])
+        self.assertEqual((response.tools[0].name, response.tools[0].parameters), ("f", {"a": 1}))
+        self.assertEqual((response.input_size, response.output_size), (8, 6))
+
+    def test_ollama_json_text_becomes_json_output(self):
+        chunks = [
+            {"message": {"content": '{"ok": '}, "done": False},
+            {"message": {"content": "true}"}, "done": False},
+            {"message": {"content": ""}, "done": True, "prompt_eval_count": 4, "eval_count": 2},
+        ]
+        with patch("ollama.Client") as mock_client:
+            mock_client.return_value.chat.return_value = iter(chunks)
+            model = LlmOllama(model="llama3")
+            deltas, response = _collect(model.stream(user_message="hi"))
+        self.assertEqual(deltas, ['{"ok": ', "true}"])
+        self.assertEqual(response.json_output, {"ok": True})
+        self.assertIsNone(response.messages)
+        self.assertEqual((response.input_size, response.output_size), (4, 2))
+
+    def test_gemini_parts(self):
+        def chunk(*parts, usage=None):
+            return NS(candidates=[NS(content=NS(parts=list(parts)))], usage_metadata=usage)
+
+        stream = [
+            chunk(NS(text="Ciao", function_call=None)),
+            chunk(NS(text=None, function_call=NS(name="g", args={"x": 1})),
+                  usage=NS(prompt_token_count=3, candidates_token_count=2)),
+        ]
+        with patch("google.genai.Client") as mock_genai:
+            mock_genai.return_value.models.generate_content_stream.return_value = iter(stream)
+            model = LlmGemini(model="gemini", api_key="k")
+            deltas, response = _collect(model.stream(user_message="hi"))
+        self.assertEqual(deltas, ["Ciao"])
+        self.assertEqual(response.messages, ["Ciao"])
+        self.assertEqual(response.tools[0].parameters, {"x": 1})
+        self.assertEqual((response.input_size, response.output_size), (3, 2))
+
+    def test_stream_errors_are_wrapped(self):
+        with patch("openai.OpenAI") as mock_openai:
+            mock_openai.return_value.chat.completions.with_raw_response.create.side_effect = ValueError("bad")
+            model = LlmOpenai(model="gpt", api_key="k")
+            with self.assertRaises(RuntimeError) as ctx:
+                list(model.stream(user_message="hi"))
+        self.assertIsInstance(ctx.exception.__cause__, ValueError)
+
+
+class TestHandlerStream(unittest.TestCase):
+
+    def _handler(self, **kwargs):
+        with patch("ollama.Client"):
+            return LlmHandler(llm="ollama", model="m", client_pool=LlmClientPool(),
+                              retry={"base_delay": 0}, **kwargs)
+
+    def test_default_stream_falls_back_to_complete(self):
+        handler = self._handler()
+        handler.model.complete = MagicMock(return_value=LLmResponse(messages=["whole"]))
+        # The base-class implementation, as used by adapters without native streaming
+        handler.model.stream = lambda **kwargs: LlmModel.stream(handler.model, **kwargs)
+        deltas, response = _collect(handler.stream(user_message="hi"))
+        self.assertEqual((deltas, response.messages), (["whole"], ["whole"]))
+
+    def test_failure_before_first_chunk_is_retried(self):
+        handler = self._handler()
+        attempts = []
+
+        def stream(**kwargs):
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise RuntimeError("down") from _Unavailable()
+            yield LLmStreamChunk(delta="ok")
+            yield LLmStreamChunk(response=LLmResponse(messages=["ok"]))
+
+        handler.model.stream = stream
+        deltas, _ = _collect(handler.stream(user_message="hi"))
+        self.assertEqual((len(attempts), deltas), (2, ["ok"]))
+        self.assertEqual(len(handler.latency), 1)
+
+    def test_concurrency_slot_held_until_stream_ends(self):
+        handler = self._handler(concurrency={"initial_limit": 1})
+        limiter = handler.limiters[id(handler.model)]
+
+        def stream(**kwargs):
+            yield LLmStreamChunk(delta="a")
+            yield LLmStreamChunk(response=LLmResponse(messages=["a"]))
+
+        handler.model.stream = stream
+        chunks = handler.stream(user_message="hi")
+        next(chunks)
+        self.assertEqual(limiter.in_flight, 1)
+        list(chunks)
+        self.assertEqual(limiter.in_flight, 0)
+
+    def test_abandoned_stream_releases_slot(self):
+        handler = self._handler(concurrency={"initial_limit": 1})
+        limiter = handler.limiters[id(handler.model)]
+
+        def stream(**kwargs):
+            yield LLmStreamChunk(delta="a")
+            yield LLmStreamChunk(response=LLmResponse(messages=["a"]))
+
+        handler.model.stream = stream
+        chunks = handler.stream(user_message="hi")
+        next(chunks)
+        chunks.close()
+        self.assertEqual(limiter.in_flight, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
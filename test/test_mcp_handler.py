@@ -0,0 +1,526 @@
+"""Unit tests for McpHandler internals: session pool dispatch, health checks,
+reconnect and retry, the shared McpRuntime loop and the McpRegistry of
+shared handlers.
+
+All tests are self-contained — no MCP server subprocess, no network.
+"""
+
+import asyncio
+import contextlib
+import threading
+import time
+import unittest
+from concurrent.futures import Future
+from unittest.mock import MagicMock, patch
+
+import anyio
+from mcp import types as mcp_types
+from mcp.shared.exceptions import McpError
+from pydantic import ValidationError
+
+from kegal.graph import GraphMcpServer
+from kegal.mcp_handler import McpHandler, _PoolSlot, _connection_lost
+from kegal.mcp_registry import McpRegistry
+from kegal.mcp_runtime import McpRuntime
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+class _FakeSession:
+    """Async stand-in for mcp.ClientSession recording the calls it serves."""
+
+    def __init__(self, delay: float = 0.0, ping_ok: bool = True) -> None:
+        self.delay = delay
+        self.ping_ok = ping_ok
+        self.calls: list[str] = []
+
+    async def call_tool(self, name, arguments):
+        self.calls.append(name)
+        await asyncio.sleep(self.delay)
+        block = MagicMock(spec=["text"])
+        block.text = f"{name}:{arguments}"
+        result = MagicMock()
+        result.content = [block]
+        return result
+
+    async def send_ping(self):
+        if not self.ping_ok:
+            raise ConnectionError("pipe closed")
+
+
+class _DroppingSession(_FakeSession):
+    """Session whose transport is gone: every call fails with the given error."""
+
+    def __init__(self, error: Exception) -> None:
+        super().__init__()
+        self.error = error
+
+    async def call_tool(self, name, arguments):
+        self.calls.append(name)
+        raise self.error
+
+
+def _connection_closed() -> McpError:
+    return McpError(mcp_types.ErrorData(code=mcp_types.CONNECTION_CLOSED, message="Connection closed"))
+
+
+def _bare_handler(sessions: list, pool_size: int | None = None, **server_kw) -> McpHandler:
+    """Build an McpHandler via object.__new__ with pre-populated pool slots."""
+    h = object.__new__(McpHandler)
+    h._server = GraphMcpServer(
+        id="srv", transport="stdio", command="python",
+        pool_size=pool_size or max(len(sessions), 1), **server_kw,
+    )
+    h._call_timeout = 5
+    h._tools = {}
+    h._tool_list = ()
+    h._tool_names = frozenset()
+    h._tools_changed_listeners = []
+    h._listeners_lock = threading.Lock()
+    h._slots = []
+    for i, session in enumerate(sessions):
+        slot = _PoolSlot(i)
+        slot.session = session
+        slot.healthy = True
+        h._slots.append(slot)
+    return h
+
+
+def _patch_session_lifetime(test: unittest.TestCase) -> list[str]:
+    """Replace the MCP session task with one serving a _FakeSession; return the
+    names of the threads each started lifetime ran on."""
+    threads: list[str] = []
+
+    async def fake_lifetime(handler):
+        threads.append(threading.current_thread().name)
+        slot = _PoolSlot(0)
+        slot.session = _FakeSession()
+        slot.healthy = True
+        handler._slots = [slot]
+        handler._set_ready()
+        watch = None
+        if handler._server.idle_timeout is not None:
+            watch = asyncio.ensure_future(handler._idle_watch())
+        await handler._stop_event.wait()
+        if watch is not None:
+            await watch
+
+    patcher = patch.object(McpHandler, "_session_lifetime", fake_lifetime)
+    patcher.start()
+    test.addCleanup(patcher.stop)
+    return threads
+
+
+# ===========================================================================
+# GraphMcpServer pool config
+# ===========================================================================
+
+class TestPoolConfig(unittest.TestCase):
+
+    def test_pool_size_defaults_to_one(self):
+        cfg = GraphMcpServer(id="s", transport="stdio", command="python")
+        self.assertEqual(cfg.pool_size, 1)
+        self.assertIsNone(cfg.health_check_interval)
+
+    def test_pool_size_zero_raises(self):
+        with self.assertRaises(ValidationError):
+            GraphMcpServer(id="s", transport="stdio", command="python", pool_size=0)
+
+    def test_non_positive_health_check_interval_raises(self):
+        with self.assertRaises(ValidationError):
+            GraphMcpServer(id="s", transport="stdio", command="python", health_check_interval=0)
+
+    def test_streamable_http_transport_accepted(self):
+        cfg = GraphMcpServer(id="s", transport="streamable_http", url="http://localhost:8000/mcp")
+        self.assertEqual(cfg.transport, "streamable_http")
+        self.assertEqual(cfg.max_reconnect_attempts, 5)
+
+    def test_negative_reconnect_attempts_raises(self):
+        with self.assertRaises(ValidationError):
+            GraphMcpServer(id="s", transport="stdio", command="python", max_reconnect_attempts=-1)
+
+    def test_idle_timeout_requires_lazy(self):
+        with self.assertRaises(ValidationError):
+            GraphMcpServer(id="s", transport="stdio", command="python", idle_timeout=5)
+        cfg = GraphMcpServer(id="s", transport="stdio", command="python", lazy=True, idle_timeout=5)
+        self.assertEqual(cfg.idle_timeout, 5)
+
+
+# ===========================================================================
+# Least-busy dispatch
+# ===========================================================================
+
+class TestPoolDispatch(unittest.TestCase):
+
+    def test_pick_slot_prefers_least_busy(self):
+        h = _bare_handler([_FakeSession(), _FakeSession(), _FakeSession()])
+        h._slots[0].in_flight = 2
+        h._slots[1].in_flight = 0
+        h._slots[2].in_flight = 1
+        self.assertIs(h._pick_slot(), h._slots[1])
+
+    def test_pick_slot_skips_unhealthy_and_closed(self):
+        h = _bare_handler([_FakeSession(), _FakeSession(), _FakeSession()])
+        h._slots[0].healthy = False
+        h._slots[1].session = None
+        h._slots[2].in_flight = 5
+        self.assertIs(h._pick_slot(), h._slots[2])
+
+    def test_no_usable_slot_raises_not_connected(self):
+        h = _bare_handler([_FakeSession()])
+        h._slots[0].healthy = False
+        with self.assertRaises(RuntimeError) as ctx:
+            asyncio.run(h._acall_tool("query", {}))
+        self.assertIn("not connected", str(ctx.exception))
+
+    def test_concurrent_calls_spread_across_sessions(self):
+        sessions = [_FakeSession(delay=0.05), _FakeSession(delay=0.05)]
+        h = _bare_handler(sessions)
+
+        async def run():
+            return await asyncio.gather(*(h._acall_tool("query", {"i": i}) for i in range(4)))
+
+        results = asyncio.run(run())
+        self.assertEqual(len(results), 4)
+        self.assertEqual([len(s.calls) for s in sessions], [2, 2])
+        self.assertTrue(all(slot.in_flight == 0 for slot in h._slots))
+
+    def test_in_flight_released_on_error(self):
+        session = _FakeSession()
+
+        async def boom(name, arguments):
+            raise ValueError("tool failed")
+
+        session.call_tool = boom
+        h = _bare_handler([session])
+        with self.assertRaises(ValueError):
+            asyncio.run(h._acall_tool("query", {}))
+        self.assertEqual(h._slots[0].in_flight, 0)
+
+
+# ===========================================================================
+# Health checks
+# ===========================================================================
+
+class TestPoolHealthCheck(unittest.TestCase):
+
+    def _run_hold(self, h: McpHandler, slot: _PoolSlot, duration: float) -> None:
+        async def run():
+            h._stop_event = asyncio.Event()
+            task = asyncio.ensure_future(h._hold_slot(slot))
+            await asyncio.sleep(duration)
+            h._stop_event.set()
+            await task
+
+        asyncio.run(run())
+
+    def test_failed_ping_marks_slot_unhealthy(self):
+        h = _bare_handler([_FakeSession(ping_ok=False)], health_check_interval=0.01)
+        self._run_hold(h, h._slots[0], 0.1)
+        self.assertFalse(h._slots[0].healthy)
+
+    def test_successful_ping_restores_health(self):
+        session = _FakeSession(ping_ok=True)
+        h = _bare_handler([session], health_check_interval=0.01)
+        h._slots[0].healthy = False
+        self._run_hold(h, h._slots[0], 0.1)
+        self.assertTrue(h._slots[0].healthy)
+
+
+# ===========================================================================
+# Reconnect and retry
+# ===========================================================================
+
+class TestReconnect(unittest.TestCase):
+
+    def test_connection_lost_classification(self):
+        self.assertTrue(_connection_lost(anyio.ClosedResourceError()))
+        self.assertTrue(_connection_lost(ConnectionResetError()))
+        self.assertTrue(_connection_lost(_connection_closed()))
+        self.assertFalse(_connection_lost(ValueError("bad arguments")))
+        self.assertFalse(_connection_lost(
+            McpError(mcp_types.ErrorData(code=mcp_types.INVALID_PARAMS, message="bad"))
+        ))
+
+    def test_non_idempotent_tool_not_retried_after_mid_call_drop(self):
+        dropping, healthy = _DroppingSession(_connection_closed()), _FakeSession()
+        h = _bare_handler([dropping, healthy])
+        with self.assertRaises(RuntimeError) as ctx:
+            asyncio.run(h._acall_tool("insert_row", {}))
+        self.assertIn("idempotent_tools", str(ctx.exception))
+        self.assertEqual(healthy.calls, [])
+        self.assertTrue(h._slots[0].broken.is_set())
+        self.assertFalse(h._slots[0].healthy)
+
+    def test_idempotent_tool_retried_on_another_session(self):
+        dropping, healthy = _DroppingSession(_connection_closed()), _FakeSession()
+        h = _bare_handler([dropping, healthy], idempotent_tools=["query"])
+        self.assertEqual(asyncio.run(h._acall_tool("query", {})), "query:{}")
+        self.assertEqual((dropping.calls, healthy.calls), (["query"], ["query"]))
+
+    def test_unsent_call_retried_for_any_tool(self):
+        dropping, healthy = _DroppingSession(anyio.ClosedResourceError()), _FakeSession()
+        h = _bare_handler([dropping, healthy])
+        self.assertEqual(asyncio.run(h._acall_tool("insert_row", {})), "insert_row:{}")
+
+    def _run_lifetime(self, h: McpHandler, open_results: list,
+                      catalogs: list | None = None) -> tuple[_PoolSlot, int]:
+        """Run _slot_lifetime with a fake transport; each open pops a result
+        (an exception to raise, or None to open a fresh _FakeSession).  Each
+        session lists the next tool names in catalogs, when given."""
+        opens = []
+
+        @contextlib.asynccontextmanager
+        async def fake_transport():
+            opens.append(True)
+            result = open_results.pop(0) if open_results else None
+            if result is not None:
+                raise result
+            yield None, None
+
+        class FakeClientSession(_FakeSession):
+            def __init__(self, read, write, message_handler=None):
+                super().__init__()
+
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+            async def initialize(self):
+                self.tool_names = catalogs.pop(0) if catalogs else []
+
+            async def list_tools(self):
+                return MagicMock(tools=[
+                    mcp_types.Tool(name=name, inputSchema={"type": "object"}) for name in self.tool_names
+                ])
+
+        async def run():
+            h._stop_event = asyncio.Event()
+            h._slot_up = asyncio.Event()
+            slot = _PoolSlot(0)
+            task = asyncio.ensure_future(h._slot_lifetime(slot))
+            await slot.ready.wait()
+            first = slot.session
+            h._break_slot(slot)
+            for _ in range(200):
+                if task.done() or (slot.session is not None and slot.session is not first):
+                    break
+                await asyncio.sleep(0.01)
+            await asyncio.sleep(0.05)       # let a post-reconnect tool refresh run
+            h._stop_event.set()
+            await task
+            return slot
+
+        h._open_transport = fake_transport
+        with patch("kegal.mcp_handler.ClientSession", FakeClientSession):
+            slot = asyncio.run(run())
+        return slot, len(opens)
+
+    def test_broken_session_reconnects_with_backoff(self):
+        h = _bare_handler([], pool_size=1, reconnect_backoff=0.01)
+        slot, opens = self._run_lifetime(h, [None, OSError("server restarting")])
+        self.assertEqual(opens, 3, "initial open, one failed retry, one successful retry")
+        self.assertIsNone(slot.error)
+
+    def test_reconnect_refreshes_tool_list(self):
+        h = _bare_handler([], pool_size=1, reconnect_backoff=0.01)
+        h._tools = {"old_tool": MagicMock()}
+        changed = []
+        h.add_tools_changed_listener(lambda: changed.append(True))
+        self._run_lifetime(h, [None], catalogs=[["old_tool"], ["new_tool"]])
+        self.assertEqual(h._tool_names, frozenset({"new_tool"}))
+        self.assertEqual(changed, [True])
+
+    def test_call_timeout_covers_slot_wait_and_call(self):
+        h = _bare_handler([_FakeSession(delay=5)])
+        h._call_timeout = 0.1
+        h._stop_event = asyncio.Event()
+        h._slot_up = asyncio.Event()
+        start = time.monotonic()
+        with self.assertRaises(TimeoutError):
+            asyncio.run(h._acall_tool("slow", {}))
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(h._slots[0].in_flight, 0)
+
+    def test_blocking_call_cancelled_on_timeout(self):
+        h = _bare_handler([])
+        h._call_timeout = 0.05
+        pending = Future()
+        h._runtime = MagicMock(in_loop=MagicMock(return_value=False), submit=MagicMock(return_value=pending))
+
+        async def never():
+            pass
+
+        coro = never()
+        with self.assertRaises(TimeoutError):
+            h._run(coro)
+        coro.close()
+        self.assertTrue(pending.cancelled())
+
+    def test_reconnect_disabled_leaves_slot_closed(self):
+        h = _bare_handler([], pool_size=1, max_reconnect_attempts=0)
+        slot, opens = self._run_lifetime(h, [])
+        self.assertEqual(opens, 1)
+        self.assertIsNone(slot.session)
+        self.assertFalse(slot.reconnecting)
+
+
+# ===========================================================================
+# Shared runtime loop
+# ===========================================================================
+
+class TestMcpRuntime(unittest.TestCase):
+    """Handlers run their sessions as tasks on one runtime loop instead of a thread each."""
+
+    def setUp(self):
+        self.lifetime_threads = _patch_session_lifetime(self)
+
+    def _cfg(self, server_id: str, **kw) -> GraphMcpServer:
+        return GraphMcpServer(id=server_id, transport="stdio", command="python", **kw)
+
+    def test_shared_runtime_is_a_singleton(self):
+        self.assertIs(McpRuntime.shared(), McpRuntime.shared())
+
+    def test_handlers_share_one_loop_thread(self):
+        runtime = McpRuntime()
+        self.addCleanup(runtime.close)
+        handlers = [McpHandler(self._cfg(f"s{i}"), runtime=runtime) for i in range(3)]
+        for h in handlers:
+            h.connect()
+        self.assertEqual(handlers[1].call_tool("query", {}), "query:{}")
+        for h in handlers:
+            h.disconnect()
+        self.assertEqual(self.lifetime_threads, ["kegal-mcp-runtime"] * 3)
+
+    def test_blocking_call_from_runtime_loop_raises(self):
+        runtime = McpRuntime()
+        self.addCleanup(runtime.close)
+        h = McpHandler(self._cfg("s"), runtime=runtime)
+        h.connect()
+
+        async def blocking_then_async():
+            with self.assertRaises(RuntimeError):
+                h.call_tool("query", {})
+            return await h.acall_tool("query", {})
+
+        self.assertEqual(runtime.submit(blocking_then_async()).result(timeout=5), "query:{}")
+        h.disconnect()
+
+    def test_caller_managed_loop_starts_no_thread(self):
+        async def run():
+            runtime = McpRuntime(loop=asyncio.get_running_loop())
+            self.assertFalse(runtime.owns_thread)
+            h = McpHandler(self._cfg("s"), runtime=runtime)
+            await h.aconnect()
+            result = await h.acall_tool("query", {})
+            await h.adisconnect()
+            return result
+
+        self.assertEqual(asyncio.run(run()), "query:{}")
+        self.assertEqual(self.lifetime_threads, [threading.main_thread().name])
+
+
+# ===========================================================================
+# Lazy start and idle shutdown
+# ===========================================================================
+
+class TestLazyStart(unittest.TestCase):
+    """Lazy handlers open their sessions on first use and close them when idle."""
+
+    def setUp(self):
+        self.lifetime_threads = _patch_session_lifetime(self)
+        self.runtime = McpRuntime()
+        self.addCleanup(self.runtime.close)
+
+    def _cfg(self, server_id: str, **kw) -> GraphMcpServer:
+        return GraphMcpServer(id=server_id, transport="stdio", command="python", **kw)
+
+    def test_lazy_handler_does_not_start_on_construction(self):
+        h = McpHandler(self._cfg("s", lazy=True), runtime=self.runtime)
+        self.assertFalse(h.is_connected())
+        self.assertEqual(self.lifetime_threads, [])
+        h.disconnect()  # no-op: never started
+
+    def test_first_call_starts_lazy_handler(self):
+        h = McpHandler(self._cfg("s", lazy=True), runtime=self.runtime)
+        self.assertEqual(h.call_tool("query", {}), "query:{}")
+        self.assertTrue(h.is_connected())
+        h.call_tool("query", {})
+        self.assertEqual(len(self.lifetime_threads), 1, "second call must reuse the session")
+        h.disconnect()
+
+    def test_idle_timeout_shuts_down_and_next_call_reconnects(self):
+        h = McpHandler(self._cfg("s", lazy=True, idle_timeout=0.05), runtime=self.runtime)
+        h.call_tool("query", {})
+        h._lifetime.result(timeout=2)
+        self.assertFalse(h.is_connected())
+        self.assertEqual(h.call_tool("query", {}), "query:{}")
+        self.assertEqual(len(self.lifetime_threads), 2)
+        h.disconnect()
+
+    def test_async_call_starts_lazy_handler(self):
+        async def run():
+            runtime = McpRuntime(loop=asyncio.get_running_loop())
+            h = McpHandler(self._cfg("s", lazy=True), runtime=runtime)
+            result = await h.acall_tool("query", {})
+            await h.adisconnect()
+            return result
+
+        self.assertEqual(asyncio.run(run()), "query:{}")
+
+
+# ===========================================================================
+# Process-wide handler registry
+# ===========================================================================
+
+class TestMcpRegistry(unittest.TestCase):
+    """Identical server configs share one reference-counted handler."""
+
+    def setUp(self):
+        _patch_session_lifetime(self)
+        self.registry = McpRegistry()
+
+    def _cfg(self, server_id: str, **kw) -> GraphMcpServer:
+        return GraphMcpServer(id=server_id, transport="stdio", command="python", **kw)
+
+    def test_identical_config_shares_handler_regardless_of_id(self):
+        h1 = self.registry.acquire(self._cfg("db", args=["srv.py"]))
+        h2 = self.registry.acquire(self._cfg("sqlite", args=["srv.py"]))
+        self.assertIs(h1, h2)
+        self.assertEqual(self.registry.refcount(self._cfg("any", args=["srv.py"])), 2)
+        self.registry.release(h1)
+        self.registry.release(h2)
+
+    def test_different_config_gets_own_handler(self):
+        h1 = self.registry.acquire(self._cfg("a", args=["a.py"]))
+        h2 = self.registry.acquire(self._cfg("a", args=["a.py"], env={"DB": "x"}))
+        self.assertIsNot(h1, h2)
+        self.registry.release(h1)
+        self.registry.release(h2)
+
+    def test_last_release_disconnects(self):
+        cfg = self._cfg("a")
+        h = self.registry.acquire(cfg)
+        self.registry.acquire(cfg)
+        h.connect()
+        self.registry.release(h)
+        self.assertTrue(h.is_connected())
+        self.registry.release(h)
+        self.assertFalse(h.is_connected())
+        self.assertEqual(self.registry.refcount(cfg), 0)
+        fresh = self.registry.acquire(cfg)
+        self.assertIsNot(fresh, h, "a released config starts afresh")
+        self.registry.release(fresh)
+
+    def test_release_of_unregistered_handler_disconnects_it(self):
+        h = MagicMock()
+        self.registry.release(h)
+        h.disconnect.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
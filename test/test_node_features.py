@@ -3,21 +3,39 @@ Unit tests for three features that lacked coverage:
   - GraphNode.max_tool_calls      (TestMaxToolCalls)
   - Graph.verbose logging setup   (TestVerboseFlag)
   - NodeMcpServerRef tool filter  (TestNodeMcpServerRefTools)
+  - Per-node tool routing index   (TestNodeToolIndex)
+  - Top-k tool retrieval          (TestToolSelection)
+  - Model fallback chains         (TestModelFallback)
+  - Hedged requests               (TestHedging)
+  - Compile event stream          (TestCompileIter)
+  - Observation size policies     (TestObservationPolicy)
+  - Media attachment policy       (TestMediaPolicy)
+  - Speculative guard execution   (TestSpeculativeGuards)
 
 All tests are self-contained — no real LLM, no network, no Ollama.
 """
 
+import asyncio
+import json
 import logging
 import threading
+import time
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import MagicMock, patch
 
 from pydantic import ValidationError
 
-from kegal.compiler import Compiler, CompiledOutput
+from kegal.compiler import (Compiler, CompiledOutput, CompileFinishedEvent, NodeFinishedEvent,
+                            NodeStartedEvent, TokenDeltaEvent, ToolCallEvent)
 from kegal.graph import Graph
-from kegal.graph_node import NodeMcpServerRef
-from kegal.llm.llm_model import LLmResponse, LLMFunctionCall, LLMTool
+from kegal.graph_blackboard import NodeBlackboardRef
+from kegal.graph_node import NodeMcpServerRef, NodeObservation
+from kegal.llm.llm_model import (LLMImageData, LLmResponse, LLmStreamChunk, LLMFunctionCall, LLMTool,
+                                 LLMStructuredSchema)
+from kegal.llm.llm_latency import LatencyTracker
+from kegal.observation import extract_observation, truncate_observation
+from kegal.tool_selection import EXPAND_TOOL_NAME, ToolRanker
 
 
 # ---------------------------------------------------------------------------
@@ -68,8 +86,15 @@ def _bare_compiler(nodes_cfg=None, edges_cfg=None) -> tuple[Compiler, MagicMock]
     c._boards = {}
     c._board_paths = {}
     c._blackboard_lock = threading.Lock()
+    c._blackboard_write_buffer = None
     c._message_passing_lock = threading.Lock()
     c._outputs_lock = threading.Lock()
+    c._tool_index = {}
+    c.tool_embedder = None
+    c._hedge_pool = None
+    c._event_sink = None
+    c.speculative_guards = False
+    c._served_model = {}
     c.outputs = CompiledOutput()
     c.message_passing = []
     c.mcp_handlers = {}
@@ -321,6 +346,779 @@ class TestNodeMcpServerRefTools(unittest.TestCase):
         self.assertIsNotNone(c._mcp_server_for_tool("delete", c.nodes["n"]))
 
 
+# ===========================================================================
+# TestNodeToolIndex
+# ===========================================================================
+
+class TestNodeToolIndex(unittest.TestCase):
+    """The per-node routing table is built once and rebuilt only on invalidation."""
+
+    def _compiler(self):
+        c, _ = _bare_compiler(nodes_cfg=[{
+            "id": "n", "model": 0, "temperature": 0.0, "max_tokens": 100,
+            "show": False, "prompt": {"template": 0},
+            "mcp_servers": [{"id": "srv", "tools": ["read", "write"]}],
+        }])
+        fake_tools = [
+            LLMTool(name="read",   description="read a file",   parameters={}, required=[]),
+            LLMTool(name="write",  description="write a file",  parameters={}, required=[]),
+            LLMTool(name="delete", description="delete a file", parameters={}, required=[]),
+        ]
+        handler = MagicMock()
+        handler.list_tools.return_value = fake_tools
+        handler.tool_names.return_value = frozenset(t.name for t in fake_tools)
+        c.mcp_handlers = {"srv": handler}
+        return c, handler
+
+    def test_index_built_once_across_calls(self):
+        c, handler = self._compiler()
+        node = c.nodes["n"]
+        for _ in range(5):
+            c._build_model_body(node)
+            c._mcp_server_for_tool("read", node)
+        self.assertEqual(handler.list_tools.call_count, 1)
+        self.assertEqual(handler.tool_names.call_count, 1)
+
+    def test_model_body_uses_filtered_tools(self):
+        c, _ = self._compiler()
+        body = c._build_model_body(c.nodes["n"])
+        self.assertEqual([t.name for t in body["tools_data"]], ["read", "write"])
+
+    def test_routes_respect_whitelist(self):
+        c, handler = self._compiler()
+        self.assertIs(c._mcp_server_for_tool("write", c.nodes["n"]), handler)
+        self.assertIsNone(c._mcp_server_for_tool("delete", c.nodes["n"]))
+
+    def test_invalidation_rebuilds_index(self):
+        c, handler = self._compiler()
+        node = c.nodes["n"]
+        c._mcp_tools_for_node(node)
+        handler.list_tools.return_value = [
+            LLMTool(name="read", description="read v2", parameters={}, required=[]),
+        ]
+        handler.tool_names.return_value = frozenset({"read"})
+        c._invalidate_tool_index()
+        tools = c._mcp_tools_for_node(node)
+        self.assertEqual([t.description for t in tools], ["read v2"])
+        self.assertIsNone(c._mcp_server_for_tool("write", node))
+
+    def test_tool_list_changed_notification_notifies_listeners(self):
+        import asyncio
+        from mcp import types as mcp_types
+        from kegal.mcp_handler import McpHandler
+
+        h = object.__new__(McpHandler)
+        h._server = MagicMock(id="srv", lazy=False)
+        h._tools_changed_listeners = []
+        h._listeners_lock = threading.Lock()
+        fired = []
+        h.add_tools_changed_listener(lambda: fired.append(True))
+
+        async def fake_refresh(slot=None):
+            h._tools = {}
+            h._tool_names = frozenset({"new_tool"})
+            return True
+
+        h._refresh_tools = fake_refresh
+        notification = mcp_types.ServerNotification(
+            mcp_types.ToolListChangedNotification(method="notifications/tools/list_changed")
+        )
+
+        async def run():
+            await h._on_message(notification)
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+
+        asyncio.run(run())
+        self.assertEqual(fired, [True])
+        self.assertEqual(h.tool_names(), frozenset({"new_tool"}))
+
+
+# ===========================================================================
+# TestToolSelection
+# ===========================================================================
+
+def _catalog() -> list[LLMTool]:
+    def tool(name, description, **params):
+        return LLMTool(
+            name=name, description=description, required=list(params),
+            parameters={k: LLMStructuredSchema(type="string", description=v) for k, v in params.items()},
+        )
+    return [
+        tool("send_email", "Send an email message to a recipient", to="recipient address"),
+        tool("query_db", "Run a read-only SQL query against the sales database", sql="SELECT statement"),
+        tool("get_weather", "Current weather forecast for a city", city="city name"),
+        tool("createCalendarEvent", "Add an event to the calendar", title="event title"),
+        tool("read_file", "Read a text file from disk", path="file path"),
+        tool("convert_currency", "Convert an amount between currencies", amount="amount"),
+    ]
+
+
+class TestToolSelection(unittest.TestCase):
+    """tool_selection sends only the top-k tools ranked against the node prompt."""
+
+    def _compiler(self, top_k=2, expand=True, embedder=None):
+        catalog = _catalog()
+        node = _node_cfg("n")
+        node["tools"] = [t.name for t in catalog]
+        node["tool_selection"] = {"top_k": top_k, "expand": expand}
+        node["prompt"]["user_message"] = True
+        c, client = _bare_compiler([node])
+        c.tools = catalog
+        c.tool_embedder = embedder
+        c.user_message = "What were the total sales in the database for Q3?"
+        c.prompts = [{"system": "", "user": "{user_message}"}]
+        return c, client
+
+    # --- ranker ---
+
+    def test_bm25_ranks_matching_tool_first(self):
+        ranker = ToolRanker(_catalog())
+        self.assertEqual(ranker.top_k("weather in Rome tomorrow", 1)[0].name, "get_weather")
+        self.assertEqual(ranker.top_k("run a SQL query on sales", 1)[0].name, "query_db")
+
+    def test_camel_case_names_are_split(self):
+        ranker = ToolRanker(_catalog())
+        self.assertEqual(ranker.top_k("create event", 1)[0].name, "createCalendarEvent")
+
+    def test_unmatched_query_fills_in_declaration_order(self):
+        ranker = ToolRanker(_catalog())
+        names = [t.name for t in ranker.top_k("xyzzy", 3)]
+        self.assertEqual(names, ["send_email", "query_db", "get_weather"])
+
+    def test_exclude_skips_already_offered_tools(self):
+        ranker = ToolRanker(_catalog())
+        names = [t.name for t in ranker.top_k("weather", 2, exclude=["get_weather"])]
+        self.assertNotIn("get_weather", names)
+
+    def test_embedder_replaces_bm25(self):
+        calls = []
+
+        def embed(texts):
+            calls.append(len(texts))
+            return [[1.0, 0.0] if "calendar" in t.lower() else [0.0, 1.0] for t in texts]
+
+        ranker = ToolRanker(_catalog(), embedder=embed)
+        self.assertEqual(ranker.top_k("my calendar", 1)[0].name, "createCalendarEvent")
+        self.assertEqual(calls, [6, 1], "tools are embedded once, the query per call")
+
+    # --- compiler integration ---
+
+    def test_body_holds_top_k_plus_expand_tool(self):
+        c, _ = self._compiler(top_k=2)
+        names = [t.name for t in c._build_model_body(c.nodes["n"])["tools_data"]]
+        self.assertEqual(len(names), 3)
+        self.assertEqual(names[0], "query_db")
+        self.assertEqual(names[-1], EXPAND_TOOL_NAME)
+
+    def test_expand_disabled_sends_only_top_k(self):
+        c, _ = self._compiler(top_k=2, expand=False)
+        tools = c._build_model_body(c.nodes["n"])["tools_data"]
+        self.assertEqual(len(tools), 2)
+        self.assertNotIn(EXPAND_TOOL_NAME, [t.name for t in tools])
+
+    def test_small_catalog_is_not_trimmed(self):
+        c, _ = self._compiler(top_k=10)
+        tools = c._build_model_body(c.nodes["n"])["tools_data"]
+        self.assertEqual(len(tools), 6)
+
+    def test_expand_call_adds_tools_for_next_turn(self):
+        c, client = self._compiler(top_k=2)
+        client.complete.side_effect = [
+            LLmResponse(tools=[LLMFunctionCall(name=EXPAND_TOOL_NAME, parameters={"query": "weather forecast"})]),
+            LLmResponse(tools=[LLMFunctionCall(name="get_weather", parameters={"city": "Rome"})]),
+            _text_resp(),
+        ]
+        c.tool_executors = {"get_weather": lambda city: "sunny"}
+        node = c.nodes["n"]
+        c._run_tool_loop(node, c._build_model_body(node))
+        second_turn_tools = [t.name for t in client.complete.call_args_list[1].kwargs["tools_data"]]
+        self.assertIn("get_weather", second_turn_tools)
+        self.assertEqual(len(second_turn_tools), 5)
+
+    def test_top_k_must_be_positive(self):
+        from kegal.graph_node import NodeToolSelection
+        with self.assertRaises(ValidationError):
+            NodeToolSelection(top_k=0)
+
+
+# ===========================================================================
+# TestModelFallback
+# ===========================================================================
+
+class _Unavailable(Exception):
+    """Provider error the resilience layer treats as retryable (HTTP 503)."""
+    status_code = 503
+
+
+class TestModelFallback(unittest.TestCase):
+    """fallback_models takes over when the primary model is unavailable."""
+
+    def _compiler(self, fallback=(1,)):
+        node = _node_cfg("A")
+        node["fallback_models"] = list(fallback)
+        c, primary = _bare_compiler([node])
+        secondary = MagicMock()
+        c.clients = [primary, secondary]
+        c.context_windows = [None, 8192]
+        return c, primary, secondary
+
+    def test_fails_over_on_unavailable_primary(self):
+        c, primary, secondary = self._compiler()
+        primary.complete.side_effect = RuntimeError("503")
+        primary.complete.side_effect.__cause__ = _Unavailable()
+        secondary.complete.return_value = _text_resp()
+        self.assertTrue(c._run_node(c.nodes["A"]))
+        self.assertEqual(c.outputs.nodes[0].model, 1)
+        self.assertEqual(c.outputs.nodes[0].context_window, 8192)
+
+    def test_fails_over_on_open_circuit(self):
+        from kegal.llm import LlmCircuitOpenError
+        c, primary, secondary = self._compiler()
+        primary.complete.side_effect = LlmCircuitOpenError("dummy", 10)
+        secondary.complete.return_value = _text_resp()
+        c._run_node(c.nodes["A"])
+        self.assertEqual(c.outputs.nodes[0].model, 1)
+
+    def test_non_retryable_error_does_not_fail_over(self):
+        c, primary, secondary = self._compiler()
+        primary.complete.side_effect = ValueError("invalid request")
+        with self.assertRaises(ValueError):
+            c._run_node(c.nodes["A"])
+        secondary.complete.assert_not_called()
+
+    def test_primary_serves_when_healthy(self):
+        c, primary, secondary = self._compiler()
+        primary.complete.return_value = _text_resp()
+        c._run_node(c.nodes["A"])
+        self.assertEqual(c.outputs.nodes[0].model, 0)
+        secondary.complete.assert_not_called()
+
+    def test_tool_loop_sticks_to_fallback(self):
+        c, primary, secondary = self._compiler()
+        primary.complete.side_effect = TimeoutError("read timeout")
+        secondary.complete.side_effect = [_tool_resp(), _text_resp()]
+        with patch.object(c, "_execute_tool_call", return_value="ok"):
+            c._run_node(c.nodes["A"])
+        self.assertEqual(primary.complete.call_count, 1, "the dead primary is tried once per execution")
+        self.assertEqual(secondary.complete.call_count, 2)
+
+    def test_failover_state_is_per_agent_scope(self):
+        from kegal.compiler import _AgentScope, _agent_scope
+        c, _, _ = self._compiler()
+        node = c.nodes["A"]
+        failed_over, restarted = threading.Event(), threading.Event()
+        seen = {}
+
+        def run(name: str, first: threading.Event, then: threading.Event | None, fail_over: bool):
+            token = _agent_scope.set(_AgentScope(c, []))
+            try:
+                if fail_over:
+                    c._served_models()[node.id] = 1
+                else:
+                    first.wait(1)
+                    c._reset_served_model(node)     # the same node starting in another agent run
+                (then or first).set()
+                if then is not None:
+                    first.wait(1)
+                seen[name] = c._serving_model(node)
+            finally:
+                _agent_scope.reset(token)
+
+        other = threading.Thread(target=run, args=("failed_over", restarted, failed_over, True))
+        other.start()
+        run("restarted", failed_over, None, False)
+        other.join()
+        self.assertEqual(seen, {"failed_over": 1, "restarted": 0})
+        self.assertEqual(c._served_model, {})
+
+    def test_last_model_error_is_raised(self):
+        c, primary, secondary = self._compiler()
+        primary.complete.side_effect = TimeoutError("primary")
+        secondary.complete.side_effect = TimeoutError("secondary")
+        with self.assertRaisesRegex(TimeoutError, "secondary"):
+            c._run_node(c.nodes["A"])
+
+    def test_validation(self):
+        with self.assertRaises(ValidationError):
+            Graph.model_validate(_graph_source(nodes=[{**_node_cfg("A"), "fallback_models": []}]))
+        c, _, _ = self._compiler(fallback=(0, 5))
+        c._board_entries = {}
+        with self.assertRaises(ValueError) as ctx:
+            c._validate_indices()
+        self.assertIn("fallback model index 5 is out of range", str(ctx.exception))
+        self.assertIn("lists its primary model 0", str(ctx.exception))
+
+
+# ===========================================================================
+# TestHedging
+# ===========================================================================
+
+class _TimedClient:
+    """LlmHandler stand-in: each complete() sleeps for the next scripted delay."""
+
+    def __init__(self, delays, input_size=50, samples=(0.05,) * 20):
+        self.delays = list(delays)
+        self.input_size = input_size
+        self.calls = 0
+        self.coalesce_flags = []
+        self.latency = LatencyTracker()
+        for sample in samples:
+            self.latency.record(sample)
+        self._lock = threading.Lock()
+
+    def complete(self, **kwargs):
+        with self._lock:
+            self.calls += 1
+            self.coalesce_flags.append(kwargs.pop("coalesce", True))
+            delay = self.delays.pop(0) if self.delays else 0.0
+        time.sleep(delay)
+        return LLmResponse(messages=[f"after {delay}s"], input_size=self.input_size, output_size=5)
+
+
+class TestHedging(unittest.TestCase):
+    """hedge sends a duplicate once a call outlasts the model's latency percentile."""
+
+    def _compiler(self, clients, **hedge):
+        node = _node_cfg("A")
+        node["hedge"] = {"percentile": 95, "min_samples": 20, **hedge}
+        if len(clients) > 1:
+            node["fallback_models"] = list(range(1, len(clients)))
+        c, _ = _bare_compiler([node])
+        c.clients = clients
+        c.context_windows = [None] * len(clients)
+        self.addCleanup(self._shutdown_hedges, c)
+        return c
+
+    @staticmethod
+    def _shutdown_hedges(c):
+        pool = getattr(c, "_hedge_pool", None)
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+    def test_slow_call_is_hedged_and_first_answer_wins(self):
+        client = _TimedClient([1.0, 0.0])
+        c = self._compiler([client])
+        start = time.monotonic()
+        response = c._complete(c.nodes["A"], user_message="hi")
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertEqual(response.messages, ["after 0.0s"])
+        self.assertEqual(client.calls, 2)
+        self.assertEqual(c.outputs.hedged_calls, 1)
+
+    def test_loser_tokens_are_accounted(self):
+        client = _TimedClient([0.3, 0.0], input_size=40)
+        c = self._compiler([client])
+        c._complete(c.nodes["A"], user_message="hi")
+        deadline = time.monotonic() + 2
+        while c.outputs.hedge_input_size == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)        # the losing primary finishes on its own thread
+        self.assertEqual((c.outputs.hedge_input_size, c.outputs.hedge_output_size), (40, 5))
+        self.assertEqual(c.outputs.input_size, 0, "hedge tokens are kept out of the node totals")
+
+    def test_primary_does_not_queue_behind_hedge_pool(self):
+        client = _TimedClient([0.0])
+        c = self._compiler([client])
+        c._hedge_pool = ThreadPoolExecutor(max_workers=1)
+        release = threading.Event()
+        c._hedge_pool.submit(release.wait, 2)       # an earlier loser still holding the pool
+        start = time.monotonic()
+        response = c._complete(c.nodes["A"], user_message="hi")
+        release.set()
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertEqual(response.messages, ["after 0.0s"])
+        self.assertEqual((client.calls, c.outputs.hedged_calls), (1, 0))
+
+    def test_duplicate_bypasses_single_flight(self):
+        client = _TimedClient([1.0, 0.0])
+        c = self._compiler([client])
+        c._complete(c.nodes["A"], user_message="hi", temperature=0)
+        self.assertEqual(client.coalesce_flags, [True, False])
+
+    def test_coalesced_responses_are_counted(self):
+        c, mock_client = _bare_compiler([_node_cfg("A")])
+        mock_client.complete.return_value = LLmResponse(messages=["shared"], coalesced=True)
+        c._complete(c.nodes["A"], user_message="hi")
+        self.assertEqual(c.outputs.coalesced_calls, 1)
+
+    def test_streamed_call_is_not_hedged(self):
+        client = _TimedClient([0.3])
+        client.stream = lambda **kwargs: iter([
+            LLmStreamChunk(delta="hi"), LLmStreamChunk(response=client.complete(**kwargs)),
+        ])
+        c = self._compiler([client])
+        events = []
+        c._event_sink = events.append
+        c._complete(c.nodes["A"], user_message="hi")
+        self.assertEqual((client.calls, c.outputs.hedged_calls), (1, 0))
+        self.assertEqual([e.delta for e in events if e.type == "token"], ["hi"])
+
+    def test_fast_call_is_not_hedged(self):
+        client = _TimedClient([0.0])
+        c = self._compiler([client])
+        c._complete(c.nodes["A"], user_message="hi")
+        self.assertEqual((client.calls, c.outputs.hedged_calls), (1, 0))
+
+    def test_no_hedge_until_min_samples(self):
+        client = _TimedClient([0.2], samples=(0.01,) * 5)
+        c = self._compiler([client])
+        c._complete(c.nodes["A"], user_message="hi")
+        self.assertEqual((client.calls, c.outputs.hedged_calls), (1, 0))
+
+    def test_fallback_target_hedges_on_next_model(self):
+        primary, fallback = _TimedClient([1.0]), _TimedClient([0.0])
+        c = self._compiler([primary, fallback], target="fallback")
+        c._run_node(c.nodes["A"])
+        self.assertEqual(fallback.calls, 1)
+        self.assertEqual(c.outputs.nodes[0].model, 1)
+
+    def test_latency_percentile(self):
+        tracker = LatencyTracker()
+        for ms in range(1, 101):
+            tracker.record(ms / 1000)
+        self.assertAlmostEqual(tracker.percentile(95), 0.095)
+        self.assertAlmostEqual(tracker.percentile(50), 0.050)
+        self.assertIsNone(tracker.percentile(95, min_samples=101))
+
+    def test_fallback_target_requires_fallback_models(self):
+        node = {**_node_cfg("A"), "hedge": {"target": "fallback"}}
+        c, _ = _bare_compiler([node])
+        with self.assertRaises(ValueError) as ctx:
+            c._validate_indices()
+        self.assertIn("no fallback_models", str(ctx.exception))
+
+
+# ===========================================================================
+# TestCompileIter
+# ===========================================================================
+
+def _stream_of(*responses):
+    """side_effect for client.stream: one response per call, its text split into two deltas."""
+    pending = list(responses)
+
+    def stream(**kwargs):
+        response = pending.pop(0)
+        text = "".join(response.messages or [])
+        half = len(text) // 2
+        for delta in (text[:half], text[half:]):
+            if delta:
+                yield LLmStreamChunk(delta=delta)
+        yield LLmStreamChunk(response=response)
+    return stream
+
+
+class TestCompileIter(unittest.TestCase):
+    """compile_iter() yields typed events while the graph runs."""
+
+    def test_event_sequence_for_one_node(self):
+        c, mock_client = _bare_compiler([_node_cfg("A")])
+        mock_client.stream.side_effect = _stream_of(LLmResponse(messages=["hello"], input_size=3))
+        events = list(c.compile_iter())
+        self.assertEqual([type(e) for e in events],
+                         [NodeStartedEvent, TokenDeltaEvent, TokenDeltaEvent, NodeFinishedEvent, CompileFinishedEvent])
+        self.assertEqual("".join(e.delta for e in events if e.type == "token"), "hello")
+        self.assertEqual(events[3].output.response.messages, ["hello"])
+        self.assertEqual(events[-1].output.input_size, 3)
+        mock_client.complete.assert_not_called()
+
+    def test_tool_calls_are_reported(self):
+        c, mock_client = _bare_compiler([_node_cfg("A")])
+        c.tool_executors = {"dummy_tool": lambda: "ok"}
+        mock_client.stream.side_effect = _stream_of(_tool_resp(), _text_resp())
+        events = list(c.compile_iter())
+        tool_events = [e for e in events if isinstance(e, ToolCallEvent)]
+        self.assertEqual([(e.node_id, e.name) for e in tool_events], [("A", "dummy_tool")])
+
+    def test_compile_error_is_raised_after_events(self):
+        c, mock_client = _bare_compiler([_node_cfg("A")])
+        mock_client.stream.side_effect = RuntimeError("provider down")
+        seen = []
+        with self.assertRaises(RuntimeError):
+            for event in c.compile_iter():
+                seen.append(event.type)
+        self.assertEqual(seen, ["node_started"])
+
+    def test_plain_compile_does_not_stream(self):
+        c, mock_client = _bare_compiler([_node_cfg("A")])
+        mock_client.complete.return_value = _text_resp()
+        c.compile()
+        mock_client.stream.assert_not_called()
+
+    def test_async_variant(self):
+        c, mock_client = _bare_compiler([_node_cfg("A")])
+        mock_client.stream.side_effect = _stream_of(LLmResponse(messages=["hi"]))
+
+        async def collect():
+            return [event.type async for event in c.acompile_iter()]
+
+        self.assertEqual(asyncio.run(collect()),
+                         ["node_started", "token", "token", "node_finished", "compile_finished"])
+
+
+# ===========================================================================
+# TestObservationPolicy
+# ===========================================================================
+
+class TestObservationPolicy(unittest.TestCase):
+
+    def _compiler(self, observations):
+        cfg = _node_cfg("A")
+        cfg["observations"] = observations
+        return _bare_compiler([cfg])
+
+    def test_truncate_keeps_head_and_tail(self):
+        text = "H" * 50 + "M" * 100 + "T" * 50
+        out = truncate_observation(text, 20, head_ratio=0.5)
+        self.assertTrue(out.startswith("H" * 10) and out.endswith("T" * 10))
+        self.assertIn("[180 characters omitted]", out)
+        self.assertEqual(truncate_observation("short", 20), "short")
+
+    def test_extract_keeps_dotted_fields_per_record(self):
+        rows = [{"id": 1, "meta": {"title": "a", "body": "x" * 50}}, {"id": 2, "meta": {"title": "b"}}]
+        self.assertEqual(json.loads(extract_observation(json.dumps(rows), ["id", "meta.title"])),
+                         [{"id": 1, "meta.title": "a"}, {"id": 2, "meta.title": "b"}])
+        self.assertIsNone(extract_observation("not json", ["id"]))
+
+    def test_policy_validation(self):
+        with self.assertRaises(ValidationError):
+            NodeObservation(strategy="extract")
+        with self.assertRaises(ValidationError):
+            NodeObservation(strategy="blackboard")
+        with self.assertRaises(ValidationError):
+            NodeObservation(max_chars=0)
+
+    def test_tool_history_shrunk_but_tool_results_full(self):
+        c, mock_client = self._compiler({"dummy_tool": {"max_chars": 30}})
+        mock_client.complete.side_effect = [_tool_resp(), _text_resp()]
+        payload = "row " * 100
+        with patch.object(c, "_execute_tool_call", return_value=payload):
+            response = c._run_tool_loop(c.nodes["A"], {"temperature": 0.0, "max_tokens": 100})
+        self.assertEqual(response.tool_results, [payload])
+        sent = mock_client.complete.call_args.kwargs["chat_history"][-1].content
+        self.assertLess(len(sent), 100)
+        self.assertIn("characters omitted", sent)
+
+    def test_wildcard_and_passthrough(self):
+        c, _ = self._compiler({"*": {"max_chars": 5}, "big": {"max_chars": 1000}})
+        node = c.nodes["A"]
+        self.assertEqual(c._shape_observation(node, "big", "x" * 500), "x" * 500)
+        self.assertNotEqual(c._shape_observation(node, "other", "x" * 500), "x" * 500)
+        self.assertEqual(c._shape_observation(node, "other", "tiny"), "tiny")
+
+    def test_summarize_uses_model_and_falls_back_to_truncation(self):
+        c, mock_client = self._compiler({"*": {"max_chars": 50, "strategy": "summarize"}})
+        mock_client.complete.return_value = LLmResponse(messages=["3 rows, all ok"])
+        self.assertEqual(c._shape_observation(c.nodes["A"], "sql", "r" * 500), "3 rows, all ok")
+        self.assertIn("r" * 500, mock_client.complete.call_args.kwargs["user_message"])
+        mock_client.complete.side_effect = RuntimeError("down")
+        self.assertIn("characters omitted", c._shape_observation(c.nodes["A"], "sql", "r" * 500))
+
+    def test_blackboard_spill_writes_full_payload(self):
+        c, _ = self._compiler({"*": {"max_chars": 200, "strategy": "blackboard", "board": "notes"}})
+        payload = "page " * 200
+        out = c._shape_observation(c.nodes["A"], "fetch", payload)
+        self.assertLessEqual(len(out), 200 + 40)
+        self.assertIn("saved to blackboard 'notes'", out)
+        self.assertIn(payload, c._boards["notes"])
+
+
+# ===========================================================================
+# TestMediaPolicy
+# ===========================================================================
+
+class TestMediaPolicy(unittest.TestCase):
+
+    _IMG = LLMImageData(media_type="image/png", image_b64="aW1n")
+
+    def _run(self, policy=None, responses=None):
+        cfg = _node_cfg("A")
+        if policy is not None:
+            cfg["media_policy"] = policy
+        c, mock_client = _bare_compiler([cfg])
+        calls = []
+        replies = iter(responses or [_tool_resp(), _tool_resp(), _text_resp()])
+
+        def complete(**kwargs):
+            calls.append({**kwargs, "chat_history": list(kwargs.get("chat_history") or [])})
+            return next(replies)
+
+        mock_client.complete.side_effect = complete
+        body = {"temperature": 0.0, "max_tokens": 100, "user_message": "describe", "imgs_b64": [self._IMG]}
+        with patch.object(c, "_execute_tool_call", return_value="ok"):
+            response = c._run_tool_loop(c.nodes["A"], body)
+        return response, calls
+
+    def test_every_turn_is_the_default(self):
+        _, calls = self._run()
+        self.assertTrue(all(call.get("imgs_b64") for call in calls))
+        self.assertNotIn("media_turn", calls[0])
+
+    def test_first_turn_sends_attachments_once(self):
+        _, calls = self._run("first_turn")
+        self.assertEqual([bool(call.get("imgs_b64")) for call in calls], [True, False, False])
+        first_user = calls[1]["chat_history"][0]
+        self.assertTrue(first_user.content.startswith("describe"))
+        self.assertIn("1 image attached to this message on the first turn", first_user.content)
+
+    def test_cached_pins_attachments_to_the_first_user_turn(self):
+        _, calls = self._run("cached")
+        for call in calls:
+            self.assertNotIn("user_message", call)
+            self.assertEqual(call["media_turn"], 0)
+            self.assertEqual(call["chat_history"][0].content, "describe")
+            self.assertEqual(call["imgs_b64"], [self._IMG])
+
+    def test_tool_loop_tokens_summed_over_turns(self):
+        responses = [LLmResponse(tools=[LLMFunctionCall(name="t", parameters={})],
+                                 input_size=100, output_size=5, cached_input_size=0),
+                     LLmResponse(messages=["done"], input_size=120, output_size=7, cached_input_size=90)]
+        response, _ = self._run("cached", responses)
+        self.assertEqual((response.input_size, response.output_size, response.cached_input_size),
+                         (220, 12, 90))
+
+    def test_cached_tokens_aggregated_in_outputs(self):
+        c, _ = _bare_compiler()
+        c._record_output(c.nodes["n"], LLmResponse(input_size=100, cached_input_size=80), 0.1, False)
+        self.assertEqual(c.outputs.cached_input_size, 80)
+
+
+# ===========================================================================
+# TestSpeculativeGuards
+# ===========================================================================
+
+class TestSpeculativeGuards(unittest.TestCase):
+    """speculative_guards: the guard's dependents start while the guard runs."""
+
+    def _compiler(self, worker_out: bool = False):
+        guard = _node_cfg("G")
+        guard["structured_output"] = {"type": "object", "properties": {"validation": {"type": "boolean"}}}
+        worker = _node_cfg("W")
+        worker["model"] = 1
+        worker["message_passing"] = {"input": False, "output": worker_out}
+        c, guard_client = _bare_compiler([guard, worker], [{"node": "G", "children": [{"node": "W"}]}])
+        worker_client = MagicMock()
+        c.clients = [guard_client, worker_client]
+        c.context_windows = [None, None]
+        c.speculative_guards = True
+        return c, guard_client, worker_client
+
+    @staticmethod
+    def _verdict(passed: bool, wait_for: threading.Event):
+        def complete(**kwargs):
+            # The guard answers only once the worker is underway
+            assert wait_for.wait(2), "worker did not start during the guard"
+            return LLmResponse(json_output={"validation": passed}, input_size=5, output_size=1)
+        return complete
+
+    def test_worker_committed_when_guard_passes(self):
+        c, guard_client, worker_client = self._compiler(worker_out=True)
+        finished = threading.Event()
+
+        def stream(**kwargs):
+            yield LLmStreamChunk(delta="done")
+            finished.set()
+            yield LLmStreamChunk(response=LLmResponse(messages=["done"], input_size=7, output_size=2))
+
+        worker_client.stream.side_effect = stream
+        guard_client.complete.side_effect = self._verdict(True, finished)
+        c.compile()
+        self.assertEqual(sorted(o.node_id for o in c.outputs.nodes), ["G", "W"])
+        self.assertEqual((c.outputs.input_size, c.outputs.output_size), (12, 3))
+        self.assertEqual(c.message_passing, ["done"])
+        self.assertEqual(c.outputs.speculative_input_size, 0)
+        worker_client.complete.assert_not_called()
+
+    def test_blocked_guard_cancels_stream_and_drops_effects(self):
+        c, guard_client, worker_client = self._compiler(worker_out=True)
+        started, closed = threading.Event(), threading.Event()
+        sent = []
+
+        def stream(**kwargs):
+            try:
+                for _ in range(100):
+                    sent.append(1)
+                    started.set()
+                    yield LLmStreamChunk(delta="x")
+                    time.sleep(0.01)
+                yield LLmStreamChunk(response=LLmResponse(messages=["x" * 100], input_size=7))
+            finally:
+                closed.set()
+
+        worker_client.stream.side_effect = stream
+        guard_client.stream.side_effect = lambda **kwargs: iter([
+            LLmStreamChunk(response=self._verdict(False, started)())
+        ])
+        events = list(c.compile_iter())
+        self.assertTrue(closed.is_set())
+        self.assertLess(len(sent), 100)
+        self.assertEqual([o.node_id for o in c.outputs.nodes], ["G"])
+        self.assertEqual(c.message_passing, [])
+        self.assertNotIn("W", {getattr(e, "node_id", None) for e in events})
+
+    def test_wasted_tokens_reported(self):
+        c, guard_client, worker_client = self._compiler()
+        finished = threading.Event()
+
+        def stream(**kwargs):
+            yield LLmStreamChunk(response=LLmResponse(messages=["done"], input_size=7, output_size=2))
+            finished.set()
+
+        worker_client.stream.side_effect = stream
+        guard_client.complete.side_effect = self._verdict(False, finished)
+        c.compile()
+        self.assertEqual([o.node_id for o in c.outputs.nodes], ["G"])
+        self.assertEqual((c.outputs.input_size, c.outputs.output_size), (5, 1))
+        self.assertEqual((c.outputs.speculative_input_size, c.outputs.speculative_output_size), (7, 2))
+
+    def test_board_writes_held_until_commit(self):
+        c, guard_client, worker_client = self._compiler()
+        c.nodes["W"] = c.nodes["W"].model_copy(update={"blackboard": NodeBlackboardRef(id="b", write=True)})
+        c._boards = {"b": ""}
+        finished = threading.Event()
+        board_during_guard = []
+
+        def stream(**kwargs):
+            yield LLmStreamChunk(response=LLmResponse(messages=["note"]))
+            finished.set()
+
+        def complete(**kwargs):
+            finished.wait(2)
+            time.sleep(0.05)
+            board_during_guard.append(c._boards["b"])
+            return LLmResponse(json_output={"validation": True})
+
+        worker_client.stream.side_effect = stream
+        guard_client.complete.side_effect = complete
+        c.compile()
+        self.assertEqual(board_during_guard, [""])
+        self.assertEqual(c._boards["b"], "note")
+
+    def test_candidate_selection(self):
+        c, _, _ = self._compiler()
+        deps = c._build_dag()
+        levels = c._topological_levels(deps)
+        self.assertEqual(c._speculative_nodes(levels, deps), ["W"])
+
+        # Reads the pipe the guard writes
+        c.nodes["G"].message_passing.output = True
+        c.nodes["W"].message_passing.input = True
+        self.assertEqual(c._speculative_nodes(levels, deps), [])
+        c.nodes["W"].message_passing.input = False
+
+        # Tool calls cannot be undone
+        c.nodes["W"].tools = ["dummy_tool"]
+        self.assertEqual(c._speculative_nodes(levels, deps), [])
+        c.nodes["W"].tools = None
+
+        c.speculative_guards = False
+        self.assertEqual(c._speculative_nodes(levels, deps), [])
+
+    def test_off_by_default(self):
+        self.assertFalse(Graph.model_validate(_graph_source()).speculative_guards)
+        c, _ = _bare_compiler()
+        self.assertEqual(c._speculative_nodes([["n"], ["m"]], {"n": set(), "m": {"n"}}), [])
+
+
 # ===========================================================================
 # TestPythonToolExecutor
 # ===========================================================================
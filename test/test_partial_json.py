@@ -0,0 +1,51 @@
+"""Unit tests for the incremental JSON object parser used by early ReAct dispatch."""
+import json
+import unittest
+
+from kegal.partial_json import PartialJsonObject
+
+
+def _feed_chars(parser: PartialJsonObject, text: str) -> list[str]:
+    completed = []
+    for ch in text:
+        completed += parser.feed(ch)
+    return completed
+
+
+class TestPartialJsonObject(unittest.TestCase):
+
+    def test_fields_complete_in_order(self):
+        doc = {"next_agent": "search", "agent_input": "find \"x\"", "n": 3, "ok": True, "reasoning": "long"}
+        parser = PartialJsonObject()
+        self.assertEqual(_feed_chars(parser, json.dumps(doc)), list(doc))
+        self.assertEqual(parser.fields, doc)
+        self.assertTrue(parser.closed)
+
+    def test_string_available_before_object_closes(self):
+        parser = PartialJsonObject()
+        parser.feed('{"next_agent": "search", "agent_input": "q"')
+        self.assertEqual(parser.fields, {"next_agent": "search", "agent_input": "q"})
+        self.assertFalse(parser.closed)
+        self.assertEqual(parser.feed(', "reasoning": "still wri'), [])
+
+    def test_nested_values_decoded_when_closed(self):
+        parser = PartialJsonObject()
+        completed = _feed_chars(parser, '{"a": {"b": [1, "}"]}, "c": [], "d": null}')
+        self.assertEqual(completed, ["a", "c", "d"])
+        self.assertEqual(parser.fields, {"a": {"b": [1, "}"]}, "c": [], "d": None})
+
+    def test_scalar_needs_a_delimiter(self):
+        parser = PartialJsonObject()
+        self.assertEqual(parser.feed('{"done": tr'), [])
+        self.assertEqual(parser.feed("ue"), [])
+        self.assertEqual(parser.feed("}"), ["done"])
+        self.assertIs(parser.fields["done"], True)
+
+    def test_leading_text_is_skipped(self):
+        parser = PartialJsonObject()
+        parser.feed('```json\n{"k": "v"}\n```')
+        self.assertEqual(parser.fields, {"k": "v"})
+
+
+if __name__ == "__main__":
+    unittest.main()
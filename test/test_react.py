@@ -1,10 +1,13 @@
+import json
+import threading
+import time
 import unittest
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
 from pydantic import ValidationError
 
-from kegal.compiler import Compiler, ReactTrace
+from kegal.compiler import CompiledOutput, Compiler, ReactTrace
 from kegal.graph import Graph, NodeReact
 
 CURRENT_DIR = Path(__file__).parent
@@ -34,6 +37,7 @@ def _make_compiler(nodes_cfg: list, edges_cfg: list, extra: dict | None = None)
     c.tools = graph.tools
     c.graph_mcp_servers = graph.mcp_servers or []
     c._board_entries = {}
+    c._boards = {}
     c.react_compact_prompts = []
     c._react_trace = {}
     c._react_controllers = c._build_react_controller_map()
@@ -361,6 +365,12 @@ class TestRunReactAgent(unittest.TestCase):
         )
         c.outputs = CompiledOutput()
         c._outputs_lock = __import__("threading").Lock()
+        c._tool_index = {}
+        c.tool_embedder = None
+        c._hedge_pool = None
+        c._event_sink = None
+        c.speculative_guards = False
+        c._served_model = {}
         c._message_passing_lock = __import__("threading").Lock()
         c._blackboard_lock = __import__("threading").Lock()
         return c
@@ -468,6 +478,12 @@ class TestRunReactLoop(unittest.TestCase):
         c._react_trace = {}
         c._react_controllers = c._build_react_controller_map()
         c._outputs_lock = __import__("threading").Lock()
+        c._tool_index = {}
+        c.tool_embedder = None
+        c._hedge_pool = None
+        c._event_sink = None
+        c.speculative_guards = False
+        c._served_model = {}
         c._message_passing_lock = __import__("threading").Lock()
         c._blackboard_lock = __import__("threading").Lock()
         from kegal.compiler import CompiledOutput
@@ -590,6 +606,57 @@ class TestRunReactLoop(unittest.TestCase):
         self.assertEqual(trace.total_controller_input_tokens, 100)
         self.assertEqual(trace.total_controller_output_tokens, 40)
 
+    def test_observation_policy_shrinks_agent_output(self):
+        """The controller sees the shrunk observation; the trace keeps the full agent output."""
+        from kegal.graph_node import NodeObservation
+        c, mock_client = self._setup_controller()
+        c.nodes["ctrl"].observations = {"agent_a": NodeObservation(max_chars=40)}
+        mock_client.complete.side_effect = [
+            self._make_response({"next_agent": "agent_a"}),
+            self._make_response({"done": True}),
+        ]
+        with patch.object(c, "_run_react_agent", return_value="y" * 1000):
+            c._run_react_loop(c._react_controllers["ctrl"], c.nodes["ctrl"])
+
+        it = c.get_react_trace("ctrl").iterations[0]
+        self.assertEqual(it.agent_output, "y" * 1000)
+        self.assertIn("characters omitted", it.observation)
+        # The live history ends with the final decision; the observation precedes it
+        sent = mock_client.complete.call_args.kwargs["chat_history"][-2].content
+        self.assertEqual(sent, f"[observation from agent_a]\n{it.observation}")
+
+
+    def _run_with_image(self, policy):
+        from kegal.llm.llm_model import LLMImageData
+        c, mock_client = self._setup_controller()
+        c.nodes["ctrl"].media_policy = policy
+        image = LLMImageData(media_type="image/png", image_b64="aW1n")
+        build = c._build_model_body
+        calls = []
+
+        def complete(**kwargs):
+            calls.append({**kwargs, "chat_history": [m.model_copy() for m in kwargs["chat_history"]]})
+            return [self._make_response({"next_agent": "agent_a"}),
+                    self._make_response({"done": True})][len(calls) - 1]
+
+        mock_client.complete.side_effect = complete
+        with patch.object(c, "_build_model_body", lambda node: {**build(node), "imgs_b64": [image]}), \
+                patch.object(c, "_run_react_agent", return_value="seen"):
+            c._run_react_loop(c._react_controllers["ctrl"], c.nodes["ctrl"])
+        return calls
+
+    def test_media_first_turn_only_on_first_controller_call(self):
+        calls = self._run_with_image("first_turn")
+        self.assertEqual([bool(call.get("imgs_b64")) for call in calls], [True, False])
+        self.assertIn("attached to this message on the first turn", calls[1]["chat_history"][0].content)
+
+    def test_media_cached_pinned_to_initial_user_message(self):
+        calls = self._run_with_image("cached")
+        for call in calls:
+            self.assertEqual(call["media_turn"], 0)
+            self.assertIn("test question", call["chat_history"][0].content)
+            self.assertTrue(call["imgs_b64"])
+
 
 # ---------------------------------------------------------------------------
 # _maybe_compact
@@ -605,6 +672,12 @@ class TestMaybeCompact(unittest.TestCase):
         )
         c.outputs = CompiledOutput()
         c._outputs_lock = __import__("threading").Lock()
+        c._tool_index = {}
+        c.tool_embedder = None
+        c._hedge_pool = None
+        c._event_sink = None
+        c.speculative_guards = False
+        c._served_model = {}
         c._blackboard_lock = __import__("threading").Lock()
         c._message_passing_lock = __import__("threading").Lock()
         # Provide a real context_window so _maybe_compact doesn't skip compaction.
@@ -741,6 +814,12 @@ class TestRunReactAgentExtended(unittest.TestCase):
         c.outputs = CompiledOutput()
         c.message_passing = []
         c._outputs_lock = __import__("threading").Lock()
+        c._tool_index = {}
+        c.tool_embedder = None
+        c._hedge_pool = None
+        c._event_sink = None
+        c.speculative_guards = False
+        c._served_model = {}
         c._message_passing_lock = __import__("threading").Lock()
         c._blackboard_lock = __import__("threading").Lock()
         return c
@@ -770,6 +849,12 @@ class TestRunReactAgentExtended(unittest.TestCase):
         c.outputs = CompiledOutput()
         c.message_passing = []
         c._outputs_lock = __import__("threading").Lock()
+        c._tool_index = {}
+        c.tool_embedder = None
+        c._hedge_pool = None
+        c._event_sink = None
+        c.speculative_guards = False
+        c._served_model = {}
         c._message_passing_lock = __import__("threading").Lock()
         c._blackboard_lock = __import__("threading").Lock()
 
@@ -797,6 +882,12 @@ class TestRunReactAgentExtended(unittest.TestCase):
         )
         c.outputs = CompiledOutput()
         c._outputs_lock = __import__("threading").Lock()
+        c._tool_index = {}
+        c.tool_embedder = None
+        c._hedge_pool = None
+        c._event_sink = None
+        c.speculative_guards = False
+        c._served_model = {}
         c._message_passing_lock = __import__("threading").Lock()
         c._blackboard_lock = __import__("threading").Lock()
         c.message_passing = ["preserved"]
@@ -812,6 +903,76 @@ class TestRunReactAgentExtended(unittest.TestCase):
 
         self.assertEqual(c.message_passing, ["preserved"])
 
+    def test_branches_of_a_level_run_concurrently(self):
+        """w1 → (w2, w3): the two children share a level and run in parallel inside the agent scope."""
+        from kegal.compiler import CompiledOutput
+        c = _make_compiler(
+            [_node("ctrl", react=True), _node("w1"), _node("w2"), _node("w3")],
+            [{"node": "ctrl", "react": [
+                {"node": "w1", "children": [{"node": "w2"}, {"node": "w3"}]}
+            ]}],
+        )
+        c.outputs = CompiledOutput()
+        c.message_passing = ["main pipe"]
+        c._message_passing_lock = threading.Lock()
+        barrier = threading.Barrier(2, timeout=2)
+
+        def fake_run_node(node):
+            if node.id != "w1":
+                barrier.wait()      # w2 and w3 must be running at the same time
+            with c._message_passing_lock:
+                c.message_passing.append(node.id)
+
+        c._run_node = fake_run_node
+        result = c._run_react_agent(c._react_controllers["ctrl"].react[0], "task")
+
+        self.assertEqual(result.split("\n\n")[0], "w1")
+        self.assertEqual(sorted(result.split("\n\n")[1:]), ["w2", "w3"])
+        self.assertEqual(c.message_passing, ["main pipe"])
+
+    def test_concurrent_level_effects_follow_node_order(self):
+        """w1 → (w2, w3) with w2 finishing last: pipe entries, outputs and board writes stay in w2, w3 order."""
+        from kegal.compiler import CompiledOutput
+        from kegal.graph_blackboard import NodeBlackboardRef
+        from kegal.llm.llm_model import LLmResponse
+        c = _make_compiler(
+            [_node("ctrl", react=True), _node("w1"), _node("w2", mp_out=True), _node("w3", mp_out=True)],
+            [{"node": "ctrl", "react": [
+                {"node": "w1", "children": [{"node": "w2"}, {"node": "w3"}]}
+            ]}],
+        )
+        c.outputs = CompiledOutput()
+        c.message_passing = []
+        c._outputs_lock = threading.Lock()
+        c._message_passing_lock = threading.Lock()
+        c._blackboard_write_buffer = None
+        c._event_sink = None
+        c._served_model = {}
+        for nid in ("w2", "w3"):
+            c.nodes[nid].blackboard = NodeBlackboardRef(id="notes", write=True)
+        w3_done = threading.Event()
+        agent_outputs = []
+
+        def fake_run_node(node):
+            if node.id == "w2":
+                self.assertTrue(w3_done.wait(2))
+            response = LLmResponse(messages=[f"{node.id} out"])
+            c._record_output(node, response, 0.0, False)
+            c._update_blackboard(node, response)
+            c._check_message_passing(response, node)
+            agent_outputs.append(c.outputs)
+            if node.id == "w3":
+                w3_done.set()
+            return True
+
+        c._run_node = fake_run_node
+        with patch.object(c, "_write_to_board") as write:
+            result = c._run_react_agent(c._react_controllers["ctrl"].react[0], "task")
+
+        self.assertEqual(result, "w2 out\n\nw3 out")
+        self.assertEqual([o.node_id for o in agent_outputs[0].nodes], ["w1", "w2", "w3"])
+        self.assertEqual([call.args for call in write.call_args_list], [("notes", "w2 out"), ("notes", "w3 out")])
+
 
 # ---------------------------------------------------------------------------
 # compact flag in _run_react_loop
@@ -866,6 +1027,12 @@ class TestCompactInLoop(unittest.TestCase):
         c._react_trace = {}
         c._react_controllers = c._build_react_controller_map()
         c._outputs_lock = __import__("threading").Lock()
+        c._tool_index = {}
+        c.tool_embedder = None
+        c._hedge_pool = None
+        c._event_sink = None
+        c.speculative_guards = False
+        c._served_model = {}
         c._message_passing_lock = __import__("threading").Lock()
         c._blackboard_lock = __import__("threading").Lock()
         c.outputs = CompiledOutput()
@@ -943,6 +1110,12 @@ class TestCompactInLoop(unittest.TestCase):
         c._react_trace = {}
         c._react_controllers = c._build_react_controller_map()
         c._outputs_lock = __import__("threading").Lock()
+        c._tool_index = {}
+        c.tool_embedder = None
+        c._hedge_pool = None
+        c._event_sink = None
+        c.speculative_guards = False
+        c._served_model = {}
         c._message_passing_lock = __import__("threading").Lock()
         c._blackboard_lock = __import__("threading").Lock()
         c.outputs = CompiledOutput()
@@ -962,6 +1135,448 @@ class TestCompactInLoop(unittest.TestCase):
         mock_compact.assert_not_called()
 
 
+# ---------------------------------------------------------------------------
+# Early dispatch from a streamed controller decision
+# ---------------------------------------------------------------------------
+
+class TestEarlyDispatch(unittest.TestCase):
+
+    def _setup(self, decisions: list[dict], pause=None):
+        """Controller with early_dispatch whose client streams each decision in small JSON fragments."""
+        from kegal.llm.llm_model import LLmResponse, LLmStreamChunk
+        c, mock_client = TestRunReactLoop._setup_controller(self)
+        c.nodes["ctrl"].react.early_dispatch = True
+        pending = list(decisions)
+
+        def stream(**kwargs):
+            decision = pending.pop(0)
+            text = json.dumps(decision)
+            for i in range(0, len(text), 8):
+                if pause is not None and '"reasoning"' in text[:i]:
+                    pause()
+                yield LLmStreamChunk(json_delta=text[i:i + 8])
+            yield LLmStreamChunk(response=LLmResponse(json_output=decision, input_size=10, output_size=5))
+
+        mock_client.stream.side_effect = stream
+        return c
+
+    def test_agent_starts_before_stream_ends(self):
+        started = threading.Event()
+        c = self._setup(
+            [{"next_agent": "agent_a", "agent_input": "look up x", "reasoning": "because"},
+             {"done": True, "final_answer": "x"}],
+            pause=lambda: self.assertTrue(started.wait(2), "agent not started during the stream"),
+        )
+        calls = []
+
+        def agent(edge, agent_input, speculation=None):
+            calls.append(agent_input)
+            started.set()
+            return "x found"
+
+        with patch.object(c, "_run_react_agent", side_effect=agent):
+            c._run_react_loop(c._react_controllers["ctrl"], c.nodes["ctrl"])
+
+        trace = c.get_react_trace("ctrl")
+        self.assertEqual(calls, ["look up x"])
+        self.assertTrue(trace.iterations[0].dispatched_early)
+        self.assertEqual(trace.iterations[0].agent_output, "x found")
+        self.assertEqual(trace.final_answer, "x")
+
+    def test_done_after_routing_fields_discards_early_result(self):
+        c = self._setup([{"next_agent": "agent_a", "agent_input": "q", "done": True, "final_answer": "a"}])
+        with patch.object(c, "_run_react_agent", return_value="unused") as agent:
+            c._run_react_loop(c._react_controllers["ctrl"], c.nodes["ctrl"])
+        agent.assert_called_once()
+        trace = c.get_react_trace("ctrl")
+        self.assertTrue(trace.done)
+        self.assertEqual(trace.total_iterations, 0)
+
+    def test_discarded_agent_is_cancelled_not_awaited(self):
+        c = self._setup([{"next_agent": "agent_a", "agent_input": "q", "done": True, "final_answer": "a"}])
+        c._outputs = CompiledOutput()
+        release = threading.Event()
+        finished = threading.Event()
+        scopes = []
+
+        def agent(edge, agent_input, speculation=None):
+            scopes.append(speculation)
+            speculation.input_size, speculation.output_size = 7, 3
+            speculation.board_writes.append(("notes", "draft"))
+            release.wait(2)
+            finished.set()
+            return "unused"
+
+        with patch.object(c, "_run_react_agent", side_effect=agent), \
+             patch.object(c, "_write_to_board") as write:
+            c._run_react_loop(c._react_controllers["ctrl"], c.nodes["ctrl"])
+            self.assertFalse(finished.is_set(), "the loop waited for the discarded agent")
+            self.assertTrue(scopes[0].cancelled.is_set())
+            release.set()
+            deadline = time.time() + 2
+            while c._outputs.early_dispatch_input_size == 0 and time.time() < deadline:
+                time.sleep(0.01)
+
+        write.assert_not_called()
+        self.assertEqual(c._outputs.early_dispatch_input_size, 7)
+        self.assertEqual(c._outputs.early_dispatch_output_size, 3)
+
+    def test_confirmed_agent_board_writes_committed(self):
+        c = self._setup([{"next_agent": "agent_a", "agent_input": "q", "reasoning": "r"},
+                         {"done": True, "final_answer": "x"}])
+
+        def agent(edge, agent_input, speculation=None):
+            speculation.board_writes.append(("notes", "found x"))
+            return "x found"
+
+        with patch.object(c, "_run_react_agent", side_effect=agent), \
+             patch.object(c, "_write_to_board") as write:
+            c._run_react_loop(c._react_controllers["ctrl"], c.nodes["ctrl"])
+
+        write.assert_called_once_with("notes", "found x")
+        self.assertTrue(c.get_react_trace("ctrl").iterations[0].dispatched_early)
+
+    def test_memo_key_taken_before_early_agent_runs(self):
+        c = self._setup([{"next_agent": "agent_a", "agent_input": "q", "reasoning": "r"},
+                         {"next_agent": "agent_a", "agent_input": "q", "reasoning": "r"},
+                         {"done": True, "final_answer": "x"}])
+        c.nodes["ctrl"].react.memoize_agents = True
+        ran = []
+        key_calls = []
+        memo_key = c._agent_memo_key
+
+        def agent(edge, agent_input, speculation=None):
+            ran.append(agent_input)
+            return "x found"
+
+        def key(edge, agent_input):
+            key_calls.append(len(ran))
+            return memo_key(edge, agent_input)
+
+        with patch.object(c, "_run_react_agent", side_effect=agent), \
+             patch.object(c, "_agent_memo_key", side_effect=key):
+            c._run_react_loop(c._react_controllers["ctrl"], c.nodes["ctrl"])
+
+        trace = c.get_react_trace("ctrl")
+        self.assertEqual(ran, ["q"])
+        # Keyed before the early agent ran, and not again once its result was committed
+        self.assertEqual(key_calls, [0, 1, 1])
+        self.assertEqual([it.dispatched_early for it in trace.iterations], [True, False])
+        self.assertEqual([it.cached for it in trace.iterations], [False, True])
+
+    def test_agent_with_tools_not_dispatched_early(self):
+        c = self._setup([{"next_agent": "agent_a", "agent_input": "q", "reasoning": "r"},
+                         {"done": True, "final_answer": "x"}])
+        c.nodes["agent_a"].tools = ["search"]
+        with patch.object(c, "_run_react_agent", return_value="x found") as agent:
+            c._run_react_loop(c._react_controllers["ctrl"], c.nodes["ctrl"])
+
+        agent.assert_called_once()
+        self.assertEqual(agent.call_args.args[1:], ("q",))
+        self.assertFalse(c.get_react_trace("ctrl").iterations[0].dispatched_early)
+
+    def test_disabled_uses_complete(self):
+        from kegal.llm.llm_model import LLmResponse
+        c, mock_client = TestRunReactLoop._setup_controller(self)
+        mock_client.complete.return_value = LLmResponse(json_output={"done": True, "final_answer": "a"})
+        c._run_react_loop(c._react_controllers["ctrl"], c.nodes["ctrl"])
+        mock_client.stream.assert_not_called()
+
+
+class TestBackgroundCompaction(unittest.TestCase):
+
+    def _setup(self, summarize):
+        """Controller that dispatches agent_a twice, then finishes; compaction calls go to summarize()."""
+        from kegal.llm.llm_model import LLmResponse
+        c, mock_client = TestCompactInLoop._setup_with_compact(self, threshold=0.5)
+        c.context_windows = [100]
+        c.nodes["ctrl"].react = NodeReact(max_iterations=4, compact=True, compact_threshold=0.5,
+                                          compact_background=True, compact_keep_recent=1)
+        decisions = [{"next_agent": "agent_a"}, {"next_agent": "agent_a"}, {"done": True}]
+        histories = []
+
+        def complete(**kwargs):
+            if kwargs.get("user_message"):          # compaction request
+                return LLmResponse(messages=[summarize(kwargs["chat_history"])])
+            histories.append([m.content for m in kwargs["chat_history"]])
+            return LLmResponse(json_output=decisions[len(histories) - 1], input_size=60, output_size=5)
+
+        mock_client.complete.side_effect = complete
+        return c, histories
+
+    def test_summary_swapped_in_at_next_boundary(self):
+        summarized = threading.Event()
+
+        def summarize(history):
+            summarized.set()
+            return f"summary of {len(history)}"
+
+        c, histories = self._setup(summarize)
+
+        def agent(edge, agent_input):
+            if len(histories) == 2:         # compaction starts on the second iteration
+                summarized.wait(2)
+                time.sleep(0.05)
+            return "obs"
+
+        with patch.object(c, "_run_react_agent", side_effect=agent):
+            c._run_react_loop(c._react_controllers["ctrl"], c.nodes["ctrl"])
+
+        # Iteration 2 compacted [decision 1, obs 1] while its agent ran; iteration 3 sees the summary
+        self.assertEqual(len(histories[1]), 2)
+        self.assertEqual(histories[2][0], "[compacted state]\nsummary of 2")
+        self.assertEqual(histories[2][1:], ['{"next_agent": "agent_a"}', "[observation from agent_a]\nobs"])
+
+    def test_unfinished_summary_does_not_block(self):
+        release = threading.Event()
+
+        def summarize(history):
+            release.wait(2)
+            return "late"
+
+        c, histories = self._setup(summarize)
+        with patch.object(c, "_run_react_agent", return_value="obs"):
+            c._run_react_loop(c._react_controllers["ctrl"], c.nodes["ctrl"])
+        release.set()
+
+        self.assertEqual(len(histories[2]), 4)
+        self.assertFalse(any("[compacted state]" in m for h in histories for m in h))
+
+    def test_keep_recent_validation(self):
+        with self.assertRaises(ValidationError):
+            NodeReact(compact_keep_recent=0)
+
+
+# ---------------------------------------------------------------------------
+# Parallel dispatch
+# ---------------------------------------------------------------------------
+
+class TestParallelDispatch(unittest.TestCase):
+
+    def _setup(self, *decisions, **react):
+        from kegal.llm.llm_model import LLmResponse
+        c, mock_client = TestRunReactLoop._setup_controller(self)
+        c.nodes["ctrl"].react = NodeReact(max_iterations=4, parallel_dispatch=True, **react)
+        mock_client.complete.side_effect = [
+            LLmResponse(json_output=d, input_size=50, output_size=20) for d in decisions
+        ]
+        return c, mock_client
+
+    def _observations(self, mock_client) -> list[str]:
+        history = mock_client.complete.call_args.kwargs["chat_history"]
+        return [m.content for m in history if m.role == "user" and m.content.startswith("[observation")]
+
+    def test_dispatches_run_concurrently_in_order(self):
+        c, mock_client = self._setup(
+            {"dispatches": [{"agent": "agent_a", "input": "slow"}, {"agent": "agent_a", "input": "fast"}]},
+            {"done": True, "final_answer": "ok"},
+        )
+        barrier = threading.Barrier(2, timeout=2)
+
+        def agent(edge, agent_input, restore_boards=True):
+            barrier.wait()          # both agents must be running at once
+            if agent_input == "slow":
+                time.sleep(0.05)
+            return f"{agent_input} result"
+
+        with patch.object(c, "_run_react_agent", side_effect=agent):
+            c._run_react_loop(c._react_controllers["ctrl"], c.nodes["ctrl"])
+
+        self.assertEqual(self._observations(mock_client), [
+            "[observation from agent_a]\nslow result\n\n[observation from agent_a]\nfast result"
+        ])
+        trace = c.get_react_trace("ctrl")
+        self.assertEqual(trace.total_iterations, 1)
+        self.assertEqual([it.agent_input for it in trace.iterations], ["slow", "fast"])
+        self.assertEqual(sum(it.controller_input_tokens for it in trace.iterations), 50)
+
+    def test_agents_have_isolated_state(self):
+        c, _ = self._setup(
+            {"dispatches": [{"agent": "agent_a", "input": "one"}, {"agent": "agent_a", "input": "two"}]},
+            {"done": True},
+        )
+        c.message_passing = ["upstream"]
+
+        def run_node(_node):
+            seen = list(c.message_passing)
+            time.sleep(0.02)
+            c.message_passing.append(f"saw {seen}")
+
+        c._run_node = run_node
+        c._run_react_loop(c._react_controllers["ctrl"], c.nodes["ctrl"])
+
+        trace = c.get_react_trace("ctrl")
+        self.assertEqual([it.agent_output for it in trace.iterations], ["saw ['one']", "saw ['two']"])
+        self.assertEqual(c.message_passing, ["upstream"])
+
+    def test_max_parallel_agents_bounds_concurrency(self):
+        c, _ = self._setup(
+            {"dispatches": [{"agent": "agent_a", "input": str(i)} for i in range(4)]},
+            {"done": True},
+            max_parallel_agents=1,
+        )
+        running, peak = [0], [0]
+        lock = threading.Lock()
+
+        def agent(edge, agent_input, restore_boards=True):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.01)
+            with lock:
+                running[0] -= 1
+            return agent_input
+
+        with patch.object(c, "_run_react_agent", side_effect=agent):
+            c._run_react_loop(c._react_controllers["ctrl"], c.nodes["ctrl"])
+        self.assertEqual(peak[0], 1)
+        self.assertEqual(len(c.get_react_trace("ctrl").iterations), 4)
+
+    def test_unknown_agent_stops_before_running_any(self):
+        c, _ = self._setup({"dispatches": [{"agent": "agent_a"}, {"agent": "ghost"}]})
+        with patch.object(c, "_run_react_agent") as agent:
+            c._run_react_loop(c._react_controllers["ctrl"], c.nodes["ctrl"])
+        agent.assert_not_called()
+        self.assertEqual(c.get_react_trace("ctrl").total_iterations, 0)
+
+    def test_non_string_input_skipped(self):
+        c, _ = self._setup(
+            {"dispatches": [{"agent": "agent_a", "input": {"q": 1}}, {"agent": "agent_a", "input": ["x"]},
+                            {"agent": "agent_a", "input": "ok"}]},
+            {"done": True},
+        )
+        with patch.object(c, "_run_react_agent", return_value="r") as agent:
+            c._run_react_loop(c._react_controllers["ctrl"], c.nodes["ctrl"])
+        self.assertEqual([call.args[1] for call in agent.call_args_list], ["ok"])
+        self.assertEqual([it.agent_input for it in c.get_react_trace("ctrl").iterations], ["ok"])
+
+    def test_single_agent_routing_still_works(self):
+        c, _ = self._setup({"next_agent": "agent_a", "agent_input": "q"}, {"done": True})
+        with patch.object(c, "_run_react_agent", return_value="r") as agent:
+            c._run_react_loop(c._react_controllers["ctrl"], c.nodes["ctrl"])
+        agent.assert_called_once()
+        self.assertEqual(c.get_react_trace("ctrl").iterations[0].agent_output, "r")
+
+    def test_batch_agents_do_not_restore_boards_under_siblings(self):
+        c, _ = self._setup()
+        c._boards = {"notes": "before"}
+        barrier = threading.Barrier(2, timeout=2)
+        b_done = threading.Event()
+        seen = []
+
+        def fake_run_node(node):
+            barrier.wait()
+            if c.message_passing[0] == "a":
+                c._boards["notes"] = "written by a"
+                self.assertTrue(b_done.wait(2))
+                seen.append(c._boards["notes"])
+            return True
+
+        c._run_node = fake_run_node
+        edge = c._react_controllers["ctrl"].react[0]
+        original = c._run_react_agent
+
+        def run_agent(agent_edge, agent_input, **kwargs):
+            try:
+                return original(agent_edge, agent_input, **kwargs)
+            finally:
+                if agent_input == "b":
+                    b_done.set()
+
+        with patch.object(c, "_run_react_agent", side_effect=run_agent):
+            c._run_react_agents([(edge, "a"), (edge, "b")])
+
+        # b finishing first left a's write in place; the batch restored the boards at the end
+        self.assertEqual(seen, ["written by a"])
+        self.assertEqual(c._boards, {"notes": "before"})
+
+    def test_max_parallel_agents_validation(self):
+        with self.assertRaises(ValidationError):
+            NodeReact(max_parallel_agents=0)
+
+
+# ---------------------------------------------------------------------------
+# Agent memoization and repeat detection
+# ---------------------------------------------------------------------------
+
+class TestAgentMemo(unittest.TestCase):
+
+    def _setup(self, *decisions, **react):
+        from kegal.llm.llm_model import LLmResponse
+        c, mock_client = TestRunReactLoop._setup_controller(self)
+        c.nodes["ctrl"].react = NodeReact(max_iterations=6, **react)
+        mock_client.complete.side_effect = [LLmResponse(json_output=d) for d in decisions]
+        return c, mock_client
+
+    def _run(self, c, outputs=("first", "second", "third")):
+        with patch.object(c, "_run_react_agent", side_effect=list(outputs)) as agent:
+            c._run_react_loop(c._react_controllers["ctrl"], c.nodes["ctrl"])
+        return agent, c.get_react_trace("ctrl")
+
+    def test_repeated_dispatch_reuses_observation(self):
+        c, _ = self._setup(
+            {"next_agent": "agent_a", "agent_input": "check  the\nfacts"},
+            {"next_agent": "agent_a", "agent_input": " check the facts "},
+            {"done": True},
+            memoize_agents=True,
+        )
+        agent, trace = self._run(c)
+        agent.assert_called_once()
+        self.assertEqual([it.agent_output for it in trace.iterations], ["first", "first"])
+        self.assertEqual([it.cached for it in trace.iterations], [False, True])
+
+    def test_memo_off_by_default(self):
+        c, _ = self._setup(
+            {"next_agent": "agent_a", "agent_input": "q"},
+            {"next_agent": "agent_a", "agent_input": "q"},
+            {"done": True},
+        )
+        agent, trace = self._run(c)
+        self.assertEqual(agent.call_count, 2)
+        self.assertFalse(any(it.cached for it in trace.iterations))
+
+    def test_board_change_invalidates_memo(self):
+        from kegal.graph_blackboard import NodeBlackboardRef
+        c, _ = self._setup(memoize_agents=True)
+        c.nodes["agent_a"].blackboard = NodeBlackboardRef(id="main", read=True)
+        c._boards = {"main": "v1"}
+        edge = c._react_controllers["ctrl"].react[0]
+        before = c._agent_memo_key(edge, "q")
+        self.assertEqual(before, c._agent_memo_key(edge, "q "))
+        c._boards["main"] = "v2"
+        self.assertNotEqual(before, c._agent_memo_key(edge, "q"))
+
+    def test_repeat_limit_stops_loop(self):
+        c, mock_client = self._setup(
+            *[{"next_agent": "agent_a", "agent_input": "same"}] * 3,
+            max_repeated_dispatches=2,
+        )
+        agent, trace = self._run(c)
+        self.assertEqual(agent.call_count, 2)
+        self.assertEqual(mock_client.complete.call_count, 3)
+        self.assertEqual(trace.total_iterations, 2)
+        self.assertFalse(trace.done)
+
+    def test_parallel_batch_runs_each_distinct_dispatch_once(self):
+        c, _ = self._setup(
+            {"next_agent": "agent_a", "agent_input": "x"},
+            {"dispatches": [{"agent": "agent_a", "input": "x"}, {"agent": "agent_a", "input": "y"},
+                            {"agent": "agent_a", "input": "y"}]},
+            {"done": True},
+            memoize_agents=True, parallel_dispatch=True,
+        )
+        with patch.object(c, "_run_react_agent", side_effect=lambda edge, i: f"{i}!") as agent:
+            c._run_react_loop(c._react_controllers["ctrl"], c.nodes["ctrl"])
+        self.assertEqual(sorted(call.args[1] for call in agent.call_args_list), ["x", "y"])
+        trace = c.get_react_trace("ctrl")
+        self.assertEqual([it.agent_output for it in trace.iterations], ["x!", "x!", "y!", "y!"])
+        self.assertEqual([it.cached for it in trace.iterations], [False, True, False, True])
+
+    def test_repeat_limit_validation(self):
+        with self.assertRaises(ValidationError):
+            NodeReact(max_repeated_dispatches=0)
+
+
 # ---------------------------------------------------------------------------
 # Integration test — requires Ollama running locally
 # ---------------------------------------------------------------------------
@@ -1148,6 +1763,12 @@ class TestControllerMessagePassingOutput(unittest.TestCase):
         c._react_trace = {}
         c._react_controllers = c._build_react_controller_map()
         c._outputs_lock = __import__("threading").Lock()
+        c._tool_index = {}
+        c.tool_embedder = None
+        c._hedge_pool = None
+        c._event_sink = None
+        c.speculative_guards = False
+        c._served_model = {}
         c._message_passing_lock = __import__("threading").Lock()
         c._blackboard_lock = __import__("threading").Lock()
         c.context_windows = [None]
@@ -112,6 +112,12 @@ def _build_research_compiler():
     c._react_trace = {}
     c._react_controllers = c._build_react_controller_map()
     c._outputs_lock = __import__("threading").Lock()
+    c._tool_index = {}
+    c.tool_embedder = None
+    c._hedge_pool = None
+    c._event_sink = None
+    c.speculative_guards = False
+    c._served_model = {}
     c._message_passing_lock = __import__("threading").Lock()
     c._blackboard_lock = __import__("threading").Lock()
     from kegal.compiler import CompiledOutput